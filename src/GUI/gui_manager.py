@@ -36,8 +36,15 @@ Board states (only active when main game is in the 'playing' state):
     - Go to <<Game Over>>
 6. Game Over
     - Tell game manager to record stats
+
+The engine thinks on a worker thread, so the GUI keeps drawing and handling events during its search. While it thinks,
+the board takes no moves, and the engine's best move so far is shown. Move Now makes it play that move at once, and
+Cancel drops the search: the engine then sits out that position, and the user may play its move.
 """
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
+import queue
+import time
 from src.game.manager import HiveGameManager
 from src.GUI.gui_objects import GuiPiece
 from src.engine.hive_engine import BasicEngine as Engine
@@ -55,6 +62,10 @@ class GuiManager:
     kMoving = 'moving'
     kResign = 'resign'
 
+    # Engine opponent
+    kEngine_color = 'black'
+    kEngine_search_depth = 5
+
     movement_hexes: list[list]
     placement_hexes: list[list]
     pieces: list[GuiPiece]
@@ -66,13 +77,35 @@ class GuiManager:
         self.game_manager = HiveGameManager("live_game_config")
         self.game_state = self.kStart_turn  # self.kInitializing
         self.user_hex_location = []
-        self.engine = Engine()
-        self.refresh_board_state()
         self.board_evaluation = 1.0
+        self.engine = Engine(game_config="live_game_config")
+        self.engine_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='engine')
+        self.engine_future: Future = None
+        self.engine_results: queue.SimpleQueue[Future] = queue.SimpleQueue()  # Finished searches, handed over by the worker thread
+        self.engine_start_time: float = 0.0
+        self.engine_skipped_board_state: dict = None  # Position whose engine search was cancelled
+        self.refresh_board_state()
 
     @property
     def is_game_active(self) -> bool:
-        return self.game_state in [self.kStart_turn, self.kEnd_turn, self.kCancel, self.kPlacing, self.kMoving]
+        return self.game_state in [self.kStart_turn, self.kEnd_turn, self.kCancel, self.kPlacing, self.kMoving] and not self.is_engine_thinking
+
+    @property
+    def is_engine_thinking(self) -> bool:
+        return self.engine_future is not None
+
+    @property
+    def engine_status(self) -> str:
+        """ Line describing the engine's running search, or '' when it is not thinking """
+        if not self.is_engine_thinking:
+            return ''
+        best_move, evaluation = self.engine.get_search_progress()
+        status = f'Engine thinking ({time.perf_counter() - self.engine_start_time:.0f}s)'
+        if 'place piece' in best_move:
+            status += f": {best_move['place piece']['type']} at {tuple(best_move['place piece']['location'])}, eval {evaluation:.2f}"
+        elif 'move piece' in best_move:
+            status += f": {tuple(best_move['move piece']['from'])} to {tuple(best_move['move piece']['to'])}, eval {evaluation:.2f}"
+        return status
 
     @property
     def all_played_pieces(self) -> list[GuiPiece]:
@@ -125,17 +158,55 @@ class GuiManager:
             return self.board_state[f'{self.board_state["player turn"]} placements']
         return []
 
+    @property
+    def is_engine_playing(self) -> bool:
+        return not self.winner and self.board_state['black turns'] > 30
+
     def refresh_board_state(self) -> None:
         self.board_state = json.loads(self.game_manager.get_game_state())
         self.pieces = [GuiPiece(piece_info) for piece_info in self.board_state['pieces']]
 
-        if self.board_state['player turn'] == 'black' and not self.winner and self.board_state['black turns'] > 30:
-            self.engine.reset(self.board_state, 5)
-            engine_move = self.engine.choose_move()
+        if self.is_engine_thinking:
+            return
+        if not self.is_engine_playing or self.board_state == self.engine_skipped_board_state:
+            self.engine.stop_pondering()
+        elif self.board_state['player turn'] == self.kEngine_color:
+            self.start_engine_search()
+        elif self.engine.config['kIs_pondering']:
+            # Think on the user's time. Does nothing while the engine is already pondering this position
+            self.engine.start_pondering(self.board_state, self.kEngine_search_depth)
+
+    def start_engine_search(self) -> None:
+        """ Have the engine choose its move on the worker thread. poll_engine() plays the move once it is found """
+        self.engine.reset(self.board_state, self.kEngine_search_depth)
+        self.engine_start_time = time.perf_counter()
+        self.engine_future = self.engine_executor.submit(self.engine.choose_move)
+        self.engine_future.add_done_callback(self.engine_results.put)
+
+    def poll_engine(self) -> None:
+        """ Play the engine's move if its search has finished. Called by the GUI thread on every frame """
+        while not self.engine_results.empty():
+            future = self.engine_results.get()
+            if future is not self.engine_future:
+                continue  # A cancelled search
+            self.engine_future = None
             self.board_evaluation = self.engine.best_evaluation
-            self.game_manager.execute_turn(engine_move)
+            self.game_manager.execute_turn(future.result())
             self.transition_to_state(self.kStart_turn)
 
+    def cancel_engine_search(self) -> None:
+        """ Drop the engine's running search, waiting for it to unwind off the engine, and skip the engine's turn """
+        if self.is_engine_thinking:
+            self.engine.stop_search()
+            self.engine_future.result()
+            self.engine_future = None
+            self.engine_skipped_board_state = self.board_state
+
+    def close(self) -> None:
+        self.cancel_engine_search()
+        self.engine_executor.shutdown()
+        self.engine.close()
+
     def start_game(self) -> None:
         self.transition_to_state(self.kStart_turn)
 
@@ -169,7 +240,7 @@ class GuiManager:
         self.user_hex_location = location
 
     def click_unplayed_piece(self, piece_type: str, color: str) -> None:
-        if color == self.board_state['player turn']:
+        if color == self.board_state['player turn'] and not self.is_engine_thinking:
             self.transition_to_state(self.kPlacing)
             self.selected_piece = [piece for piece in self.pieces if piece.piece_type == piece_type and piece.piece_color == self.board_state['player turn'] and not piece.location][0]
 
@@ -177,12 +248,19 @@ class GuiManager:
                 self.transition_to_state(self.kStart_turn)
 
     def handle_reset_button(self) -> None:
+        self.cancel_engine_search()
         self.game_manager.execute_turn({'reset': {}})
         self.transition_to_state(self.kStart_turn)
 
     def handle_cancel_button(self) -> None:
+        if self.is_engine_thinking:
+            self.cancel_engine_search()
         self.transition_to_state(self.kCancel)
 
+    def handle_move_now_button(self) -> None:
+        if self.is_engine_thinking:
+            self.engine.stop_search()
+
     def handle_end_turn_button(self) -> None:
         if self.selected_piece and self.selected_piece.temp_location:
             self.handle_turn_end()
@@ -70,6 +70,7 @@ class HiveGUI:
         self.board_surface.convert()
         self.board_surface.fill('white')
         self.end_turn_button = GuiButton('End Turn', 50, 150, pygame.Rect(500, 30, 150, 50))
+        self.move_now_button = GuiButton('Move Now', 50, 150, pygame.Rect(500, 30, 150, 50))
         self.cancel_button = GuiButton('Cancel', 50, 150, pygame.Rect(700, 30, 150, 50))
         self.reset_button = GuiButton('Reset Game', 50, 150, pygame.Rect(10, 30, 150, 50))
         self.resign_button = GuiButton('Resign', 50, 150, pygame.Rect(10, 30, 150, 50))
@@ -117,9 +118,13 @@ class HiveGUI:
             surfaces[piece.full_info] = pygame.image.load(os.path.join('assets', piece.full_info + '.png'))
         return surfaces
 
+    def quit(self) -> None:
+        self.manager.close()
+        quit()
+
     def handle_keys(self, key) -> None:
         if key == K_ESCAPE:
-            quit()
+            self.quit()
 
     def handle_click_in_unplayed_area(self, click_pos) -> None:
         for piece_name, rect in self.unplayed_piece_surface_rects_dict.items():
@@ -144,7 +149,10 @@ class HiveGUI:
             if self.cancel_button.rect.collidepoint(mouse_event.pos):
                 self.manager.handle_cancel_button()
 
-            if self.end_turn_button.rect.collidepoint(mouse_event.pos):
+            if self.manager.is_engine_thinking and self.move_now_button.rect.collidepoint(mouse_event.pos):
+                self.manager.handle_move_now_button()
+
+            elif self.end_turn_button.rect.collidepoint(mouse_event.pos):
                 self.manager.handle_end_turn_button()
 
             if self.reset_button.rect.collidepoint(mouse_event.pos):
@@ -170,7 +178,7 @@ class HiveGUI:
     def handle_events(self) -> None:
         for event in pygame.event.get():
             if event.type == QUIT:
-                quit()
+                self.quit()
             elif event.type == KEYDOWN:
                 self.handle_keys(event.key)
             elif event.type in (MOUSEBUTTONDOWN, MOUSEMOTION, MOUSEBUTTONUP):
@@ -202,7 +210,8 @@ class HiveGUI:
             self.screen.blit(self.user_hex_surface, self._convert_board_index_to_px(self.manager.user_hex_location))
 
     def blit_buttons(self) -> None:
-        for button in [self.end_turn_button, self.cancel_button, self.reset_button]:
+        first_button = self.move_now_button if self.manager.is_engine_thinking else self.end_turn_button
+        for button in [first_button, self.cancel_button, self.reset_button]:
             pygame.draw.rect(self.board_surface, 'black', button.rect, width=2)
             self._write_centered_text(button.top_left, button.text, button.dimensions)
 
@@ -224,10 +233,12 @@ class HiveGUI:
 
         # TODO: FOR TESTING ENGINE ONLY:
         self._write_centered_text((0, 850), f"Engine Eval: {self.manager.board_evaluation:.2f}", (150, 50))
+        self._write_text((10, 90), self.manager.engine_status)
 
     def mainloop(self) -> None:
         while True:
             self.handle_events()
+            self.manager.poll_engine()
             self.screen.blit(self.board_surface, (0, 0))
             self.screen.blit(self.unplayed_area_surface, (self.kBoard_size_px, 0))
             self.draw_game_elements()
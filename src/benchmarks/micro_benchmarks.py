@@ -0,0 +1,252 @@
+"""
+Micro-benchmarks of the game's and engine's hot functions, with regression thresholds
+
+Every benchmark runs on each position of a fixed corpus (corpus.json): an early, a middle and a late game position,
+stored as board states. A benchmark call does one unit of the work the engine repeats: the move generation benchmarks
+cover every piece on the board, a piece's get_movement_locations() every piece of its type, evaluate_board_state() and
+get_raw_game_state() the whole position, evaluate_game() and IncrementalEvaluator.evaluate() every position one move
+away, as a search's leaves are, and choose_move() a depth 1 search, quiescence included, from empty tables.
+
+Each benchmark is timed in runs of enough calls to last a minimum time, repeated in rounds over all benchmarks, and
+reported as its fastest run's time per call: the least disturbed by the rest of the machine. choose_move() fills the
+engine's tables, so its calls are timed one at a time, each after clearing them.
+
+Times are compared to the baselines in baselines.json. A benchmark regresses when it is slower than its baseline by more
+than the tolerance, and any regression makes the run fail. Baselines only hold for the machine that recorded them:
+record them again with --update-baselines on a new machine, or after a change that is meant to alter the times.
+
+Only the standard library is needed on top of the game and engine themselves, and nothing is read from the network.
+numpy is not: only the batch evaluator and the weight tuner use it, and neither is imported here or by the engine.
+
+Run with, e.g.: python -m src.benchmarks.micro_benchmarks --filter evaluate_board_state
+"""
+from src.game.manager import HiveGameManager
+from src.engine.evaluator import Evaluator
+from src.engine.incremental_evaluator import IncrementalEvaluator
+from src.engine.hive_engine import BasicEngine
+import src.game.functions as hive_funcs
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+kCorpus_path = os.path.join(os.path.dirname(__file__), 'corpus.json')
+kBaselines_path = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+kDefault_tolerance = 0.4  # Slowdown over the baseline time, as a fraction of it, before a benchmark regresses
+kDefault_repeats = 5
+kDefault_min_run_time_s = 0.2
+kChoose_move_search_depth = 1
+kPiece_types = ('queen', 'ant', 'spider', 'beetle', 'grasshopper')
+
+
+class Benchmark:
+    """ A function to time, called without arguments. prepare, if given, is called before each call, outside the timing """
+
+    def __init__(self, name: str, function, prepare=None):
+        self.name = name
+        self.function = function
+        self.prepare = prepare
+
+
+def load_corpus(corpus_path: str = kCorpus_path) -> dict[str, dict]:
+    """ Board states of the corpus positions, by position name """
+    with open(corpus_path) as f:
+        return json.load(f)
+
+
+def _get_position_benchmarks(position_name: str, board_state: dict) -> list[Benchmark]:
+    """ Benchmarks of every hot function on one position """
+    game_manager = HiveGameManager()
+    game_manager.set_board_state(board_state)
+    game_model = game_manager.game_model
+    occupied_locations = set(game_model.occupied_locations)
+    pinned_locations = set(game_model.pinned_locations)
+
+    # Hexes each piece could slide to, and the board with that piece lifted off it, as the pieces check them for the hive rule
+    slides = [(hive_funcs.get_all_slidable_moves(location, occupied_locations), occupied_locations.difference({location}))
+              for location in occupied_locations]
+
+    def get_slidable_moves():
+        for location in occupied_locations:
+            hive_funcs.get_slidable_moves(location, occupied_locations)
+
+    def get_all_slidable_moves():
+        for location in occupied_locations:
+            hive_funcs.get_all_slidable_moves(location, occupied_locations)
+
+    def get_valid_moves():
+        for candidate_moves, board_locations in slides:
+            hive_funcs.get_valid_moves(candidate_moves, board_locations)
+
+    benchmarks = [
+        Benchmark('is_hive_intact', lambda: hive_funcs.is_hive_intact(occupied_locations)),
+        Benchmark('get_slidable_moves', get_slidable_moves),
+        Benchmark('get_all_slidable_moves', get_all_slidable_moves),
+        Benchmark('get_valid_moves', get_valid_moves),
+    ]
+
+    for piece_type in kPiece_types:
+        pieces = [stack[-1] for stack in game_model.stacks.values() if str(stack[-1]) == piece_type]
+        if pieces:
+            def get_movement_locations(pieces=pieces):
+                for piece in pieces:
+                    piece.get_movement_locations(occupied_locations, pinned_locations)
+            benchmarks.append(Benchmark(f'{piece_type}.get_movement_locations', get_movement_locations))
+
+    evaluator = Evaluator()  # Without an evaluation cache, so every call evaluates
+    benchmarks.append(Benchmark('get_raw_game_state', game_manager.get_raw_game_state))
+    benchmarks.append(Benchmark('evaluate_board_state', lambda: evaluator.evaluate_board_state(board_state)))
+
+    # Every child position, made and unmade on a model of its own that an incremental evaluator follows
+    child_manager = HiveGameManager()
+    child_manager.set_board_state(board_state)
+    child_model = child_manager.game_model
+    child_moves = child_manager.get_possible_moves()
+    incremental_evaluator = IncrementalEvaluator(evaluator.config, child_model)
+    incremental_evaluator.evaluate()  # Synced to the position, as a search's root evaluation leaves it
+
+    def evaluate_children(evaluate):
+        for move in child_moves:
+            child_model.make_move(move)
+            evaluate()
+            child_model.unmake_move()
+    benchmarks.append(Benchmark('evaluate_game', lambda: evaluate_children(lambda: evaluator.evaluate_game(child_model))))
+    benchmarks.append(Benchmark('IncrementalEvaluator.evaluate', lambda: evaluate_children(incremental_evaluator.evaluate)))
+
+    engine = BasicEngine()
+    if engine.opening_book is not None:
+        engine.opening_book.close()
+        engine.opening_book = None
+
+    def prepare_search():
+        engine.transposition_table.clear()
+        if engine.evaluation_cache is not None:
+            engine.evaluation_cache.clear()
+        engine.reset(board_state, kChoose_move_search_depth)
+    benchmarks.append(Benchmark('choose_move', engine.choose_move, prepare_search))
+
+    for benchmark in benchmarks:
+        benchmark.name = f'{benchmark.name}[{position_name}]'
+    return benchmarks
+
+
+def get_benchmarks(corpus: dict[str, dict] = None, name_filter: str = '') -> list[Benchmark]:
+    """ Benchmarks of every position of the corpus, the default corpus when None, whose names contain name_filter """
+    corpus = load_corpus() if corpus is None else corpus
+    benchmarks = []
+    for position_name, board_state in corpus.items():
+        benchmarks.extend(benchmark for benchmark in _get_position_benchmarks(position_name, board_state) if name_filter in benchmark.name)
+    return benchmarks
+
+
+def _time_calls(benchmark: Benchmark, calls: int) -> float:
+    """ Seconds per call of the benchmark's function, over a run of calls. Prepared benchmarks are timed one call at a time """
+    if benchmark.prepare is not None:
+        total_s = 0.0
+        for _ in range(calls):
+            benchmark.prepare()
+            start = time.perf_counter()
+            benchmark.function()
+            total_s += time.perf_counter() - start
+        return total_s / calls
+
+    function = benchmark.function
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+def _get_calls_per_run(benchmark: Benchmark, min_run_time_s: float) -> int:
+    """ Calls in a run of at least min_run_time_s, doubling from one call as timeit's autorange does """
+    if benchmark.prepare is not None:
+        return 1
+    calls = 1
+    while _time_calls(benchmark, calls) * calls < min_run_time_s:
+        calls *= 2
+    return calls
+
+
+def run_benchmarks(benchmarks: list[Benchmark], repeats: int = kDefault_repeats, min_run_time_s: float = kDefault_min_run_time_s) -> dict[str, float]:
+    """
+    Seconds per call of every benchmark, by benchmark name, in its fastest of repeats runs. Every benchmark runs once per
+    round, so a slow spell on the machine slows down one round of all benchmarks rather than all runs of one
+    """
+    calls_per_run = [_get_calls_per_run(benchmark, min_run_time_s) for benchmark in benchmarks]
+    results = {benchmark.name: float('inf') for benchmark in benchmarks}
+    for _ in range(repeats):
+        for benchmark, calls in zip(benchmarks, calls_per_run):
+            results[benchmark.name] = min(results[benchmark.name], _time_calls(benchmark, calls))
+    return results
+
+
+def get_machine_description() -> dict[str, str]:
+    """ The machine and Python that times are recorded on, stored with the baselines """
+    return {'platform': platform.platform(), 'processor': platform.processor() or platform.machine(),
+            'python': platform.python_implementation() + ' ' + platform.python_version()}
+
+
+def load_baselines(baselines_path: str = kBaselines_path) -> dict:
+    """ Baseline file contents: 'machine' description and 'benchmarks' seconds per call by name. Empty without a file """
+    if not os.path.isfile(baselines_path):
+        return {'machine': {}, 'benchmarks': {}}
+    with open(baselines_path) as f:
+        return json.load(f)
+
+
+def save_baselines(results: dict[str, float], baselines_path: str = kBaselines_path) -> None:
+    """ Record times as the baselines of this machine. Baselines of benchmarks that were not run are kept """
+    baselines = load_baselines(baselines_path)
+    baselines['machine'] = get_machine_description()
+    baselines['benchmarks'] = dict(sorted({**baselines['benchmarks'], **results}.items()))
+    with open(baselines_path, 'w') as f:
+        json.dump(baselines, f, indent=4)
+        f.write('\n')
+
+
+def get_regressions(results: dict[str, float], baseline_results: dict[str, float], tolerance: float = kDefault_tolerance) -> list[str]:
+    """ Names of the benchmarks slower than their baseline by more than the tolerance. Benchmarks without a baseline pass """
+    return [name for name, seconds in results.items() if name in baseline_results and seconds > baseline_results[name] * (1.0 + tolerance)]
+
+
+def format_report(results: dict[str, float], baseline_results: dict[str, float], tolerance: float = kDefault_tolerance) -> str:
+    """ One line per benchmark: its time per call, and its change from the baseline """
+    regressions = get_regressions(results, baseline_results, tolerance)
+    name_width = max([len(name) for name in results] + [0])
+    lines = []
+    for name, seconds in results.items():
+        if name in baseline_results:
+            change = f'{seconds / baseline_results[name] - 1.0:+7.1%} vs {baseline_results[name] * 1e6:10.1f} us'
+        else:
+            change = 'no baseline'
+        lines.append(f'{name:<{name_width}}  {seconds * 1e6:10.1f} us  {change}{"  REGRESSED" if name in regressions else ""}')
+    lines.append(f'{len(results)} benchmarks, {len(regressions)} regressed beyond {tolerance:.0%}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time the hot functions on the benchmark corpus, and compare them to the baselines")
+    parser.add_argument('--filter', default='', help="only run benchmarks whose names contain this, e.g. [late] or choose_move")
+    parser.add_argument('--tolerance', type=float, default=kDefault_tolerance, help="allowed slowdown over the baselines, as a fraction")
+    parser.add_argument('--repeats', type=int, default=kDefault_repeats)
+    parser.add_argument('--min-run-time', type=float, default=kDefault_min_run_time_s, help="seconds each run of calls lasts at least")
+    parser.add_argument('--baselines', default=kBaselines_path, help="baseline file")
+    parser.add_argument('--update-baselines', action='store_true', help="record this run's times as the baselines instead of comparing")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(get_benchmarks(name_filter=args.filter), args.repeats, args.min_run_time)
+    if args.update_baselines:
+        save_baselines(benchmark_results, args.baselines)
+        print(format_report(benchmark_results, {}, args.tolerance))
+        print(f"Wrote {args.baselines}")
+        sys.exit(0)
+
+    baselines = load_baselines(args.baselines)
+    if baselines['machine'] and baselines['machine'] != get_machine_description():
+        print(f"Baselines were recorded on another machine ({baselines['machine']['platform']}): times may not compare")
+    print(format_report(benchmark_results, baselines['benchmarks'], args.tolerance))
+    sys.exit(1 if get_regressions(benchmark_results, baselines['benchmarks'], args.tolerance) else 0)
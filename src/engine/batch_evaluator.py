@@ -0,0 +1,115 @@
+"""
+Evaluation of many positions at once, as a feature matrix times a weight vector
+
+Every Evaluator term is a weight from the engine config times a count taken from the board, so a position is fully
+described by its feature vector: for every weight, white's count minus black's. Scoring a batch of positions, such as all
+children of a node, is then a single dot product of the batch's feature matrix with the weights.
+
+The capture and queen adjustment terms are the same constant for both colors, and cancel out of the difference.
+
+Counting the features of a position means knowing every piece's moves, which costs far more than the dot product. A
+batch of positions that an IncrementalEvaluator follows, such as the children of its model's position, reads the moves
+and placement hexes from the evaluator's kept records instead of generating them again for each position. The search
+does not score its leaves in batches: it cuts most nodes off after their first child, so evaluating every child up front
+costs more than the product saves.
+"""
+from src.game.consts import Consts
+from src.game.model import HiveGame
+from src.engine.evaluator import Evaluator
+from src.engine.incremental_evaluator import IncrementalEvaluator
+import src.game.functions as hive_funcs
+
+import numpy
+
+
+class BatchEvaluator(Evaluator):
+    """ Evaluator that scores positions through their feature vectors. Positive for white advantage, negative for black """
+
+    kPiece_types = ['queen', 'ant', 'beetle', 'spider', 'grasshopper']
+
+    # One feature per weight. The surrounded queen feature is weighted by kSurrounded_queen_score instead of a config value
+    kFeature_weight_keys = \
+        ['kSurrounded_queen_score', 'kQueen_open_hexes', 'kQueen_slidable_hexes'] + \
+        [f'k{piece_type.capitalize()}_in_play_bonus' for piece_type in kPiece_types] + \
+        ['kQueen_adjacent_friendly_moves_scalar', 'kTotal_moves_scalar', 'kQueen moves scalar',
+         'kTotal_placements_scalar', 'kEnemy_queen_adjacent_bonus'] + \
+        [f'kBeetle_on_enemy_{piece_type}_bonus' for piece_type in kPiece_types] + \
+        [f'kBeetle_on_friendly_{piece_type}_penalty' for piece_type in kPiece_types] + \
+        ['kPlayer_turn_bonus']
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.feature_indexes: dict[str, int] = {key: index for index, key in enumerate(self.kFeature_weight_keys)}
+        self.weights = numpy.array([self.kSurrounded_queen_score] + [self.config[key] for key in self.kFeature_weight_keys[1:]], dtype=float)
+
+    def _add_player_features(self, features: list[float], game_model: HiveGame, color: str, sign: float,
+                             moves_by_location: dict[tuple, set[tuple]], incremental_evaluator: IncrementalEvaluator = None) -> None:
+        """ Add one color's counts to a feature vector, times sign: 1 for white, -1 for black """
+        index = self.feature_indexes
+        occupied_locations = game_model.occupied_locations
+        queen = self._get_queen(game_model, color)
+        enemy_queen = self._get_queen(game_model, Consts.kBlack if color == Consts.kWhite else Consts.kWhite)
+
+        # Queen liberties and mobility
+        if queen.location:
+            queen_neighbors = hive_funcs.get_surrounding_hex_indexes(queen.location)
+            open_hexes_around_queen = queen_neighbors.difference(occupied_locations)
+            if not open_hexes_around_queen:
+                features[index['kSurrounded_queen_score']] += sign
+            else:
+                features[index['kQueen_open_hexes']] += sign * len(open_hexes_around_queen)
+                features[index['kQueen_slidable_hexes']] -= sign * len(hive_funcs.get_slidable_moves(queen.location, occupied_locations))
+            features[index['kQueen_adjacent_friendly_moves_scalar']] += sign * len(
+                [location for location in queen_neighbors if moves_by_location.get(location) and game_model.stacks[location][-1].color == color])
+            if queen.z_index == 0:
+                features[index['kQueen moves scalar']] += sign * len(moves_by_location[queen.location])
+
+        # Pieces in play, beetle stacks and total mobility
+        for location, stack in game_model.stacks.items():
+            for piece in stack:
+                if piece.color == color:
+                    features[index[f'k{str(piece).capitalize()}_in_play_bonus']] += sign
+            if stack[-1].color == color:
+                features[index['kTotal_moves_scalar']] += sign * len(moves_by_location[location])
+                for buried_piece in stack[:-1]:
+                    if buried_piece.color == color:
+                        features[index[f'kBeetle_on_friendly_{buried_piece}_penalty']] -= sign
+                    else:
+                        features[index[f'kBeetle_on_enemy_{buried_piece}_bonus']] += sign
+
+        # Placements, while there are pieces left to place
+        if [piece for piece in game_model.pieces if piece.color == color and not piece.location]:
+            placements = game_model.get_piece_placement_locations(color) if incremental_evaluator is None else incremental_evaluator.get_placement_locations(color)
+            features[index['kTotal_placements_scalar']] += sign * len(placements)
+            if enemy_queen.location:
+                features[index['kEnemy_queen_adjacent_bonus']] += sign * len(hive_funcs.get_surrounding_hex_indexes(enemy_queen.location).intersection(placements))
+
+        features[index['kPlayer_turn_bonus']] += sign * (color == game_model.player_on_turn)
+
+    def get_features(self, game_model: HiveGame, incremental_evaluator: IncrementalEvaluator = None) -> list[float]:
+        """
+        Feature vector of the model's position: white's count minus black's, for every weight. Given an incremental
+        evaluator that follows the model, the moves and placement hexes come from its kept records instead of being
+        generated again for the position
+        """
+        features = [0.0] * len(self.kFeature_weight_keys)
+        moves_by_location = self.get_moves_by_location(game_model) if incremental_evaluator is None else incremental_evaluator.sync()
+        self._add_player_features(features, game_model, Consts.kWhite, 1.0, moves_by_location, incremental_evaluator)
+        self._add_player_features(features, game_model, Consts.kBlack, -1.0, moves_by_location, incremental_evaluator)
+        return features
+
+    def get_child_feature_matrix(self, game_model: HiveGame, moves: list[dict], incremental_evaluator: IncrementalEvaluator = None) -> numpy.ndarray:
+        """ One row of features per move: the position after making that move from the model's position. See get_features() """
+        feature_matrix = numpy.empty((len(moves), len(self.kFeature_weight_keys)))
+        for row, move in enumerate(moves):
+            game_model.make_move(move)
+            feature_matrix[row] = self.get_features(game_model, incremental_evaluator)
+            game_model.unmake_move()
+        return feature_matrix
+
+    def evaluate_feature_matrix(self, feature_matrix: numpy.ndarray) -> numpy.ndarray:
+        return feature_matrix @ self.weights
+
+    def evaluate_moves(self, game_model: HiveGame, moves: list[dict], incremental_evaluator: IncrementalEvaluator = None) -> numpy.ndarray:
+        """ Evaluation of the position after each move from the model's position """
+        return self.evaluate_feature_matrix(self.get_child_feature_matrix(game_model, moves, incremental_evaluator))
@@ -3,13 +3,16 @@ import os
 import configparser
 
 
+def get_config_path(_config_name='') -> str:
+    """ Path of an engine config file, looked for in the src directory unless given as an absolute path """
+    config_name = _config_name if _config_name else "pytest_engine_config"
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, config_name))
+
+
 def get_config(_config_name=''):
 
     config = configparser.ConfigParser()
-    config_name = _config_name if _config_name else "pytest_engine_config"
-    config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, config_name))
-
-    config.read(config_path)
+    config.read(get_config_path(_config_name))
     config_dict = dict()
 
     try:
@@ -75,6 +78,29 @@ def get_config(_config_name=''):
         config_dict['kPiece_surrounded_penalty'] = float(config['Misc']['Piece surrounded penalty'])
         config_dict['kPlayer_turn_bonus'] = float(config['Misc']['Turn advantage'])
 
+        # Search. Options from here on came after the evaluation weights, and fall back to their defaults when a config
+        # file predates them
+        config_dict['kTransposition_table_mb'] = config.getfloat('Search', 'Transposition table size mb', fallback=16.0)
+        config_dict['kWorker_processes'] = config.getint('Search', 'Worker processes', fallback=0)
+        config_dict['kIs_deterministic_search'] = config.getboolean('Search', 'Deterministic parallel search', fallback=True)
+        config_dict['kIs_shared_transposition_table'] = config.getboolean('Search', 'Shared transposition table', fallback=True)
+        config_dict['kEvaluation_cache_entries'] = config.getint('Search', 'Evaluation cache entries', fallback=100000)
+        config_dict['kQuiescence_node_limit'] = config.getint('Search', 'Quiescence node limit', fallback=50)
+        config_dict['kIs_pondering'] = config.getboolean('Search', 'Pondering', fallback=False)
+        config_dict['kSearch_log_file'] = config.get('Search', 'Search log file', fallback='')  # JSON lines log of search stats, none if empty
+
+        # Opening book, see opening_book.py. The book file is looked for in the saved_games directory
+        config_dict['kOpening_book_file'] = config.get('Opening Book', 'Book file', fallback='opening_book.bin')
+        config_dict['kOpening_book_min_games'] = config.getint('Opening Book', 'Minimum games', fallback=2)
+        config_dict['kOpening_book_max_plies'] = config.getint('Opening Book', 'Maximum plies', fallback=12)
+
+        # Monte Carlo Tree Search
+        config_dict['kMcts_playouts_per_move'] = config.getint('MCTS', 'Playouts per move', fallback=100)
+        config_dict['kMcts_playout_move_cap'] = config.getint('MCTS', 'Playout move cap', fallback=30)
+        config_dict['kMcts_exploration'] = config.getfloat('MCTS', 'Exploration constant', fallback=1.4)
+        config_dict['kMcts_guided_playout_probability'] = config.getfloat('MCTS', 'Guided playout probability', fallback=0.5)
+        config_dict['kMcts_max_nodes'] = config.getint('MCTS', 'Max tree nodes', fallback=100000)
+
     except (ValueError, KeyError) as err:
         print("Invalid Parameters! Check your Hive config settings. Aborting.")
         quit(err)
@@ -0,0 +1,54 @@
+""" Bounded cache of position evaluations, evicting the least recently used position first """
+from collections import OrderedDict
+import threading
+
+
+class EvaluationCache:
+    """
+    Maps position keys to evaluations. Positions are keyed by their Zobrist hash (HiveGame.position_hash), which only
+    depends on where the pieces are and who is on turn, so transpositions, such as the same placements made in a
+    different order, share one entry.
+
+    The cache may be shared by searches running on other threads, e.g. an engine thinking in the background while the
+    GUI runs: every access holds a lock.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[int, float] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, position_key: int) -> float:
+        """ The cached evaluation of a position, or None """
+        with self.lock:
+            evaluation = self.entries.get(position_key)
+            if evaluation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(position_key)
+            return evaluation
+
+    def put(self, position_key: int, evaluation: float) -> None:
+        with self.lock:
+            self.entries[position_key] = evaluation
+            self.entries.move_to_end(position_key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """ Forget every entry and reset the hit and miss counters """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -1,5 +1,8 @@
 from src.engine.engine_config import get_config
+from src.engine.evaluation_cache import EvaluationCache
 from src.game.consts import Consts
+from src.game.model import HiveGame
+from src.game.pieces import HivePiece
 import src.game.functions as hive_funcs
 
 
@@ -32,219 +35,142 @@ class Evaluator:
         - Beetle distance to enemy queen
     """
 
-    def __init__(self, config=None):
+    kSurrounded_queen_score = -1000
+
+    def __init__(self, config=None, evaluation_cache: EvaluationCache = None):
         self.config = get_config(config) if not config else config
-        self.board_state: dict = {}
-        self.piece_locations: set[tuple] = set()
-        self.placed_pieces: dict[str] = {}
-        self.unplaced_pieces: dict[str] = {}
-        self.colors = [Consts.kWhite, Consts.kBlack]
-        self._current_color_ix = 0
-        self.reset()
-
-    @property
-    def current_color_ix(self) -> int:
-        return self._current_color_ix
-
-    @current_color_ix.setter
-    def current_color_ix(self, value) -> None:
-        self._current_color_ix = value
-
-    @property
-    def friendly_color(self) -> str:
-        return self.colors[self.current_color_ix]
-
-    @property
-    def enemy_color(self) -> str:
-        return self.colors[(self.current_color_ix + 1) % 2]
-
-    @property
-    def friendly_queen_loc(self):
-        return tuple(self.placed_pieces[self.friendly_color]['queen'][0]['location']) if self.placed_pieces[self.friendly_color]['queen'] else ()
-
-    @property
-    def enemy_queen_loc(self):
-        return tuple(self.placed_pieces[self.enemy_color]['queen'][0]['location']) if self.placed_pieces[self.enemy_color]['queen'] else ()
-
-    @property
-    def friendly_placed_pieces(self) -> list[dict]:
-        friendly_pieces = []
-        [friendly_pieces.extend(pieces) for pieces in self.placed_pieces[self.friendly_color].values()]
-        return friendly_pieces
-
-    def reset(self) -> None:
-        self.current_color_ix = 0
-        self.placed_pieces: dict[str] = {
-            Consts.kWhite: {piece[0]: [] for piece in Consts.standard_game_pieces},
-            Consts.kBlack: {piece[0]: [] for piece in Consts.standard_game_pieces}
-        }
-        self.unplaced_pieces: dict[str] = {
-            Consts.kWhite: {piece[0]: [] for piece in Consts.standard_game_pieces},
-            Consts.kBlack: {piece[0]: [] for piece in Consts.standard_game_pieces}
-        }
-
-    def _disposition_pieces(self, _board_state: dict) -> None:
-        self.piece_locations = set([tuple(piece['location']) for piece in _board_state['pieces'] if piece['location']])
-
-        [self.placed_pieces[Consts.kWhite][piece['type']].append(piece) for piece in _board_state['pieces'] if piece['location'] and piece['color'] == Consts.kWhite]
-        [self.placed_pieces[Consts.kBlack][piece['type']].append(piece) for piece in _board_state['pieces'] if piece['location'] and piece['color'] == Consts.kBlack]
-        [self.unplaced_pieces[Consts.kWhite][piece['type']].append(piece) for piece in _board_state['pieces'] if not piece['location'] and piece['color'] == Consts.kWhite]
-        [self.unplaced_pieces[Consts.kBlack][piece['type']].append(piece) for piece in _board_state['pieces'] if not piece['location'] and piece['color'] == Consts.kBlack]
-
-    def _get_queen_eval(self) -> float:
+        self.evaluation_cache = evaluation_cache
+        self.board_state_model: HiveGame = None  # Model that evaluate_board_state() loads board state dicts into
+
+    @staticmethod
+    def get_moves_by_location(game_model: HiveGame) -> dict[tuple, set[tuple]]:
+        """ Moves of the piece on top of every occupied hex. Pieces beneath others have no moves """
+        return {location: game_model.get_piece_movement_locations(location) for location in game_model.stacks}
+
+    @staticmethod
+    def _get_queen(game_model: HiveGame, color: str) -> HivePiece:
+        return game_model.white_queen if color == Consts.kWhite else game_model.black_queen
+
+    def _get_queen_eval(self, game_model: HiveGame, color: str) -> float:
         tally = 0.0
-        if self.placed_pieces[self.friendly_color]['queen']:
+        queen_location = self._get_queen(game_model, color).location
+        if queen_location:
             # open hexes around queen
-            open_hexes_around_queen = hive_funcs.get_surrounding_hex_indexes(self.friendly_queen_loc).difference(self.piece_locations)
+            open_hexes_around_queen = hive_funcs.get_surrounding_hex_indexes(queen_location).difference(game_model.occupied_locations)
             if not open_hexes_around_queen:
                 # Friendly queen is surrounded. This is very bad.
-                tally -= 1000
+                tally += self.kSurrounded_queen_score
             else:
                 # TODO: This should probably not be linear
                 tally += len(open_hexes_around_queen) * self.config['kQueen_open_hexes']
 
                 # slideable hexes around queen are worse`
-                slideable_hexes_around_queen = hive_funcs.get_slidable_moves(self.friendly_queen_loc, self.piece_locations)
+                slideable_hexes_around_queen = hive_funcs.get_slidable_moves(queen_location, game_model.occupied_locations)
                 tally -= len(slideable_hexes_around_queen) * self.config['kQueen_slidable_hexes']
         return tally
 
-    def _get_played_pieces_eval(self) -> float:
+    def _get_played_pieces_eval(self, placed_counts: dict[str, int]) -> float:
+        """ placed_counts: number of pieces in play of each type, for one color """
         tally = 0.0
-        tally += len(self.placed_pieces[self.friendly_color]['queen']) * self.config['kQueen_in_play_bonus']
-        tally += len(self.placed_pieces[self.friendly_color]['ant']) * self.config['kAnt_in_play_bonus']
-        tally += len(self.placed_pieces[self.friendly_color]['beetle']) * self.config['kBeetle_in_play_bonus']
-        tally += len(self.placed_pieces[self.friendly_color]['spider']) * self.config['kSpider_in_play_bonus']
-        tally += len(self.placed_pieces[self.friendly_color]['grasshopper']) * self.config['kGrasshopper_in_play_bonus']
+        tally += placed_counts.get('queen', 0) * self.config['kQueen_in_play_bonus']
+        tally += placed_counts.get('ant', 0) * self.config['kAnt_in_play_bonus']
+        tally += placed_counts.get('beetle', 0) * self.config['kBeetle_in_play_bonus']
+        tally += placed_counts.get('spider', 0) * self.config['kSpider_in_play_bonus']
+        tally += placed_counts.get('grasshopper', 0) * self.config['kGrasshopper_in_play_bonus']
         return tally
 
-    def _get_movement_eval(self) -> float:
+    def _get_movement_eval(self, game_model: HiveGame, color: str, moves_by_location: dict[tuple, set[tuple]]) -> float:
         tally = 0.0
+        queen = self._get_queen(game_model, color)
 
-        if self.friendly_queen_loc:
-            queen_neighbor_locs = hive_funcs.get_surrounding_hex_indexes(self.friendly_queen_loc).intersection(self.piece_locations)
-            queen_neighbor_with_moves = [piece for piece in self.board_state['pieces'] if tuple(piece['location']) in queen_neighbor_locs and piece['moves'] and piece['color'] == self.friendly_color]
+        if queen.location:
+            queen_neighbor_with_moves = [location for location in hive_funcs.get_surrounding_hex_indexes(queen.location)
+                                         if moves_by_location.get(location) and game_model.stacks[location][-1].color == color]
             tally += len(queen_neighbor_with_moves) * self.config['kQueen_adjacent_friendly_moves_scalar']
 
-        for piece_type, _ in Consts.standard_game_pieces:
-            tally += sum([len(piece['moves']) for piece in self.placed_pieces[self.friendly_color][piece_type]]) * self.config['kTotal_moves_scalar']
-            if piece_type == 'queen':
-                tally += sum([len(piece['moves']) for piece in self.placed_pieces[self.friendly_color]['queen']]) * self.config['kQueen moves scalar']
+        total_moves = sum([len(moves) for location, moves in moves_by_location.items() if game_model.stacks[location][-1].color == color])
+        tally += total_moves * self.config['kTotal_moves_scalar']
+        if queen.location and queen.z_index == 0:
+            tally += len(moves_by_location[queen.location]) * self.config['kQueen moves scalar']
         return tally
 
-    def _get_placements_eval(self) -> float:
+    def _get_placements_eval(self, game_model: HiveGame, color: str, unplaced_count: int, placements: set[tuple] = None) -> float:
+        """ placements: the color's placement hexes, if already known. Otherwise they are found on the model """
         tally = 0.0
-        if sum([len(pieces) for pieces in self.unplaced_pieces[self.friendly_color].values()]) > 0:
-            tally += self.config['kTotal_placements_scalar'] * len(self.board_state[f'{self.friendly_color} placements'])
+        if unplaced_count > 0:
+            if placements is None:
+                placements = game_model.get_piece_placement_locations(color)
+            tally += self.config['kTotal_placements_scalar'] * len(placements)
 
-            if self.enemy_queen_loc:
-                enemy_queen_adjacent_hexes = hive_funcs.get_surrounding_hex_indexes(tuple(self.enemy_queen_loc))
-                tally += self.config['kEnemy_queen_adjacent_bonus'] * (len([location for location in self.board_state[f'{self.friendly_color} placements'] if tuple(location) in enemy_queen_adjacent_hexes]))
+            enemy_queen_location = self._get_queen(game_model, Consts.kBlack if color == Consts.kWhite else Consts.kWhite).location
+            if enemy_queen_location:
+                enemy_queen_adjacent_hexes = hive_funcs.get_surrounding_hex_indexes(enemy_queen_location)
+                tally += self.config['kEnemy_queen_adjacent_bonus'] * len(enemy_queen_adjacent_hexes.intersection(placements))
 
         return tally
 
     def _get_captures_eval(self) -> float:
         return 1.0
 
-    def _get_beetle_eval(self) -> float:
+    def _get_beetle_eval(self, game_model: HiveGame, color: str) -> float:
         tally = 0.0
-        for buried_piece in [piece for piece in self.board_state['pieces'] if piece['z-index'] < 0]:
-            top_piece = [piece for piece in self.board_state['pieces'] if piece['location'] == buried_piece['location'] and piece['z-index'] == 0][0]
-            if top_piece['color'] == self.friendly_color:
-                if buried_piece['color'] == self.friendly_color:
-                    tally -= self.config[f'kBeetle_on_friendly_{buried_piece["type"]}_penalty']
-                else:
-                    tally += self.config[f'kBeetle_on_enemy_{buried_piece["type"]}_bonus']
+        for stack in game_model.stacks.values():
+            if len(stack) > 1 and stack[-1].color == color:
+                for buried_piece in stack[:-1]:
+                    if buried_piece.color == color:
+                        tally -= self.config[f'kBeetle_on_friendly_{buried_piece}_penalty']
+                    else:
+                        tally += self.config[f'kBeetle_on_enemy_{buried_piece}_bonus']
         return tally
 
     def _get_queen_adjustments_eval(self) -> float:
         return 1.0
 
-    def _get_misc_eval(self) -> float:
-        return self.config['kPlayer_turn_bonus'] * (self.friendly_color == self.board_state['player turn'])
-
-    def evaluate_board_state(self, board_state: dict) -> float:
-        """ Resolve various factors into a float evaluation of board state.
-        Positive for white advantage, negative for black """
+    def _get_misc_eval(self, game_model: HiveGame, color: str) -> float:
+        return self.config['kPlayer_turn_bonus'] * (color == game_model.player_on_turn)
 
+    def _evaluate_model(self, game_model: HiveGame) -> float:
         players = {Consts.kWhite: 0.0, Consts.kBlack: 0.0}
-        self.reset()
-        self.board_state = board_state
-        self._disposition_pieces(board_state)
+        moves_by_location = self.get_moves_by_location(game_model)
+        placed_counts = {color: dict() for color in players}
+        unplaced_counts = {color: 0 for color in players}
+        for piece in game_model.pieces:
+            if piece.location:
+                placed_counts[piece.color][str(piece)] = placed_counts[piece.color].get(str(piece), 0) + 1
+            else:
+                unplaced_counts[piece.color] += 1
 
         for color in players:
             player_evaluation = 0.0
-            player_evaluation += self._get_queen_eval()
-            player_evaluation += self._get_played_pieces_eval()
-            player_evaluation += self._get_movement_eval()
-            player_evaluation += self._get_placements_eval()
+            player_evaluation += self._get_queen_eval(game_model, color)
+            player_evaluation += self._get_played_pieces_eval(placed_counts[color])
+            player_evaluation += self._get_movement_eval(game_model, color, moves_by_location)
+            player_evaluation += self._get_placements_eval(game_model, color, unplaced_counts[color])
             player_evaluation += self._get_captures_eval()
-            player_evaluation += self._get_beetle_eval()
+            player_evaluation += self._get_beetle_eval(game_model, color)
             player_evaluation += self._get_queen_adjustments_eval()
-            player_evaluation += self._get_misc_eval()
+            player_evaluation += self._get_misc_eval(game_model, color)
             players[color] = player_evaluation
-            self.current_color_ix += 1
 
         return players[Consts.kWhite] - players[Consts.kBlack]
 
+    def evaluate_game(self, game_model: HiveGame) -> float:
+        """ Resolve various factors into a float evaluation of the model's position.
+        Positive for white advantage, negative for black. Looked up in, and added to, the evaluation cache if there is one """
+        if self.evaluation_cache is None:
+            return self._evaluate_model(game_model)
 
-if __name__ == '__main__':
-
-    from src.game.manager import HiveGameManager
-    import json
-    import time
-
-    hgm = HiveGameManager()
-
-    hgm.execute_turn({
-        'place piece': {'color': 'black', 'location': (0, 0), 'type': 'queen'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'white', 'location': (0, 2), 'type': 'queen'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'black', 'location': (-1, -1), 'type': 'beetle'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'white', 'location': (-1, 5), 'type': 'beetle'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'black', 'location': (1, -1), 'type': 'ant'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'white', 'location': (1, 3), 'type': 'ant'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'black', 'location': (0, -2), 'type': 'grasshopper'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'white', 'location': (0, 4), 'type': 'grasshopper'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'black', 'location': (2, 0), 'type': 'spider'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'white', 'location': (2, 2), 'type': 'spider'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'black', 'location': (3, -1), 'type': 'ant'}
-    })
-    hgm.execute_turn({
-        'place piece': {'color': 'white', 'location': (1, 1), 'type': 'ant'}
-    })
-    state_dict = json.loads(hgm.get_game_state())
-    e = Evaluator()
-
-    start = time.perf_counter()
-    counter = 0
-    for _ in range(50000):
-        eval = e.evaluate_board_state(state_dict)
-        e.reset()
-        counter += 1
-    print(f"Average execution time: {(time.perf_counter() - start) / counter}")
-
-
-# Full average exec time for 50k:            0.000122218022
-# No Queen average exec time for 50k:        0.0000744757
-# No Placed average exec time for 50k:       0.000104654179
-# No Movement average exec time for 50k:     0.00009311
+        position_key = game_model.position_hash
+        evaluation = self.evaluation_cache.get(position_key)
+        if evaluation is None:
+            evaluation = self._evaluate_model(game_model)
+            self.evaluation_cache.put(position_key, evaluation)
+        return evaluation
 
+    def evaluate_board_state(self, board_state: dict) -> float:
+        """ Evaluate a board state dict as packaged by HiveGameManager.get_raw_game_state(), by loading it into a model.
+        Only the pieces and turn counters of the dict are read. Positive for white advantage, negative for black """
+        if self.board_state_model is None:
+            self.board_state_model = HiveGame()
+        self.board_state_model.setup_board_state(board_state)
+        return self.evaluate_game(self.board_state_model)
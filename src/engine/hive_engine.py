@@ -1,77 +1,574 @@
 
 
 """
-pseudocode
-
-Computer plays white
-
-1. IF white on turn:
-    for step in range(3)
-        1. Generate list of all possible moves for (MOVE COLOR) -> move_list
-        2. Append moves to move branches
-        3. Make all possible moves in move_list
-        IF step == 3:
-            run eval function on final board state
-    choose highest (most positive for white) final eval state
-    commit to making the first move of the move list
-
-2. Data Structure:
-    Basic tree structure. Each Node in the tree has the following data:
-        - A board state dict
-        - A float evaluation of that board state
-        - A list of child nodes
-
-    Node methods:
-        -
+Engine search overview
+
+The engine searches the game tree depth-first with alpha-beta pruning, in negamax form: every score is from the point
+of view of the player on turn at that node, and a child's score is negated on the way back up. Positions are walked in
+place on a single game model with make_move()/unmake_move(), and scores are remembered in a transposition table keyed
+by position hash.
+
+1. For each possible move of the engine's color, search the opponent's replies to (search depth - 1)
+2. At depth 0, a quiescence search follows only the moves that crowd or free a queen, up to a node limit, and the
+   evaluator scores the positions where it stops. Won and lost positions score +/- kWin_score
+3. A branch is cut off as soon as it is proven worse than an alternative already searched (alpha-beta)
+4. Commit to the root move with the highest score
+
+Searches are iteratively deepened: depth 1, then 2, and so on up to the search depth. When the game is played with a
+clock (see the Gameplay section of the game config) each move gets a time budget, and the search stops at its deadline
+with the best move of the deepest search completed so far. Each iteration also seeds the transposition table with the
+best moves that the next, deeper iteration searches first.
+
+Positions found in the opening book (opening_book.py), once it has been compiled from saved games, are played from the
+book without any search.
+
+Move ordering (move_ordering.py) puts the likely best moves first, so that most branches are cut off early.
+
+With 'Pondering' set in the engine config, the engine also searches while the opponent is thinking: start_pondering()
+searches the opponent's position in a background thread, deeper and deeper, until stop_pondering() or the next reset().
+The search of the engine's reply then starts from a transposition table and evaluation cache that already hold most of
+the positions below the opponent's actual move.
+
+choose_move() may run on another thread than the one that owns the engine, such as a GUI's worker thread. Meanwhile,
+get_search_progress() reports the best move found so far, and stop_search() makes the search return that move at once.
+
+Each search leaves its measurements in the engine's search_stats (search_stats.py), and appends them to the JSON lines
+log named by 'Search log file' in the engine config, if any.
+
+With 'Worker processes' set in the engine config, root moves are spread across a pool of worker processes that lives as
+long as the engine does. The processes can share one transposition table in shared memory.
 """
+from src.game.consts import Consts
 from src.game.manager import HiveGameManager
+import src.game.functions as hive_funcs
+from src.engine.engine_config import get_config
 from src.engine.evaluator import Evaluator
-from src.engine.node import Node
+from src.engine.incremental_evaluator import IncrementalEvaluator
+from src.engine.evaluation_cache import EvaluationCache
+from src.engine.opening_book import OpeningBook
+from src.engine.search_stats import SearchStats
+from src.records.hive_recorder import HiveRecorder
+from src.engine.move_ordering import MoveOrderer
+from src.engine.transposition_table import TranspositionTable
+from src.engine.shared_transposition_table import SharedTranspositionTable
 
+from concurrent.futures import ProcessPoolExecutor, wait
+import math
+import multiprocessing
+import os
+import threading
 import time
 
 
+class SearchTimeout(Exception):
+    """ Raised inside a search that has run past its deadline, to unwind back to the root """
+    pass
+
+
 class BasicEngine:
     """ Very basic engine to flesh out concepts and interfaces. Can play a game. Cannot play well """
     search_depth: int
-    node_tree: Node
 
-    def __init__(self):
-        self.evaluator = Evaluator()
-        self.model_manager = HiveGameManager()
-        self.starting_board_state: dict = {}
+    kWin_score = 10000.0
+
+    # Time management
+    kMoves_to_go_estimate = 20  # Share of the remaining game clock spent on a single move is 1 / kMoves_to_go_estimate
+    kClock_safety_margin_s = 0.05
+    kMinimum_move_time_s = 0.01
+    kNext_iteration_time_fraction = 0.5  # Don't start a deeper iteration once this much of the budget is used up
+    kWorker_poll_interval_s = 0.05  # How often a parallel search checks for a stop while it waits on its worker processes
+
+    def __init__(self, config=None, game_config=None):
+        self.config_name = config
+        self.game_config_name = game_config
+        self.config = get_config(config)
+        self.evaluator = Evaluator(self.config)
+        self.transposition_table = TranspositionTable(self.config['kTransposition_table_mb'])
+        self.move_orderer = MoveOrderer()
+        self.model_manager = HiveGameManager(game_config)
+        self.evaluation_cache = EvaluationCache(self.config['kEvaluation_cache_entries']) if self.config['kEvaluation_cache_entries'] > 0 else None
+        self.incremental_evaluator = IncrementalEvaluator(self.config, self.model_manager.game_model, self.evaluation_cache)
         self.best_evaluation: float = 0
         self.name: str = "KOH_alpha_v1"
+        self.search_depth = 1
+        self.deadline: float = None
+        self.clock_remaining_s: float = float(self.model_manager.config['kTime_per_game'])
+        self.root_progress: tuple[dict, float] = ({}, -math.inf)  # Best move and score so far in the current iteration
+        self.completed_depth: int = 0
+        self.quiescence_nodes_left: int = 0
+        self.process_pool: ProcessPoolExecutor = None
+        self.worker_stop_event: multiprocessing.Event = None  # Set to stop the root moves running in the worker processes
+        self.opening_book: OpeningBook = self._open_opening_book()
+        self.ponder_thread: threading.Thread = None
+        self.stop_event = threading.Event()  # Set by stop_search()
+        self.search_progress: tuple[dict, float] = ({}, 0.0)  # Best move of the deepest completed iteration, and its evaluation for white
+        self.search_stats = SearchStats(self.name)
+        self.search_stats_baseline: tuple = ()  # Evaluation cache and rebuild counters at the start of the search
+        self.ponder_board_state: dict = None
 
-    def _get_node_board_state(self, _move_list: list[dict]) -> dict:
-        self.model_manager.set_board_state(self.starting_board_state)
-        for move in _move_list:
-            self.model_manager.execute_turn(move)
-        return self.model_manager.get_raw_game_state()
+    def _open_opening_book(self) -> OpeningBook:
+        """ The compiled opening book named in the engine config, or None if it has not been compiled """
+        book_path = os.path.join(HiveRecorder().saved_games_path, self.config['kOpening_book_file'])
+        return OpeningBook(book_path) if self.config['kOpening_book_file'] and os.path.isfile(book_path) else None
 
-    def choose_move(self):
-        """ This makes this engine 'basic'. Search everything for engine's moves, only 'best' moves for opponent """
+    def _get_book_move(self) -> dict:
+        """ The opening book's move for the starting position, if it has one that is legal here """
+        if self.opening_book is None:
+            return None
+        book_move = self.opening_book.get_move(self.model_manager.game_model, self.config['kOpening_book_min_games'])
+        return book_move if book_move in self._get_possible_moves() else None
 
-        nodes = Node({}, self.evaluator.evaluate_board_state(self.starting_board_state))
+    def _get_move_time_budget(self) -> float:
+        """ Seconds to spend searching the current move, or None when the game is played without any clock """
+        game_config = self.model_manager.config
+        budgets = []
+        if game_config['kTime_per_move'] > 0:
+            budgets.append(game_config['kTime_per_move'] - self.kClock_safety_margin_s)
+        if game_config['kTime_per_game'] > 0:
+            budgets.append(self.clock_remaining_s / self.kMoves_to_go_estimate + game_config['kTime_increment_per_move'])
+            budgets.append(self.clock_remaining_s - self.kClock_safety_margin_s)
+        return max(self.kMinimum_move_time_s, min(budgets)) if budgets else None
 
+    def _check_deadline(self) -> None:
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop_event.is_set():
+            raise SearchTimeout()
+
+    def _get_possible_moves(self) -> list[dict]:
         start = time.perf_counter()
-        for generation in range(5):
+        moves = self.model_manager.get_possible_moves()
+        self.search_stats.move_generation_s += time.perf_counter() - start
+        return moves
+
+    def _get_terminal_score(self) -> float:
+        """ Score of a finished game for the player on turn, or None if the game is still being played """
+        game_model = self.model_manager.game_model
+        is_white_wins, is_black_wins = game_model.is_white_wins, game_model.is_black_wins
+        if not (is_white_wins or is_black_wins):
+            return None
+        if is_white_wins and is_black_wins:
+            return 0.0
+        return self.kWin_score if is_white_wins == (game_model.player_on_turn == Consts.kWhite) else -self.kWin_score
+
+    def _evaluate(self) -> float:
+        """ Static evaluation of the model's position for the player on turn. The evaluator scores white positive """
+        start = time.perf_counter()
+        evaluation = self.incremental_evaluator.evaluate()
+        self.search_stats.evaluation_s += time.perf_counter() - start
+        self.search_stats.leaf_evaluations += 1
+        return evaluation if self.model_manager.game_model.player_on_turn == Consts.kWhite else -evaluation
+
+    def _get_forcing_moves(self) -> list[dict]:
+        """
+        Moves of the player on turn that change how boxed in either queen is: moves that add a neighbor to a queen or
+        take one away, beetles climbing onto a queen or one of its neighbors, and queen moves
+        """
+        game_model = self.model_manager.game_model
+        queen_neighbors = [hive_funcs.get_surrounding_hex_indexes(queen.location) for queen in (game_model.white_queen, game_model.black_queen) if queen.location]
+        if not queen_neighbors:
+            return []
+        queen_locations = {game_model.white_queen.location, game_model.black_queen.location}
+
+        forcing_moves = []
+        for move in self._get_possible_moves():
+            if 'place piece' in move:
+                is_forcing = any(tuple(move['place piece']['location']) in neighbors for neighbors in queen_neighbors)
+            else:
+                from_hex, to_hex = tuple(move['move piece']['from']), tuple(move['move piece']['to'])
+                is_vacating = len(game_model.stacks[from_hex]) == 1
+                is_climbing = to_hex in game_model.occupied_locations
+                is_forcing = from_hex in queen_locations or to_hex in queen_locations or \
+                    any((to_hex in neighbors) != (from_hex in neighbors and is_vacating) or (is_climbing and to_hex in neighbors) for neighbors in queen_neighbors)
+            if is_forcing:
+                forcing_moves.append(move)
+        return forcing_moves
+
+    def _quiescence(self, alpha: float, beta: float, ply: int) -> float:
+        """
+        Search only forcing moves (see _get_forcing_moves) past the search depth, so that a queen about to be surrounded is
+        not misjudged by the static evaluation. The player on turn may always stand pat on the static evaluation instead.
+        At most kQuiescence_node_limit positions are searched below each leaf of the main search
+        """
+        self._check_deadline()
+        self.search_stats.nodes += 1
+        self.search_stats.quiescence_nodes += 1
+        terminal_score = self._get_terminal_score()
+        if terminal_score is not None:
+            return terminal_score
+        best_score = self._evaluate()
+        if best_score >= beta or self.quiescence_nodes_left <= 0:
+            return best_score
+
+        game_model = self.model_manager.game_model
+        alpha = max(alpha, best_score)
+        for move in self.move_orderer.order_moves(self._get_forcing_moves(), game_model, ply):
+            if self.quiescence_nodes_left <= 0:
+                break
+            self.quiescence_nodes_left -= 1
+            game_model.make_move(move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game_model.unmake_move()
+
+            best_score = max(best_score, score)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_score
+
+    def _negamax(self, depth: int, alpha: float, beta: float, ply: int) -> float:
+        """ Alpha-beta search of the model's position. Returns the score for the player on turn """
+        self._check_deadline()
+        terminal_score = self._get_terminal_score()
+        if terminal_score is not None:
+            return terminal_score
+        if depth <= 0:
+            self.quiescence_nodes_left = self.config['kQuiescence_node_limit']
+            return self._quiescence(alpha, beta, ply)
+
+        search_stats = self.search_stats
+        search_stats.nodes += 1
+        game_model = self.model_manager.game_model
+        position_hash = game_model.position_hash
+        known_position = self.transposition_table.probe(position_hash)
+        search_stats.transposition_probes += 1
+        if known_position:
+            search_stats.transposition_hits += 1
+        if known_position and known_position.depth >= depth:
+            if known_position.bound == TranspositionTable.kExact:
+                search_stats.transposition_cutoffs += 1
+                return known_position.score
+            elif known_position.bound == TranspositionTable.kLower_bound:
+                alpha = max(alpha, known_position.score)
+            else:
+                beta = min(beta, known_position.score)
+            if alpha >= beta:
+                search_stats.transposition_cutoffs += 1
+                return known_position.score
+
+        moves = self._get_possible_moves()
+        if not moves:
+            return self._evaluate()
+
+        original_alpha = alpha
+        best_score, best_move = -math.inf, None
+        hash_move = known_position.move if known_position else None
+        for move in self.move_orderer.order_moves(moves, game_model, ply, hash_move):
+            game_model.make_move(move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game_model.unmake_move()
+
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.move_orderer.record_cutoff(move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            bound = TranspositionTable.kUpper_bound
+        elif best_score >= beta:
+            bound = TranspositionTable.kLower_bound
+        else:
+            bound = TranspositionTable.kExact
+        self.transposition_table.store(position_hash, depth, bound, best_score, best_move)
+        return best_score
+
+    def _search_root_move(self, move: dict, depth: int, alpha: float) -> float:
+        """ Score a single move from the model's position, searched to depth, for the player making the move """
+        game_model = self.model_manager.game_model
+        game_model.make_move(move)
+        try:
+            return -self._negamax(depth - 1, -math.inf, -alpha, 1)
+        finally:
+            game_model.unmake_move()
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """
+        Worker processes are started on first use and then kept for every later search.
 
-            for node, move_list in nodes.get_node():
-                new_node_game_state = self._get_node_board_state(move_list)
-                for move in self.model_manager.generate_all_possible_moves(new_node_game_state):
-                    self.model_manager.set_board_state(new_node_game_state)
-                    self.model_manager.execute_turn(move)
-                    node.add_child(move, self.evaluator.evaluate_board_state(self.model_manager.get_raw_game_state()))
+        Unless the search must be deterministic, the engine's transposition table moves into shared memory at the same
+        time, and every worker attaches to it. Shared results depend on the timing of the workers, so deterministic
+        searches keep a private table in each process instead.
+        """
+        if self.process_pool is None:
+            shared_table_name = None
+            if self.config['kIs_shared_transposition_table'] and not self.config['kIs_deterministic_search']:
+                self.transposition_table = SharedTranspositionTable(self.config['kTransposition_table_mb'])
+                shared_table_name = self.transposition_table.name
+            self.worker_stop_event = multiprocessing.Event()
+            self.process_pool = ProcessPoolExecutor(max_workers=self.config['kWorker_processes'], initializer=_init_search_worker,
+                                                    initargs=(self.config_name, self.game_config_name, shared_table_name, self.worker_stop_event))
+        return self.process_pool
 
-                if generation % 2:
-                    node.keep_best_child()
+    def _search_root_moves_in_parallel(self, moves: list[dict], depth: int) -> None:
+        """
+        Young brothers wait: the first (expected best) root move is searched alone, then its score bounds the searches
+        of all the other root moves, which are spread across the worker processes. Each worker is handed the compact
+        position. With deterministic search, workers also start every root move from empty tables, so results never
+        depend on which worker happens to pick up which move.
 
-        print(f"That took {time.perf_counter() - start} seconds")
-        best_move, self.best_evaluation = nodes.find_best_move()
+        While waiting on the workers, the search keeps checking its deadline and stop_search(). When it stops, the
+        workers' own searches are stopped through worker_stop_event, and are waited for, so that none of them is still
+        running when the next search submits its moves.
+        """
+        game_model = self.model_manager.game_model
+        process_pool = self._get_process_pool()
+        first_score = self._search_root_move(moves[0], depth, -math.inf)
+        self.root_progress = (moves[0], first_score)
+
+        compact_state = game_model.get_compact_state()
+        wall_clock_deadline = time.time() + (self.deadline - time.perf_counter()) if self.deadline is not None else None
+        self.worker_stop_event.clear()
+        futures = [process_pool.submit(_search_root_move_in_worker, compact_state, move, depth, first_score, self.config['kIs_deterministic_search'],
+                                       self.transposition_table.generation, wall_clock_deadline) for move in moves[1:]]
+        try:
+            for move, future in zip(moves[1:], futures):
+                while not wait([future], timeout=self.kWorker_poll_interval_s).done:
+                    self._check_deadline()
+                score = future.result()
+                if score is None:
+                    raise SearchTimeout()
+                self._check_deadline()
+                if score > self.root_progress[1]:
+                    self.root_progress = (move, score)
+        finally:
+            self.worker_stop_event.set()
+            [future.cancel() for future in futures]
+            wait(futures)
+
+    def _search_root(self, depth: int, is_parallel: bool = True) -> tuple[dict, float]:
+        """ Search every move from the starting position. Returns the best move and its score for the engine """
+        game_model = self.model_manager.game_model
+        known_position = self.transposition_table.probe(game_model.position_hash)
+        hash_move = known_position.move if known_position else None
+        moves = self.move_orderer.order_moves(self._get_possible_moves(), game_model, 0, hash_move)
+
+        self.root_progress = ({}, -math.inf)
+        if is_parallel and self.config['kWorker_processes'] > 0 and len(moves) > 1:
+            self._search_root_moves_in_parallel(moves, depth)
+        else:
+            alpha = -math.inf
+            for move in moves:
+                score = self._search_root_move(move, depth, alpha)
+                if score > self.root_progress[1]:
+                    self.root_progress = (move, score)
+                alpha = max(alpha, score)
+
+        best_move, best_score = self.root_progress
+        if moves:
+            self.transposition_table.store(game_model.position_hash, depth, TranspositionTable.kExact, best_score, best_move)
+        return best_move, best_score
+
+    def choose_move(self):
+        """
+        Search the starting position with iterative deepening, up to search_depth or until the move's time budget runs
+        out. Return the best move found in the execute_turn() format
+        """
+        start = time.perf_counter()
+        self._start_search_stats()
+        self.transposition_table.new_search()
+        self.move_orderer.reset()
+        time_budget = self._get_move_time_budget()
+        self.deadline = start + time_budget if time_budget is not None else None
+
+        # Always have a move ready, even if the first iteration cannot finish in time
+        possible_moves = self._get_possible_moves()
+        best_move, best_score = (possible_moves[0] if possible_moves else {}), self._evaluate()
+        self.completed_depth = 0
+        white_sign = 1.0 if self.model_manager.game_model.player_on_turn == Consts.kWhite else -1.0
+        self.search_progress = (best_move, white_sign * best_score)
+
+        # Known openings are played from the book without searching
+        book_move = self._get_book_move()
+        if book_move is not None:
+            best_move, possible_moves = book_move, []
+            self.search_stats.is_book_move = True
+
+        for depth in range(1, max(1, self.search_depth) + 1 if possible_moves else 0):
+            try:
+                nodes_before_iteration = self.search_stats.nodes
+                best_move, best_score = self._search_root(depth)
+                self.completed_depth = depth
+                self.search_progress = (best_move, white_sign * best_score)
+                self.search_stats.nodes_per_depth[depth] = self.search_stats.nodes - nodes_before_iteration
+            except SearchTimeout:
+                # The previous iteration's best move is searched first, so any move completed at this depth is sound
+                if self.root_progress[0]:
+                    best_move, best_score = self.root_progress
+                break
+
+            if abs(best_score) >= self.kWin_score:
+                break
+            if time_budget is not None and time.perf_counter() - start > time_budget * self.kNext_iteration_time_fraction:
+                break
+
+        self.deadline = None
+        self.stop_event.clear()
+        elapsed = time.perf_counter() - start
+        if self.model_manager.config['kTime_per_game'] > 0:
+            self.clock_remaining_s += self.model_manager.config['kTime_increment_per_move'] - elapsed
+
+        self.best_evaluation = white_sign * best_score
+        self.search_stats.completed_depth = self.completed_depth
+        self.search_stats.principal_variation = self._get_principal_variation(best_move, max(1, self.completed_depth))
+        self._finish_search_stats(best_move, elapsed)
         return best_move
 
+    def _get_principal_variation(self, best_move: dict, max_length: int) -> list[dict]:
+        """ The best move, followed by the line of best replies that the transposition table holds below it """
+        game_model = self.model_manager.game_model
+        variation = []
+        move = best_move
+        try:
+            while move and len(variation) < max_length and move in self.model_manager.get_possible_moves():
+                game_model.make_move(move)
+                variation.append(move)
+                known_position = self.transposition_table.probe(game_model.position_hash)
+                move = known_position.move if known_position and self._get_terminal_score() is None else None
+        finally:
+            for _ in variation:
+                game_model.unmake_move()
+        return variation
+
+    def _start_search_stats(self) -> None:
+        """ New stats for the search about to start from the model's position """
+        self.search_stats = SearchStats(self.name, self.model_manager.game_model.position_hash)
+        evaluation_cache = self.evaluation_cache
+        self.search_stats_baseline = (evaluation_cache.hits if evaluation_cache else 0, evaluation_cache.misses if evaluation_cache else 0,
+                                      self.incremental_evaluator.rebuild_count, self.incremental_evaluator.rebuild_time_s)
+
+    def _finish_search_stats(self, best_move: dict, elapsed: float) -> None:
+        """ Complete the search's stats with its result and the evaluator's counters, and log them if configured to """
+        search_stats = self.search_stats
+        search_stats.elapsed_s = elapsed
+        search_stats.best_move = best_move
+        search_stats.best_evaluation = self.best_evaluation
+        cache_hits, cache_misses, rebuilds, rebuild_s = self.search_stats_baseline
+        if self.evaluation_cache is not None:
+            search_stats.evaluation_cache_hits = self.evaluation_cache.hits - cache_hits
+            search_stats.evaluation_cache_misses = self.evaluation_cache.misses - cache_misses
+        search_stats.rebuilds = self.incremental_evaluator.rebuild_count - rebuilds
+        search_stats.rebuild_s = self.incremental_evaluator.rebuild_time_s - rebuild_s
+        if self.config['kSearch_log_file']:
+            search_stats.write_json_line(self.config['kSearch_log_file'])
+
+    def get_search_progress(self) -> tuple[dict, float]:
+        """ Best move found so far by the running choose_move(), and its evaluation for white. Safe to call from any thread """
+        return self.search_progress
+
+    def stop_search(self) -> None:
+        """
+        Make the running search return as soon as it can: choose_move() with its best move so far, pondering with
+        nothing. May be called from any thread
+        """
+        self.stop_event.set()
+
+    def _ponder(self, search_depth: int) -> None:
+        """
+        Body of the pondering thread. Searches the opponent's position one ply deeper than the engine's own search
+        depth, so that every reply of the engine is searched to its full depth below each opponent move. Searches run
+        in this thread only, which leaves the worker processes free for the search of the engine's own move
+        """
+        self.search_stats = SearchStats(self.name, self.model_manager.game_model.position_hash)
+        self.transposition_table.new_search()
+        self.move_orderer.reset()
+        try:
+            for depth in range(1, max(1, search_depth) + 2):
+                self._search_root(depth, is_parallel=False)
+        except SearchTimeout:
+            pass
+
+    def start_pondering(self, board_state: dict, search_depth: int) -> None:
+        """ Search the opponent's position in the background, until stop_pondering(). Does nothing if already pondering it """
+        if self.ponder_thread is not None and board_state == self.ponder_board_state:
+            return
+        self.stop_pondering()
+        self.stop_event.clear()  # A stop_search() that came after the last search ended must not stop this one
+        self.model_manager.set_board_state(board_state)
+        if self._get_terminal_score() is not None:
+            return
+        self.ponder_board_state = board_state
+        self.ponder_thread = threading.Thread(target=self._ponder, args=(search_depth,), name=f'{self.name} pondering', daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self) -> None:
+        """ Stop the pondering thread, if one is running, and wait for it to unwind off the engine's model """
+        if self.ponder_thread is None:
+            return
+        self.stop_search()
+        self.ponder_thread.join()
+        self.stop_event.clear()
+        self.ponder_thread = None
+        self.ponder_board_state = None
+
+    def close(self) -> None:
+        """ Stop pondering and shut down the worker processes of parallel search, if any were started. Close the opening book """
+        self.stop_pondering()
+        if self.opening_book is not None:
+            self.opening_book.close()
+            self.opening_book = None
+        if self.process_pool is not None:
+            self.worker_stop_event.set()
+            self.process_pool.shutdown(cancel_futures=True)
+            self.process_pool = None
+            self.worker_stop_event = None
+        if isinstance(self.transposition_table, SharedTranspositionTable):
+            self.transposition_table.close()
+            self.transposition_table.unlink()
+            self.transposition_table = TranspositionTable(self.config['kTransposition_table_mb'])
+
+    def new_game(self) -> None:
+        """ Forget what earlier games left behind: the transposition table, killer and history moves, and the game clock """
+        self.stop_pondering()
+        self.transposition_table.clear()
+        self.move_orderer.reset()
+        self.clock_remaining_s = float(self.model_manager.config['kTime_per_game'])
+
     def reset(self, new_board_state, search_depth):
-        if new_board_state != self.starting_board_state:
-            self.starting_board_state = new_board_state
-            self.search_depth = search_depth
+        """
+        Load the position to search from into the engine's model. Forgets any stop_search() that came after the last
+        search ended, such as a Move Now click on a search that had just finished
+        """
+        self.stop_pondering()
+        self.stop_event.clear()
+        self.search_depth = search_depth
+        self.model_manager.set_board_state(new_board_state)
+        game_model = self.model_manager.game_model
+
+        # The engine's first move of a game starts a fresh game clock
+        engine_turns = game_model.white_turn_counter if game_model.player_on_turn == Consts.kWhite else game_model.black_turn_counter
+        if engine_turns == 0:
+            self.clock_remaining_s = float(self.model_manager.config['kTime_per_game'])
+
+
+# Parallel search worker processes each hold one engine of their own, created when the process starts
+_worker_engine: BasicEngine = None
+
+
+def _init_search_worker(config_name: str, game_config_name: str, shared_table_name: str, stop_event: multiprocessing.Event) -> None:
+    global _worker_engine
+    _worker_engine = BasicEngine(config_name, game_config_name)
+    _worker_engine.stop_event = stop_event  # Shared with the engine that owns the pool, which sets it to stop the worker's search
+    if shared_table_name:
+        _worker_engine.transposition_table = SharedTranspositionTable.attach(shared_table_name)
+
+
+def _search_root_move_in_worker(compact_state: tuple, move: dict, depth: int, alpha: float, is_deterministic: bool, generation: int, wall_clock_deadline: float) -> float:
+    """ Score one root move in a worker process. Returns None if the search ran out of time or was stopped """
+    _worker_engine.model_manager.game_model.setup_compact_state(compact_state)
+    if is_deterministic:
+        _worker_engine.transposition_table.clear()
+        _worker_engine.move_orderer.reset()
+    _worker_engine.transposition_table.generation = generation
+    _worker_engine.deadline = time.perf_counter() + (wall_clock_deadline - time.time()) if wall_clock_deadline is not None else None
+    try:
+        return _worker_engine._search_root_move(move, depth, alpha)
+    except SearchTimeout:
+        return None
+    finally:
+        _worker_engine.deadline = None
@@ -0,0 +1,320 @@
+"""
+Board evaluation that follows a game model move by move, instead of starting over from a board state dict
+
+Evaluator.evaluate_game() scores every term for both colors from scratch. IncrementalEvaluator listens to a HiveGame's make_move() / unmake_move(), and on each one only revisits the hexes
+the move touched:
+
+    Pieces in play      counts per color and type, kept per hex stack
+    Beetle stacks       counts of (top color, buried piece's side, buried type), kept per hex stack
+    Placements          the set of placement hexes per color, from counts of neighboring stack tops per color
+    Queen liberties     rescored only when a move touches a hex within two steps of that queen
+    Mobility            the moves of the piece on top of every hex, kept per hex
+    Slides              the empty hexes each empty hex next to the hive can slide to, kept per hex
+
+Moves are brought up to date at each evaluate(), for the pieces that the hexes touched since the last one can affect.
+A slide only depends on its two hexes and the two hexes beside both, so queens and beetles are affected by hexes one
+step away, and ants and spiders by hexes one step away from any hex their last walk along the hive went through.
+Grasshoppers are affected along their six lines. Every piece whose pinned status changed, and every piece of a color
+whose queen was just placed or taken back, is also updated. The mobility terms, including the moves next to each
+queen, are then summed from the kept moves, as is the turn bonus. Scores equal evaluate_game() for the same position.
+
+Ants and spiders walk the kept slides instead of generating every slide along the way again. Only the slides around
+the walking piece's own hex, which it leaves empty when it lifts off, are worked out during the walk.
+
+Any board change that does not go through make_move() / unmake_move(), such as setup_board_state(), is noticed by
+position hash and answered with a full rebuild.
+"""
+from src.game.consts import Consts
+from src.game.model import HiveGame
+from src.engine.evaluator import Evaluator
+from src.engine.evaluation_cache import EvaluationCache
+from src.game.pieces import HivePiece
+import src.game.functions as hive_funcs
+
+import time
+
+
+class IncrementalEvaluator(Evaluator):
+    """ Evaluation of one game model's current position, scored by the Evaluator terms. Positive for white advantage """
+
+    kColors = (Consts.kWhite, Consts.kBlack)
+    kMobility_reach = {'queen': 1, 'beetle': 1}  # Farthest hex, in steps, whose occupancy can change the piece's moves
+    kWalking_pieces = ('ant', 'spider')  # Pieces that move by walking the kept slides
+
+    # For each direction: the step to the neighbor that way, and the steps to the two hexes beside both hexes
+    kSlide_steps = [(step, Consts.neighboring_hex_offsets[index - 1], Consts.neighboring_hex_offsets[(index + 1) % 6])
+                    for index, step in enumerate(Consts.neighboring_hex_offsets)]
+
+    def __init__(self, config: dict, game_model: HiveGame, evaluation_cache: EvaluationCache = None):
+        super().__init__(config, evaluation_cache)
+        self.game_model = game_model
+        self.top_colors: dict[tuple, str] = dict()  # hex -> color of the piece on top
+        self.top_color_neighbors: dict[str, dict[tuple, int]] = {color: dict() for color in self.kColors}  # hex -> stack tops of a color next to it
+        self.placements: dict[str, set[tuple]] = {color: set() for color in self.kColors}
+        self.stack_features: dict[tuple, list[tuple]] = dict()  # hex -> in-play and beetle features of its stack
+        self.feature_counts: dict[tuple, int] = dict()
+        self.queen_scores: dict[str, float] = {color: None for color in self.kColors}  # None until (re)scored
+        self.changed_locations_stack: list[set[tuple]] = []  # Hexes touched by each move made since the last rebuild
+        self.piece_counts: dict[str, int] = dict()
+        self.moves_by_location: dict[tuple, set[tuple]] = dict()  # hex -> moves of its top piece, as of the last evaluate()
+        self.mobility_pieces: dict[tuple, HivePiece] = dict()  # hex -> the piece whose moves are kept for it
+        self.walked_locations: dict[tuple, set[tuple]] = dict()  # hex -> hexes the walk of its ant or spider went through
+        self.slide_locations: dict[tuple, list[tuple]] = dict()  # empty hex -> empty hexes it can slide to
+        self.mobility_changed_locations: set[tuple] = set()  # Hexes touched since the kept moves were last brought up to date
+        self.mobility_pinned_locations: set[tuple] = set()
+        self.mobility_movable_colors: dict[str, bool] = dict()
+        self.mobility_update_count: int = 0  # Pieces whose moves were generated again
+        self.synced_position_hash: int = None
+        self.rebuild_count: int = 0
+        self.rebuild_time_s: float = 0.0
+        game_model.move_listeners.append(self)
+
+    def _get_stack_features(self, location: tuple) -> list[tuple]:
+        """ ('in play', color, type) for every piece of a stack, and ('beetle', top color, side, type) for every buried piece """
+        stack = self.game_model.stacks.get(location, [])
+        features = [('in play', piece.color, str(piece)) for piece in stack]
+        if len(stack) > 1:
+            top_color = stack[-1].color
+            features.extend(('beetle', top_color, 'friendly' if piece.color == top_color else 'enemy', str(piece)) for piece in stack[:-1])
+        return features
+
+    def _resync_locations(self, locations: set[tuple]) -> None:
+        """ Bring every per-hex record for a set of hexes, and the placement hexes around them, up to date with the model """
+        stacks = self.game_model.stacks
+        placement_candidates = set()
+        for location in locations:
+            for feature in self.stack_features.pop(location, []):
+                self.feature_counts[feature] -= 1
+            features = self._get_stack_features(location)
+            if features:
+                self.stack_features[location] = features
+                for feature in features:
+                    self.feature_counts[feature] = self.feature_counts.get(feature, 0) + 1
+
+            old_top_color = self.top_colors.get(location)
+            new_top_color = stacks[location][-1].color if location in stacks else None
+            surrounding_locations = hive_funcs.get_surrounding_hex_indexes(location)
+            if old_top_color != new_top_color:
+                for neighbor in surrounding_locations:
+                    if old_top_color:
+                        self.top_color_neighbors[old_top_color][neighbor] -= 1
+                    if new_top_color:
+                        self.top_color_neighbors[new_top_color][neighbor] = self.top_color_neighbors[new_top_color].get(neighbor, 0) + 1
+                if new_top_color:
+                    self.top_colors[location] = new_top_color
+                else:
+                    del self.top_colors[location]
+            placement_candidates.add(location)
+            placement_candidates.update(surrounding_locations)
+        self.mobility_changed_locations.update(locations)
+
+        # A hex is a placement hex for a color when it is empty, and touches that color's pieces but not the other's
+        white_neighbors, black_neighbors = self.top_color_neighbors[Consts.kWhite], self.top_color_neighbors[Consts.kBlack]
+        for location in placement_candidates:
+            is_empty = location not in stacks
+            white_count, black_count = white_neighbors.get(location, 0), black_neighbors.get(location, 0)
+            for color, is_placement in ((Consts.kWhite, is_empty and white_count and not black_count),
+                                        (Consts.kBlack, is_empty and black_count and not white_count)):
+                if is_placement:
+                    self.placements[color].add(location)
+                else:
+                    self.placements[color].discard(location)
+
+        # Queen liberties only depend on hexes up to two steps away from the queen
+        for color, queen in ((Consts.kWhite, self.game_model.white_queen), (Consts.kBlack, self.game_model.black_queen)):
+            if not queen.location or any(hive_funcs.get_hex_distance(queen.location, location) <= 2 for location in locations):
+                self.queen_scores[color] = None
+
+    def rebuild(self) -> None:
+        """ Recompute every record from scratch for the model's current position """
+        start = time.perf_counter()
+        self.top_colors = dict()
+        self.top_color_neighbors = {color: dict() for color in self.kColors}
+        self.placements = {color: set() for color in self.kColors}
+        self.stack_features = dict()
+        self.feature_counts = dict()
+        self.queen_scores = {color: None for color in self.kColors}
+        self.changed_locations_stack = []
+        self.piece_counts = {color: len([piece for piece in self.game_model.pieces if piece.color == color]) for color in self.kColors}
+        self.moves_by_location = dict()
+        self.mobility_pieces = dict()
+        self.walked_locations = dict()
+        self.slide_locations = dict()
+        self._resync_locations(set(self.game_model.stacks))
+        self.synced_position_hash = self.game_model.position_hash
+        self.rebuild_count += 1
+        self.rebuild_time_s += time.perf_counter() - start
+
+    def on_make_move(self, move: dict[str, dict], previous_position_hash: int) -> None:
+        if self.synced_position_hash != previous_position_hash:
+            # The records were already behind the model before this move
+            self.synced_position_hash = None
+            return
+        if 'place piece' in move:
+            changed_locations = {tuple(move['place piece']['location'])}
+        else:
+            changed_locations = {tuple(move['move piece']['from']), tuple(move['move piece']['to'])}
+        self.changed_locations_stack.append(changed_locations)
+        self._resync_locations(changed_locations)
+        self.synced_position_hash = self.game_model.position_hash
+
+    def on_unmake_move(self, previous_position_hash: int) -> None:
+        if self.synced_position_hash != previous_position_hash or not self.changed_locations_stack:
+            # The records were behind the model, or the move being taken back was made before the last rebuild
+            self.synced_position_hash = None
+            return
+        self._resync_locations(self.changed_locations_stack.pop())
+        self.synced_position_hash = self.game_model.position_hash
+
+    def get_placement_locations(self, color: str) -> set[tuple]:
+        """ The color's placement hexes. The first turn of each color has its own placement rules, left to the model """
+        game_model = self.game_model
+        if (color == Consts.kBlack and game_model.black_turn_counter == 0) or \
+                (color == Consts.kWhite and game_model.black_turn_counter == 1 and game_model.white_turn_counter == 0):
+            return game_model.get_piece_placement_locations(color)
+        return self.placements[color]
+
+    @classmethod
+    def _get_slides(cls, location: tuple, occupied_locations: set[tuple]) -> list[tuple]:
+        """ Empty hexes next to location that a piece can slide to: exactly one of the two hexes beside both is occupied """
+        x, y = location
+        slides = []
+        for (step_x, step_y), (left_x, left_y), (right_x, right_y) in cls.kSlide_steps:
+            to_location = (x + step_x, y + step_y)
+            if to_location not in occupied_locations and \
+                    ((x + left_x, y + left_y) in occupied_locations) != ((x + right_x, y + right_y) in occupied_locations):
+                slides.append(to_location)
+        return slides
+
+    def _update_slides(self, changed_locations: set[tuple]) -> None:
+        """ Work out the slides again from every hex next to a changed hex, the only slides a change can alter """
+        occupied_locations = self.game_model.occupied_locations
+        for location in set().union(*[hive_funcs.get_surrounding_hex_indexes(changed) | {changed} for changed in changed_locations]):
+            slides = self._get_slides(location, occupied_locations) if location not in occupied_locations else None
+            if slides:
+                self.slide_locations[location] = slides
+            else:
+                self.slide_locations.pop(location, None)
+
+    def _walk(self, location: tuple, is_spider: bool) -> tuple[set[tuple], set[tuple]]:
+        """
+        Moves of the ant or spider on top of location, as get_all_slidable_moves() finds them, and the hexes walked
+        through. The piece's own hex and its neighbors slide differently once the piece lifts off, so their slides are
+        worked out on the board without it
+        """
+        lifted_locations = self.game_model.occupied_locations.difference({location})
+        lifted_area = hive_funcs.get_surrounding_hex_indexes(location) | {location}
+        slide_locations = self.slide_locations
+
+        def get_slides(from_location):
+            return self._get_slides(from_location, lifted_locations) if from_location in lifted_area else slide_locations.get(from_location, ())
+
+        walked_locations = {location}
+        layer = set(get_slides(location))
+        reached_locations = set(layer)
+        steps = 1
+        while layer and not (is_spider and steps == 3):
+            walked_locations.update(layer)
+            next_layer = set()
+            for from_location in layer:
+                next_layer.update(get_slides(from_location))
+            layer = next_layer.difference(reached_locations)
+            reached_locations.update(layer)
+            steps += 1
+        if is_spider:
+            return layer, walked_locations
+        reached_locations.discard(location)
+        return reached_locations, walked_locations
+
+    def _is_mobility_affected(self, piece_type: str, location: tuple, changed_areas: list[set[tuple]]) -> bool:
+        """ Can a change to any of the hexes change the moves of the piece on top of location. changed_areas: each changed hex and its neighbors """
+        if piece_type in self.kWalking_pieces:
+            walked_locations = self.walked_locations[location]
+            return any(not walked_locations.isdisjoint(changed_area) for changed_area in changed_areas)
+        changed_locations = self.mobility_changed_locations
+        if piece_type == 'grasshopper':
+            return any(changed[0] == location[0] or abs(changed[0] - location[0]) == abs(changed[1] - location[1]) for changed in changed_locations)
+        if piece_type not in self.kMobility_reach:
+            return bool(changed_locations)
+        reach = self.kMobility_reach[piece_type]
+        return any(hive_funcs.get_hex_distance(location, changed) <= reach for changed in changed_locations)
+
+    def _get_moves_by_location(self) -> dict[tuple, set[tuple]]:
+        """ Moves of the piece on top of every occupied hex, generated again only for the pieces whose moves may have changed """
+        game_model = self.game_model
+        pinned_locations = game_model.pinned_locations
+        pinned_changes = pinned_locations.symmetric_difference(self.mobility_pinned_locations)
+        movable_colors = {color: bool(self._get_queen(game_model, color).location) for color in self.kColors}
+        changed_locations = self.mobility_changed_locations
+        changed_areas = [hive_funcs.get_surrounding_hex_indexes(changed) | {changed} for changed in changed_locations]
+        self._update_slides(changed_locations)
+        for location in [location for location in self.moves_by_location if location not in game_model.stacks]:
+            del self.moves_by_location[location]
+            del self.mobility_pieces[location]
+            self.walked_locations.pop(location, None)
+
+        for location, stack in game_model.stacks.items():
+            piece = stack[-1]
+            piece_type = str(piece)
+            if self.mobility_pieces.get(location) is not piece or location in pinned_changes or \
+                    movable_colors[piece.color] != self.mobility_movable_colors.get(piece.color) or \
+                    self._is_mobility_affected(piece_type, location, changed_areas):
+                if piece_type not in self.kWalking_pieces:
+                    self.moves_by_location[location] = game_model.get_piece_movement_locations(location)
+                    self.walked_locations.pop(location, None)
+                elif movable_colors[piece.color] and location not in pinned_locations:
+                    self.moves_by_location[location], self.walked_locations[location] = self._walk(location, piece_type == 'spider')
+                else:
+                    self.moves_by_location[location], self.walked_locations[location] = set(), {location}
+                self.mobility_pieces[location] = piece
+                self.mobility_update_count += 1
+
+        self.mobility_changed_locations = set()
+        self.mobility_pinned_locations = set(pinned_locations)
+        self.mobility_movable_colors = movable_colors
+        return self.moves_by_location
+
+    def evaluate(self) -> float:
+        """ Evaluation of the model's position. Positive for white advantage, negative for black """
+        return self.evaluate_game(self.game_model)
+
+    def sync(self) -> dict[tuple, set[tuple]]:
+        """ Bring the records up to date with the model's position. Returns the moves of the piece on top of every hex """
+        if self.synced_position_hash != self.game_model.position_hash:
+            self.rebuild()
+        return self._get_moves_by_location()
+
+    def _evaluate_model(self, game_model: HiveGame) -> float:
+        if game_model is not self.game_model:
+            return super()._evaluate_model(game_model)
+
+        moves_by_location = self.sync()
+        players = dict()
+        for color in self.kColors:
+            if self.queen_scores[color] is None:
+                self.queen_scores[color] = self._get_queen_eval(game_model, color)
+
+            placed_counts, beetle_tally = dict(), 0.0
+            for feature, count in self.feature_counts.items():
+                if not count or feature[1] != color:
+                    continue
+                if feature[0] == 'in play':
+                    placed_counts[feature[2]] = count
+                elif feature[2] == 'friendly':
+                    beetle_tally -= count * self.config[f'kBeetle_on_friendly_{feature[3]}_penalty']
+                else:
+                    beetle_tally += count * self.config[f'kBeetle_on_enemy_{feature[3]}_bonus']
+            unplaced_count = self.piece_counts[color] - sum(placed_counts.values())
+
+            player_evaluation = 0.0
+            player_evaluation += self.queen_scores[color]
+            player_evaluation += self._get_played_pieces_eval(placed_counts)
+            player_evaluation += self._get_movement_eval(game_model, color, moves_by_location)
+            player_evaluation += self._get_placements_eval(game_model, color, unplaced_count, self.get_placement_locations(color) if unplaced_count else None)
+            player_evaluation += self._get_captures_eval()
+            player_evaluation += beetle_tally
+            player_evaluation += self._get_queen_adjustments_eval()
+            player_evaluation += self._get_misc_eval(game_model, color)
+            players[color] = player_evaluation
+
+        return players[Consts.kWhite] - players[Consts.kBlack]
@@ -0,0 +1,276 @@
+"""
+Monte Carlo Tree Search engine
+
+An alternative to BasicEngine's alpha-beta search, that needs no more from the evaluator than a tie-break at the end
+of long playouts. Every iteration:
+
+1. Selection: from the root, follow the child with the highest UCT score, until reaching a node without children
+2. Expansion: a leaf that was visited before gets a child for every possible move, or only the move that wins outright
+3. Playout: from there, play moves at random until a queen is surrounded, or the playout move cap is reached
+4. Backpropagation: add the playout's result to every node on the way back up
+
+Results are from white's point of view: 1 for a white win, -1 for a black win, 0 for a draw. A playout that reaches the
+move cap is scored by the evaluator instead, squashed into (-1, 1).
+
+The tree (a NodePool, see node.py) is kept between turns. When the engine is reset to a position found close below the
+old root, that subtree is copied out to become the new tree, with all its statistics. Expansion stops once the tree
+holds 'Max tree nodes' nodes.
+
+Pondering grows the tree from the opponent's position instead. Once the opponent has moved, reset() finds the engine's
+position one ply below that root, and keeps its subtree.
+"""
+from src.game.consts import Consts
+from src.engine.hive_engine import BasicEngine
+from src.engine.move_codec import pack_move, unpack_move
+from src.engine.move_ordering import MoveOrderer
+from src.engine.node import NodePool
+import src.game.functions as hive_funcs
+
+import math
+import random
+import time
+
+
+class MctsEngine(BasicEngine):
+    """ Engine that picks the most played root move of a Monte Carlo Tree Search. Shares BasicEngine's time management """
+
+    kAdjudication_scale = 5.0  # Evaluation that counts as roughly 3/4 of a win, for playouts cut off at the move cap
+    kTree_reuse_plies = 2  # How far below the old root to look for the new position
+    kRoot = 0
+
+    def __init__(self, config=None, game_config=None):
+        super().__init__(config, game_config)
+        self.name: str = "KOH_mcts_v1"
+        self.random = random.Random()
+        self.tree: NodePool = None
+        self.playout_count: int = 0
+        self.playouts_per_second: float = 0
+
+    @property
+    def node_count(self) -> int:
+        return len(self.tree) if self.tree is not None else 0
+
+    def _get_result(self) -> float:
+        """ Result of the model's position for white, or None if the game is still being played """
+        game_model = self.model_manager.game_model
+        is_white_wins, is_black_wins = game_model.is_white_wins, game_model.is_black_wins
+        if not (is_white_wins or is_black_wins):
+            return None
+        if is_white_wins and is_black_wins:
+            return 0.0
+        return 1.0 if is_white_wins else -1.0
+
+    def _choose_playout_move(self, moves: list[dict]) -> dict:
+        """ Random move, except that moves crowding the enemy queen are preferred some of the time """
+        game_model = self.model_manager.game_model
+        if self.random.random() < self.config['kMcts_guided_playout_probability']:
+            enemy_queen = game_model.white_queen if game_model.player_on_turn == Consts.kBlack else game_model.black_queen
+            if enemy_queen.location:
+                enemy_queen_neighbors = hive_funcs.get_surrounding_hex_indexes(enemy_queen.location)
+                queen_threats = [move for move in moves if MoveOrderer.is_queen_threat(move, enemy_queen_neighbors, game_model.occupied_locations)]
+                if queen_threats:
+                    return self.random.choice(queen_threats)
+        return self.random.choice(moves)
+
+    def _playout(self) -> float:
+        """ Play random moves from the model's position, then take them all back. Returns the result for white """
+        game_model = self.model_manager.game_model
+        moves_played = 0
+        try:
+            while moves_played < self.config['kMcts_playout_move_cap']:
+                result = self._get_result()
+                if result is not None:
+                    return result
+                moves = self._get_possible_moves()
+                if not moves:
+                    break
+                game_model.make_move(self._choose_playout_move(moves))
+                moves_played += 1
+
+            result = self._get_result()
+            if result is not None:
+                return result
+            start = time.perf_counter()
+            evaluation = self.incremental_evaluator.evaluate()
+            self.search_stats.evaluation_s += time.perf_counter() - start
+            self.search_stats.leaf_evaluations += 1
+            return math.tanh(evaluation / self.kAdjudication_scale)
+        finally:
+            for _ in range(moves_played):
+                game_model.unmake_move()
+
+    def _select_child(self, node: int, player_on_turn: str) -> int:
+        """ Child with the best upper confidence bound for the player on turn. Unvisited children are tried first """
+        visit_counts, total_values = self.tree.visit_count, self.tree.total_value
+        exploration = self.config['kMcts_exploration'] * math.sqrt(math.log(max(1, visit_counts[node])))
+        sign = 1.0 if player_on_turn == Consts.kWhite else -1.0
+
+        def uct_score(child: int) -> float:
+            if visit_counts[child] == 0:
+                return math.inf
+            return sign * total_values[child] / visit_counts[child] + exploration / math.sqrt(visit_counts[child])
+
+        return max(self.tree.get_children(node), key=uct_score)
+
+    def _expand(self, node: int) -> None:
+        """
+        Give a node one child per possible move of the model's position, which is the node's position. A move that wins
+        the game on the spot becomes the node's only child: no other move needs to be played out
+        """
+        game_model = self.model_manager.game_model
+        winning_result = 1.0 if game_model.player_on_turn == Consts.kWhite else -1.0
+        move_codes, position_hashes = [], []
+        for move in self._get_possible_moves():
+            game_model.make_move(move)
+            is_winning_move = self._get_result() == winning_result
+            position_hash = game_model.position_hash
+            game_model.unmake_move()
+            if is_winning_move:
+                move_codes, position_hashes = [pack_move(move)], [position_hash]
+                break
+            move_codes.append(pack_move(move))
+            position_hashes.append(position_hash)
+        self.tree.add_children(node, move_codes, position_hashes)
+
+    def _run_iteration(self) -> None:
+        game_model = self.model_manager.game_model
+        tree = self.tree
+        path = [self.kRoot]
+        node = self.kRoot
+        try:
+            while tree.child_count[node]:
+                node = self._select_child(node, game_model.player_on_turn)
+                game_model.make_move(unpack_move(tree.move[node]))
+                path.append(node)
+
+            result = self._get_result()
+            if result is None:
+                if (tree.visit_count[node] > 0 or node == self.kRoot) and len(tree) < self.config['kMcts_max_nodes']:
+                    self._expand(node)
+                    if tree.child_count[node]:
+                        node = self.random.choice(tree.get_children(node))
+                        game_model.make_move(unpack_move(tree.move[node]))
+                        path.append(node)
+                result = self._playout()
+        finally:
+            for _ in range(len(path) - 1):
+                game_model.unmake_move()
+
+        for node in path:
+            tree.visit_count[node] += 1
+            tree.total_value[node] += result
+
+    def _find_reusable_subtree(self, position_hash: int) -> int:
+        """ Node of the current tree, at most kTree_reuse_plies below the root, for the given position """
+        if not self.tree:
+            return None
+        nodes = [self.kRoot]
+        for _ in range(self.kTree_reuse_plies + 1):
+            for node in nodes:
+                if self.tree.position_hash[node] == position_hash:
+                    return node
+            nodes = [child for node in nodes for child in self.tree.get_children(node)]
+        return None
+
+    def _set_root(self, position_hash: int) -> None:
+        """ Make the tree's root the given position, keeping the subtree below it if the tree already holds it """
+        new_root = self._find_reusable_subtree(position_hash)
+        if new_root is None:
+            self.tree = NodePool()
+            self.tree.add_root(position_hash)
+        elif new_root != self.kRoot:
+            self.tree = self.tree.extract_subtree(new_root)
+
+    def _ponder(self, search_depth: int) -> None:
+        """ Body of the pondering thread. Runs playouts from the opponent's position until stopped or the tree is full """
+        self._set_root(self.model_manager.game_model.position_hash)
+        while not self.stop_event.is_set() and len(self.tree) < self.config['kMcts_max_nodes']:
+            self._run_iteration()
+
+    def choose_move(self):
+        """
+        Run playouts from the starting position until the move's time budget runs out, or, without a game clock, for
+        'Playouts per move' playouts. Return the most played move in the execute_turn() format
+        """
+        start = time.perf_counter()
+        self._start_search_stats()
+        time_budget = self._get_move_time_budget()
+        deadline = start + time_budget if time_budget is not None else None
+
+        self.playout_count = 0
+        book_move = self._get_book_move()
+        if book_move is not None:
+            self.stop_event.clear()
+            self.best_evaluation = self.incremental_evaluator.evaluate()
+            self.search_stats.is_book_move = True
+            self.search_stats.principal_variation = [book_move]
+            self._finish_search_stats(book_move, time.perf_counter() - start)
+            return book_move
+        if self._get_result() is None:
+            while True:
+                self._run_iteration()
+                self.playout_count += 1
+                if self.stop_event.is_set():
+                    break
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        break
+                elif self.playout_count >= self.config['kMcts_playouts_per_move']:
+                    break
+
+        self.stop_event.clear()
+        elapsed = time.perf_counter() - start
+        self.playouts_per_second = self.playout_count / elapsed if elapsed > 0 else 0
+        if self.model_manager.config['kTime_per_game'] > 0:
+            self.clock_remaining_s += self.model_manager.config['kTime_increment_per_move'] - elapsed
+
+        tree = self.tree
+        self.search_stats.playouts = self.playout_count
+        self.search_stats.nodes = len(tree)
+        self.search_stats.principal_variation = self._get_most_played_line()
+        best_move = self.search_stats.principal_variation[0] if self.search_stats.principal_variation else {}
+        if best_move:
+            best_child = max(tree.get_children(self.kRoot), key=lambda child: tree.visit_count[child])
+            self.best_evaluation = tree.total_value[best_child] / tree.visit_count[best_child] if tree.visit_count[best_child] else 0
+        self._finish_search_stats(best_move, elapsed)
+        return best_move
+
+    def _get_most_played_line(self) -> list[dict]:
+        """ Moves of the most played path down the tree from the root, the principal variation of a tree search """
+        tree = self.tree
+        variation = []
+        node = self.kRoot
+        while tree.child_count[node]:
+            node = max(tree.get_children(node), key=lambda child: tree.visit_count[child])
+            if not tree.visit_count[node] and variation:
+                break
+            variation.append(unpack_move(tree.move[node]))
+        return variation
+
+    def get_search_progress(self) -> tuple[dict, float]:
+        """
+        Most played root move so far, and its average result for white. Safe to call while another thread runs playouts:
+        root children that are still being added are left out
+        """
+        tree = self.tree
+        if tree is None:
+            return {}, 0.0
+        children = [child for child in tree.get_children(self.kRoot) if child < len(tree.visit_count)]
+        if not children:
+            return {}, 0.0
+        best_child = max(children, key=lambda child: tree.visit_count[child])
+        visit_count = tree.visit_count[best_child]
+        return unpack_move(tree.move[best_child]), tree.total_value[best_child] / visit_count if visit_count else 0.0
+
+    def close(self) -> None:
+        self.tree = None
+        super().close()
+
+    def new_game(self) -> None:
+        super().new_game()
+        self.tree = None
+
+    def reset(self, new_board_state, search_depth):
+        """ Load the position to search from. search_depth is not used, playouts always run to the end or move cap """
+        super().reset(new_board_state, search_depth)
+        self._set_root(self.model_manager.game_model.position_hash)
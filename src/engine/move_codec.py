@@ -0,0 +1,49 @@
+"""
+Pack moves in the HiveGameManager.execute_turn() dict format into single integers, and back
+
+Bit layout, from least significant:
+    bit  0      move kind (0 = place piece, 1 = move piece)
+    bits 1-3    piece type, as an index into pieces.piece_types
+    bit  4      piece color (0 = black, 1 = white). Only meaningful for placements
+    bits 5-52   four 12-bit hex coordinates: from x, from y, to x, to y. Placements have no 'from' hex
+"""
+import src.game.pieces as game_pieces
+from src.game.consts import Consts
+
+kPiece_types: list[str] = list(game_pieces.piece_types)
+kColors: list[str] = [Consts.kBlack, Consts.kWhite]
+
+kCoordinate_bits = 12
+kCoordinate_offset = 1 << (kCoordinate_bits - 1)
+kCoordinate_mask = (1 << kCoordinate_bits) - 1
+kFrom_shift = 5
+kTo_shift = kFrom_shift + 2 * kCoordinate_bits
+
+
+def _pack_location(location) -> int:
+    return (location[0] + kCoordinate_offset) | ((location[1] + kCoordinate_offset) << kCoordinate_bits)
+
+
+def _unpack_location(packed_location: int) -> tuple:
+    return (packed_location & kCoordinate_mask) - kCoordinate_offset, ((packed_location >> kCoordinate_bits) & kCoordinate_mask) - kCoordinate_offset
+
+
+def pack_move(move: dict[str, dict]) -> int:
+    """ Encode a place or move turn as an int. Moves without a piece type are encoded as a queen move """
+    if 'place piece' in move:
+        details = move['place piece']
+        return (kPiece_types.index(details['type']) << 1) | (kColors.index(details['color']) << 4) | \
+            (_pack_location(details['location']) << kTo_shift)
+
+    details = move['move piece']
+    piece_type_ix = kPiece_types.index(details['type']) if 'type' in details else 0
+    return 1 | (piece_type_ix << 1) | (_pack_location(details['from']) << kFrom_shift) | (_pack_location(details['to']) << kTo_shift)
+
+
+def unpack_move(move_code: int) -> dict[str, dict]:
+    """ Decode an int from pack_move() back into the execute_turn() dict format """
+    piece_type = kPiece_types[(move_code >> 1) & 0b111]
+    to_location = _unpack_location(move_code >> kTo_shift)
+    if move_code & 1:
+        return {'move piece': {'from': _unpack_location(move_code >> kFrom_shift), 'to': to_location, 'type': piece_type}}
+    return {'place piece': {'color': kColors[(move_code >> 4) & 1], 'location': to_location, 'type': piece_type}}
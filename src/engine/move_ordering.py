@@ -0,0 +1,74 @@
+""" Move ordering for the engine's alpha-beta search """
+from src.game.consts import Consts
+from src.game.model import HiveGame
+from src.engine.move_codec import pack_move
+import src.game.functions as hive_funcs
+
+
+class MoveOrderer:
+    """
+    Sort moves so the ones most likely to be best are searched first, which is what lets alpha-beta cut branches off.
+
+    Order of moves:
+    1. The transposition table's best move for the position
+    2. Moves that add a neighbor to the enemy queen
+    3. Killer moves: moves that caused a cutoff in a sibling position at the same ply
+    4. Everything else, by history score: how often, and how deep, a move has caused cutoffs anywhere in the search
+
+    Killer and history tables belong to a single search, and are cleared by reset() before each new one.
+    """
+
+    kMax_ply = 64
+    kKiller_slots = 2
+
+    # Ordering classes, searched highest first
+    kHash_move_class = 3
+    kQueen_threat_class = 2
+    kKiller_class = 1
+    kQuiet_class = 0
+
+    def __init__(self):
+        self.killer_moves: list[list[int]] = []
+        self.history: dict[int, int] = dict()
+        self.reset()
+
+    def reset(self) -> None:
+        self.killer_moves = [[0] * self.kKiller_slots for _ in range(self.kMax_ply)]
+        self.history = dict()
+
+    @staticmethod
+    def is_queen_threat(move: dict, enemy_queen_neighbors: set[tuple], occupied_locations: set[tuple]) -> bool:
+        """ Does a move put a piece on an empty hex next to the enemy queen, from somewhere that is not next to it """
+        if 'place piece' in move:
+            return tuple(move['place piece']['location']) in enemy_queen_neighbors
+        to_hex = tuple(move['move piece']['to'])
+        return to_hex in enemy_queen_neighbors and to_hex not in occupied_locations and \
+            tuple(move['move piece']['from']) not in enemy_queen_neighbors
+
+    def order_moves(self, moves: list[dict], game_model: HiveGame, ply: int, hash_move: dict = None) -> list[dict]:
+        """ Return the moves of the model's position sorted for searching at a given ply """
+        enemy_queen = game_model.white_queen if game_model.player_on_turn == Consts.kBlack else game_model.black_queen
+        enemy_queen_neighbors = hive_funcs.get_surrounding_hex_indexes(enemy_queen.location) if enemy_queen.location else set()
+        killers = self.killer_moves[ply] if ply < self.kMax_ply else []
+
+        def sort_key(move: dict) -> tuple[int, int]:
+            move_code = pack_move(move)
+            if move == hash_move:
+                return self.kHash_move_class, 0
+            if enemy_queen_neighbors and self.is_queen_threat(move, enemy_queen_neighbors, game_model.occupied_locations):
+                return self.kQueen_threat_class, self.history.get(move_code, 0)
+            if move_code in killers:
+                return self.kKiller_class, self.history.get(move_code, 0)
+            return self.kQuiet_class, self.history.get(move_code, 0)
+
+        return sorted(moves, key=sort_key, reverse=True)
+
+    def record_cutoff(self, move: dict, depth: int, ply: int) -> None:
+        """ A move was good enough to cut off the search of its position. Remember it as a killer and in history """
+        move_code = pack_move(move)
+        self.history[move_code] = self.history.get(move_code, 0) + depth * depth
+        if ply < self.kMax_ply:
+            killers = self.killer_moves[ply]
+            if move_code not in killers:
+                killers.insert(0, move_code)
+                killers.pop()
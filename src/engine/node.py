@@ -1,46 +1,110 @@
-""" Class representing Nodes of a tree data structure """
-
-
-class Node:
-    latest_move: list[dict]
-
-    def __init__(self, latest_move: dict, evaluation):
-        self.latest_move = [latest_move] if latest_move else list()
-        self.child_nodes = list()
-        self.board_evaluation: float = evaluation
-
-    def add_child(self, latest_move: dict, evaluation) -> None:
-        self.child_nodes.append(Node(latest_move, evaluation))
-
-    def keep_best_child(self):
-        best_child = sorted(self.child_nodes, key=lambda x: x.board_evaluation)[-1]
-        self.child_nodes = [best_child]
-
-    def find_best_move(self):
-        if not self.child_nodes[0].child_nodes:
-            # print(f"Best is: {sorted(self.child_nodes, key=lambda x: x.board_evaluation)[-1].board_evaluation=}")
-            # print(f"Best is: {sorted(self.child_nodes, key=lambda x: x.board_evaluation)[0].board_evaluation=}")
-            return sorted(self.child_nodes, key=lambda x: x.board_evaluation)[0]
-        else:
-            if not self.latest_move:
-                # This is the first parent node
-                best_node = Node({}, 10000)
-                best_eval = 10000
-                for child in self.child_nodes:
-                    child_eval = child.find_best_move().board_evaluation
-                    if child_eval < best_node.board_evaluation:
-                        best_node = child
-                        best_eval = child_eval
-                return best_node.latest_move[0], best_eval
+""" Search tree stored as a pool of nodes in parallel arrays, one entry per node, instead of one Python object per node """
+from array import array
+
+
+class NodePool:
+    """
+    Nodes are indexes into the pool's arrays. The children of a node are created together, so they sit next to each
+    other: a node only records its first child and its number of children. Moves are stored packed by move_codec.
+
+    Per node:
+        parent          index of the parent node, kNo_node for a root
+        first_child     index of the first child, kNo_node until the node is expanded
+        child_count     number of children
+        move            packed move that leads from the parent to this node, 0 for a root
+        evaluation      static or search evaluation of the node
+        visit_count     Monte Carlo playouts through the node
+        total_value     sum of the results of those playouts, for white
+        position_hash   hash of the node's position
+    """
+
+    kNo_node = -1
+
+    def __init__(self):
+        self.parent = array('l')
+        self.first_child = array('l')
+        self.child_count = array('l')
+        self.move = array('q')
+        self.evaluation = array('d')
+        self.visit_count = array('q')
+        self.total_value = array('d')
+        self.position_hash = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def _append_node(self, parent: int, move_code: int, evaluation: float, position_hash: int) -> None:
+        self.parent.append(parent)
+        self.first_child.append(self.kNo_node)
+        self.child_count.append(0)
+        self.move.append(move_code)
+        self.evaluation.append(evaluation)
+        self.visit_count.append(0)
+        self.total_value.append(0.0)
+        self.position_hash.append(position_hash)
+
+    def add_root(self, position_hash: int = 0, evaluation: float = 0.0) -> int:
+        """ Add a node without parent, and return its index """
+        self._append_node(self.kNo_node, 0, evaluation, position_hash)
+        return len(self) - 1
+
+    def add_children(self, parent: int, move_codes: list[int], position_hashes: list[int], evaluation: float = 0.0) -> None:
+        """ Expand a node that has no children yet, with one child per packed move """
+        self.first_child[parent] = len(self)
+        self.child_count[parent] = len(move_codes)
+        for move_code, position_hash in zip(move_codes, position_hashes):
+            self._append_node(parent, move_code, evaluation, position_hash)
+
+    def get_children(self, index: int) -> range:
+        return range(self.first_child[index], self.first_child[index] + self.child_count[index])
+
+    def get_subtree_size(self, index: int) -> int:
+        """ Number of nodes in the subtree below and including a node """
+        node_count = 0
+        nodes_to_count = [index]
+        while nodes_to_count:
+            index = nodes_to_count.pop()
+            node_count += 1
+            nodes_to_count.extend(self.get_children(index))
+        return node_count
+
+    def get_leaves(self, index: int):
+        """ Yield every leaf below a node, depth-first """
+        nodes_to_visit = [index]
+        while nodes_to_visit:
+            index = nodes_to_visit.pop()
+            if self.child_count[index]:
+                nodes_to_visit.extend(reversed(self.get_children(index)))
             else:
-                return sorted([child.find_best_move() for child in self.child_nodes], key=lambda x: x.board_evaluation)[0]
-
-    def get_node(self):
-        if not self.child_nodes:
-            yield self, self.latest_move
-        else:
-            for child in self.child_nodes:
-                for child_node, child_moves in child.get_node():
-                    move_list = self.latest_move[:]
-                    move_list.extend(child_moves)
-                    yield child_node, move_list
+                yield index
+
+    def get_move_path(self, index: int, root: int = kNo_node) -> list[int]:
+        """ Packed moves that lead from the root (or from any ancestor given as root) down to a node """
+        moves = []
+        while index != root and self.parent[index] != self.kNo_node:
+            moves.append(self.move[index])
+            index = self.parent[index]
+        moves.reverse()
+        return moves
+
+    def extract_subtree(self, index: int) -> 'NodePool':
+        """
+        Copy the subtree below a node into a new pool, with that node as root at index 0. Nodes are copied breadth
+        first, so siblings stay next to each other
+        """
+        subtree = NodePool()
+        subtree._append_node(self.kNo_node, 0, self.evaluation[index], self.position_hash[index])
+        subtree.visit_count[0], subtree.total_value[0] = self.visit_count[index], self.total_value[index]
+
+        nodes_to_copy = [(index, 0)]
+        for old_index, new_index in nodes_to_copy:
+            children = self.get_children(old_index)
+            if not children:
+                continue
+            subtree.first_child[new_index] = len(subtree)
+            subtree.child_count[new_index] = len(children)
+            for old_child in children:
+                subtree._append_node(new_index, self.move[old_child], self.evaluation[old_child], self.position_hash[old_child])
+                subtree.visit_count[-1], subtree.total_value[-1] = self.visit_count[old_child], self.total_value[old_child]
+                nodes_to_copy.append((old_child, len(subtree) - 1))
+        return subtree
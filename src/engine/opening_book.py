@@ -0,0 +1,201 @@
+"""
+Opening book, compiled from the games HiveRecorder saves to the saved_games directory
+
+For every position of the first plies of every saved game with a result, the book counts how often each move was
+played from it, and the sum of the results of those games (1 white win, -1 black win, 0 draw).
+
+Positions are looked up by a canonical key: the lowest Zobrist hash of the position over all 12 rotations and
+reflections of the hex grid around (0, 0). Mirrored or rotated openings therefore share their statistics. Moves are stored
+turned the same way as the canonical position, and turned back for the position being looked up.
+
+Book file layout, little endian:
+    header      b'HIVEBOOK', version (uint32), slot count (uint32, a power of 2)
+    slots       slot count x (position key uint64, packed move uint64, games uint32, total result float64)
+
+Slots form an open-addressing hash table: an entry is stored at the slot given by its position key, or in the next free
+slot after it. Every move of a position is found by probing from that slot up to the first empty slot (0 games), which
+the table's load factor of at most 1/2 keeps short. The file is memory mapped, not read in.
+
+Compile the book with: python -m src.engine.opening_book [book file]
+"""
+from src.game.consts import Consts
+from src.game.model import HiveGame
+from src.engine.move_codec import pack_move, unpack_move
+from src.records.hive_recorder import HiveRecorder
+import src.game.zobrist as zobrist
+
+import argparse
+import mmap
+import os
+import struct
+
+kMagic = b'HIVEBOOK'
+kVersion = 1
+kHeader = struct.Struct('<8sII')
+kSlot = struct.Struct('<QQId')
+kMinimum_slot_count = 16
+
+kSymmetry_count = 12  # 6 rotations, each with and without a reflection
+
+# Results of saved games, from white's point of view. Matched against the lowercase 'Result' header
+kResult_scores = {'white wins': 1.0, 'black resigns': 1.0, 'black wins': -1.0, 'white resigns': -1.0, 'draw': 0.0}
+
+
+def transform_location(location: tuple, symmetry: int) -> tuple:
+    """ Rotate a hex by (symmetry % 6) sixths of a turn around (0, 0), after reflecting it for symmetry >= 6 """
+    q, r = location[0], (location[1] - location[0]) // 2  # Axial coordinates
+    if symmetry >= 6:
+        r = -q - r
+    for _ in range(symmetry % 6):
+        q, r = -r, q + r
+    return q, 2 * r + q
+
+
+def _get_inverse_symmetry(symmetry: int) -> int:
+    probe_locations = [(1, 1), (0, 2)]
+    return [inverse for inverse in range(kSymmetry_count)
+            if [transform_location(transform_location(location, symmetry), inverse) for location in probe_locations] == probe_locations][0]
+
+
+kInverse_symmetries = [_get_inverse_symmetry(symmetry) for symmetry in range(kSymmetry_count)]
+
+
+def transform_move(move: dict[str, dict], symmetry: int) -> dict[str, dict]:
+    """ The same move, on the board turned by transform_location() """
+    if 'place piece' in move:
+        details = move['place piece']
+        return {'place piece': {'color': details['color'], 'location': transform_location(tuple(details['location']), symmetry), 'type': details['type']}}
+    details = move['move piece']
+    return {'move piece': {'from': transform_location(tuple(details['from']), symmetry),
+                           'to': transform_location(tuple(details['to']), symmetry), 'type': details['type']}}
+
+
+def get_canonical_key(game_model: HiveGame) -> tuple[int, int]:
+    """ The model position's canonical key, and the symmetry that turns the position into its canonical orientation """
+    side_to_move_key = zobrist.white_to_move_key if game_model.player_on_turn == Consts.kWhite else 0
+    keys = []
+    for symmetry in range(kSymmetry_count):
+        key = side_to_move_key
+        for location, stack in game_model.stacks.items():
+            transformed_location = transform_location(location, symmetry)
+            for stack_height, piece in enumerate(stack):
+                key ^= zobrist.get_piece_key(str(piece), piece.color, transformed_location, stack_height)
+        keys.append((key, symmetry))
+    return min(keys)
+
+
+def get_move_between(board_state: dict, next_board_state: dict) -> dict[str, dict]:
+    """ The move that turns one recorded board state into the next, or None if they are not one move apart """
+    def get_placed_pieces(state: dict) -> list[tuple]:
+        return [(piece['type'], piece['color'], tuple(piece['location'])) for piece in state['pieces'] if piece['location']]
+
+    placed_pieces, next_placed_pieces = get_placed_pieces(board_state), get_placed_pieces(next_board_state)
+    removed = [piece for piece in placed_pieces if piece not in next_placed_pieces]
+    added = [piece for piece in next_placed_pieces if piece not in placed_pieces]
+    if len(added) != 1 or len(removed) > 1:
+        return None
+
+    piece_type, color, location = added[0]
+    if not removed:
+        return {'place piece': {'color': color, 'location': location, 'type': piece_type}}
+    if removed[0][:2] != (piece_type, color):
+        return None
+    return {'move piece': {'from': removed[0][2], 'to': location, 'type': piece_type}}
+
+
+def get_result_score(result: str) -> float:
+    """ Score of a saved game's result for white, or None for a game without a known result """
+    return kResult_scores.get(result.strip().lower()) if result else None
+
+
+def compile_opening_book(game_paths: list[str], book_path: str, max_plies: int) -> int:
+    """ Compile the first max_plies moves of saved games into a book file. Returns the number of (position, move) entries """
+    recorder = HiveRecorder()
+    game_model = HiveGame()
+    statistics: dict[tuple[int, int], list] = dict()  # (position key, packed move) -> [games, total result]
+    for path in game_paths:
+        game_data = recorder.load_game_from_file(path)
+        result_score = get_result_score(game_data['game information']['Result'])
+        if result_score is None:
+            continue
+
+        board_states = [board_state for board_state, _ in game_data['board state list']]
+        for board_state, next_board_state in list(zip(board_states, board_states[1:]))[:max_plies]:
+            move = get_move_between(board_state, next_board_state)
+            if move is None:
+                break
+            game_model.setup_board_state(board_state)
+            position_key, symmetry = get_canonical_key(game_model)
+            entry = statistics.setdefault((position_key, pack_move(transform_move(move, symmetry))), [0, 0.0])
+            entry[0] += 1
+            entry[1] += result_score
+
+    slot_count = kMinimum_slot_count
+    while slot_count < 2 * len(statistics):
+        slot_count *= 2
+    slots = [None] * slot_count
+    for (position_key, move_code), (games, total_score) in statistics.items():
+        slot = position_key & (slot_count - 1)
+        while slots[slot] is not None:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = (position_key, move_code, games, total_score)
+
+    with open(book_path, 'wb') as f:
+        f.write(kHeader.pack(kMagic, kVersion, slot_count))
+        for slot in slots:
+            f.write(kSlot.pack(*slot) if slot else kSlot.pack(0, 0, 0, 0.0))
+    return len(statistics)
+
+
+class OpeningBook:
+    """ Read-only view of a compiled book file """
+
+    def __init__(self, book_path: str):
+        with open(book_path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slot_count = kHeader.unpack_from(self.buffer, 0)
+        if magic != kMagic or version != kVersion:
+            self.close()
+            raise ValueError(f"{book_path} is not a version {kVersion} opening book")
+
+    def _get_entries(self, position_key: int) -> list[tuple[int, int, float]]:
+        """ (packed move, games, total result) of every move stored for a canonical position """
+        entries = []
+        slot = position_key & (self.slot_count - 1)
+        while True:
+            stored_key, move_code, games, total_score = kSlot.unpack_from(self.buffer, kHeader.size + slot * kSlot.size)
+            if not games:
+                return entries
+            if stored_key == position_key:
+                entries.append((move_code, games, total_score))
+            slot = (slot + 1) & (self.slot_count - 1)
+
+    def get_move_statistics(self, game_model: HiveGame) -> list[tuple[dict, int, float]]:
+        """ (move, games, average result for the player on turn) for every book move of the model's position """
+        position_key, symmetry = get_canonical_key(game_model)
+        sign = 1.0 if game_model.player_on_turn == Consts.kWhite else -1.0
+        return [(transform_move(unpack_move(move_code), kInverse_symmetries[symmetry]), games, sign * total_score / games)
+                for move_code, games, total_score in self._get_entries(position_key)]
+
+    def get_move(self, game_model: HiveGame, min_games: int = 1) -> dict:
+        """ The book move with the best average result for the player on turn, or None if the book has no such move """
+        candidates = [(average_score, games, move) for move, games, average_score in self.get_move_statistics(game_model) if games >= min_games]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda candidate: candidate[:2])[2]
+
+    def close(self) -> None:
+        self.buffer.close()
+
+
+if __name__ == '__main__':
+    from src.engine.engine_config import get_config
+
+    engine_config = get_config()
+    parser = argparse.ArgumentParser(description="Compile the games in saved_games into an opening book")
+    parser.add_argument('book_path', nargs='?', default=os.path.join(HiveRecorder().saved_games_path, engine_config['kOpening_book_file']))
+    parser.add_argument('--max-plies', type=int, default=engine_config['kOpening_book_max_plies'])
+    args = parser.parse_args()
+
+    entry_count = compile_opening_book(HiveRecorder().get_saved_game_paths(), args.book_path, args.max_plies)
+    print(f"Wrote {entry_count} book moves to {args.book_path}")
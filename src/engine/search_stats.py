@@ -0,0 +1,71 @@
+""" Measurements of a single engine search, to see where the engine's time goes """
+import json
+
+
+class SearchStats:
+    """
+    Filled in by the engine while it chooses a move, and kept as the engine's search_stats until the next search.
+
+    Times are in seconds. Evaluation time includes the incremental evaluator's rebuilds, which are also reported on their
+    own. Nodes searched by the worker processes of parallel search are not counted, only those of the engine itself.
+    """
+
+    def __init__(self, engine_name: str = '', position_hash: int = 0):
+        self.engine_name = engine_name
+        self.position_hash = position_hash
+        self.elapsed_s: float = 0.0
+        self.completed_depth: int = 0
+        self.nodes: int = 0  # Every position searched, quiescence included
+        self.quiescence_nodes: int = 0
+        self.nodes_per_depth: dict[int, int] = dict()  # Iteration depth -> nodes searched by that iteration, for completed iterations
+        self.leaf_evaluations: int = 0
+        self.playouts: int = 0
+        self.move_generation_s: float = 0.0
+        self.evaluation_s: float = 0.0
+        self.rebuilds: int = 0
+        self.rebuild_s: float = 0.0
+        self.transposition_probes: int = 0
+        self.transposition_hits: int = 0
+        self.transposition_cutoffs: int = 0  # Hits that settled a position without searching it
+        self.evaluation_cache_hits: int = 0
+        self.evaluation_cache_misses: int = 0
+        self.is_book_move: bool = False
+        self.best_move: dict = {}
+        self.best_evaluation: float = 0.0  # For white
+        self.principal_variation: list[dict] = []
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """ Growth in nodes from the second deepest to the deepest completed iteration. 0 with fewer than two iterations """
+        depths = sorted(self.nodes_per_depth)
+        if len(depths) < 2 or not self.nodes_per_depth[depths[-2]]:
+            return 0.0
+        return self.nodes_per_depth[depths[-1]] / self.nodes_per_depth[depths[-2]]
+
+    @property
+    def transposition_hit_rate(self) -> float:
+        return self.transposition_hits / self.transposition_probes if self.transposition_probes else 0.0
+
+    @property
+    def evaluation_cache_hit_rate(self) -> float:
+        lookups = self.evaluation_cache_hits + self.evaluation_cache_misses
+        return self.evaluation_cache_hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> dict:
+        """ Every measurement, and the rates derived from them, as JSON-friendly values """
+        stats = {key: value for key, value in vars(self).items()}
+        stats['nodes_per_depth'] = {str(depth): nodes for depth, nodes in self.nodes_per_depth.items()}
+        stats['nodes_per_second'] = self.nodes_per_second
+        stats['effective_branching_factor'] = self.effective_branching_factor
+        stats['transposition_hit_rate'] = self.transposition_hit_rate
+        stats['evaluation_cache_hit_rate'] = self.evaluation_cache_hit_rate
+        return stats
+
+    def write_json_line(self, log_path: str) -> None:
+        """ Append the stats to a JSON lines log, one search per line """
+        with open(log_path, 'a') as f:
+            f.write(json.dumps(self.to_dict()) + '\n')
@@ -0,0 +1,93 @@
+"""
+Transposition table in shared memory, probed and stored into by every process of a parallel search
+
+The table is a flat array of fixed-size entries in a multiprocessing.shared_memory block, behind a small header:
+
+    header:  entry count (8 bytes), search generation (8 bytes)
+    entry:   check, packed best move, score, info (8 bytes each)
+             info = depth | bound << 16 | generation << 24
+             check = position hash ^ packed best move ^ score bits ^ info
+
+Writes take no locks. Two processes writing the same slot at once can leave an entry made of parts of both writes, but
+its check then no longer matches any position hash, and the entry is simply treated as empty.
+"""
+from multiprocessing import shared_memory
+import struct
+
+from src.engine.transposition_table import TranspositionEntry, TranspositionTable
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable whose entries live in shared memory. The process that creates the table owns it and must
+    eventually unlink() it. Other processes attach() to it by name
+    """
+
+    kHeader_format = '<QQ'
+    kHeader_size_bytes = struct.calcsize(kHeader_format)
+    kEntry_format = '<QQdQ'
+    kEntry_size_bytes = struct.calcsize(kEntry_format)
+
+    def __init__(self, size_mb: float, name: str = None):
+        """ Create a new shared table, or attach to the existing table called name """
+        if name is None:
+            entry_count = self.get_entry_count(size_mb)
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=self.kHeader_size_bytes + entry_count * self.kEntry_size_bytes)
+            struct.pack_into(self.kHeader_format, self.shared_memory.buf, 0, entry_count, 0)
+            self.is_owner = True
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+            self.is_owner = False
+
+        self.buffer = self.shared_memory.buf
+        self.entry_count = struct.unpack_from('<Q', self.buffer, 0)[0]
+        self.index_mask = self.entry_count - 1
+        self.probe_count = 0
+        self.hit_count = 0
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedTranspositionTable':
+        return cls(0, name)
+
+    @property
+    def name(self) -> str:
+        return self.shared_memory.name
+
+    @property
+    def generation(self) -> int:
+        return struct.unpack_from('<Q', self.buffer, 8)[0]
+
+    @generation.setter
+    def generation(self, value: int) -> None:
+        struct.pack_into('<Q', self.buffer, 8, value)
+
+    @staticmethod
+    def _get_score_bits(score: float) -> int:
+        return struct.unpack('<Q', struct.pack('<d', score))[0]
+
+    def _read_slot(self, slot: int) -> TranspositionEntry:
+        check, best_move, score, info = struct.unpack_from(self.kEntry_format, self.buffer, self.kHeader_size_bytes + slot * self.kEntry_size_bytes)
+        if not info:
+            return None
+        position_hash = check ^ best_move ^ self._get_score_bits(score) ^ info
+        return TranspositionEntry(position_hash, info & 0xFFFF, (info >> 16) & 0xFF, score, best_move, (info >> 24) & 0xFF)
+
+    def _write_slot(self, slot: int, entry: TranspositionEntry) -> None:
+        # Bit 40 marks the slot as used, so an entry never has an all-zero info word
+        info = entry.depth & 0xFFFF | (entry.bound & 0xFF) << 16 | (entry.generation & 0xFF) << 24 | 1 << 40
+        check = entry.position_hash ^ entry.best_move ^ self._get_score_bits(entry.score) ^ info
+        struct.pack_into(self.kEntry_format, self.buffer, self.kHeader_size_bytes + slot * self.kEntry_size_bytes, check, entry.best_move, entry.score, info)
+
+    def clear(self) -> None:
+        self.buffer[self.kHeader_size_bytes:self.kHeader_size_bytes + self.entry_count * self.kEntry_size_bytes] = bytes(self.entry_count * self.kEntry_size_bytes)
+        self.probe_count = 0
+        self.hit_count = 0
+
+    def close(self) -> None:
+        """ Detach this process from the table """
+        self.buffer = None
+        self.shared_memory.close()
+
+    def unlink(self) -> None:
+        """ Free the shared memory block. Only the owner should do this, once every process has closed the table """
+        self.shared_memory.unlink()
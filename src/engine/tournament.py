@@ -0,0 +1,255 @@
+"""
+Engine-vs-engine tournaments, played without the GUI
+
+Every pair of players meets in a match of a given number of games. Games come in pairs that start from the same
+position, a few random moves into the game, with the colors swapped: neither engine is favored by the opening or by
+moving first. Players differ by engine class, engine config file (evaluation weights) and search depth.
+
+A game ends when a queen is surrounded, or is adjudicated once it reaches the move cap: a win for the side the evaluator
+favors by at least the adjudication margin, otherwise a draw. The game model has no passing yet, so a player left without
+any legal move also ends the game in a draw.
+
+Games are spread across a pool of worker processes, and saved through HiveRecorder with a 'White wins', 'Black wins'
+or 'Draw' result, by default to saved_games/tournaments. The opening book and the weight tuner read the games of every
+subdirectory of saved_games too. Each match is reported as wins, draws and losses, and as an Elo difference with its confidence interval.
+
+Run a tournament with, e.g.: python -m src.engine.tournament basic:pytest_engine_config:2 mcts:pytest_engine_config:1
+"""
+from src.game.consts import Consts
+from src.game.manager import HiveGameManager
+from src.engine.hive_engine import BasicEngine
+from src.engine.mcts_engine import MctsEngine
+from src.engine.evaluator import Evaluator
+from src.records.hive_recorder import HiveRecorder
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import datetime
+import itertools
+import math
+import multiprocessing.util
+import os
+import random
+
+kEngine_classes = {'basic': BasicEngine, 'mcts': MctsEngine}
+
+kWhite_wins = 'White wins'
+kBlack_wins = 'Black wins'
+kDraw = 'Draw'
+
+kDefault_move_cap = 100  # Moves of both players together
+kDefault_adjudication_margin = 5.0
+kDefault_opening_plies = 2
+kConfidence_z = 1.96  # 95% confidence intervals
+
+
+class TournamentPlayer:
+    """ An engine class, with the engine config it evaluates by and the depth it searches to """
+
+    def __init__(self, engine_class: str = 'basic', engine_config: str = '', search_depth: int = 2, name: str = ''):
+        if engine_class not in kEngine_classes:
+            raise ValueError(f"Unknown engine class {engine_class}. Choose from {', '.join(kEngine_classes)}")
+        self.engine_class = engine_class
+        self.engine_config = engine_config
+        self.search_depth = search_depth
+        self.name = name if name else f'{engine_class}_{engine_config or "default"}_d{search_depth}'
+
+    @classmethod
+    def from_spec(cls, spec: str) -> 'TournamentPlayer':
+        """ Player from an 'engine class:engine config:search depth' spec. Missing parts take their defaults """
+        engine_class, engine_config, search_depth = (spec.split(':') + ['', '', ''])[:3]
+        return cls(engine_class or 'basic', engine_config, int(search_depth) if search_depth else 2)
+
+
+# Worker processes keep one engine per player name, created when first needed. Players never share an engine, so neither
+# searches from the other's transposition table or game clock
+_worker_engines: dict[str, BasicEngine] = dict()
+
+
+def _get_engine(player: TournamentPlayer, game_config: str) -> BasicEngine:
+    if player.name not in _worker_engines:
+        _worker_engines[player.name] = kEngine_classes[player.engine_class](player.engine_config or None, game_config)
+    return _worker_engines[player.name]
+
+
+def _close_engines() -> None:
+    """ Close every engine this process keeps, and forget them """
+    for engine in _worker_engines.values():
+        engine.close()
+    _worker_engines.clear()
+
+
+def _init_worker() -> None:
+    # Worker processes close their engines as they exit, once the pool shuts down
+    multiprocessing.util.Finalize(None, _close_engines, exitpriority=10)
+
+
+def _adjudicate(game_manager: HiveGameManager, adjudication_margin: float) -> str:
+    """ Result of an unfinished game: a win for the side the evaluator favors by at least the margin, or a draw """
+    evaluation = Evaluator().evaluate_game(game_manager.game_model)
+    if evaluation >= adjudication_margin:
+        return kWhite_wins
+    if evaluation <= -adjudication_margin:
+        return kBlack_wins
+    return kDraw
+
+
+def play_game(black: TournamentPlayer, white: TournamentPlayer, game_config: str = '', move_cap: int = kDefault_move_cap,
+              adjudication_margin: float = kDefault_adjudication_margin, opening_plies: int = kDefault_opening_plies,
+              opening_seed: int = 0, save_path: str = None, filename: str = '') -> dict:
+    """
+    Play one game, starting with opening_plies random moves drawn from opening_seed. Black moves first, as always. When
+    given a save_path, the game is saved there through HiveRecorder, under filename if given. Returns the game's summary
+    """
+    game_manager = HiveGameManager(game_config or None)
+    game_model = game_manager.game_model
+    recorder = HiveRecorder()
+    if save_path:
+        recorder.saved_games_path = save_path
+    recorder.start_recording(game_manager.get_raw_game_state(), black.name, white.name)  # Player 1 moves first
+    if filename:
+        recorder.filename = filename
+
+    opening_random = random.Random(opening_seed)
+    players = {Consts.kBlack: black, Consts.kWhite: white}
+    for player in players.values():
+        _get_engine(player, game_config).new_game()  # Every game starts from empty tables, whatever the worker played before
+    result, is_adjudicated = None, False
+    for ply in range(move_cap):
+        if game_model.is_white_wins or game_model.is_black_wins:
+            break
+        moves = game_manager.get_possible_moves()
+        if not moves:
+            result = kDraw
+            break
+        if ply < opening_plies:
+            move = opening_random.choice(moves)
+        else:
+            player = players[game_model.player_on_turn]
+            engine = _get_engine(player, game_config)
+            engine.reset(game_manager.get_raw_game_state(), player.search_depth)
+            move = engine.choose_move()
+        game_manager.execute_turn(move)
+        recorder.log_move(game_manager.get_raw_game_state())
+
+    if result is None:
+        if game_model.is_white_wins and game_model.is_black_wins:
+            result = kDraw
+        elif game_model.is_white_wins:
+            result = kWhite_wins
+        elif game_model.is_black_wins:
+            result = kBlack_wins
+        else:
+            result, is_adjudicated = _adjudicate(game_manager, adjudication_margin), True
+
+    recorder.log_result(result)
+    is_saved = recorder.save_game_to_file() if save_path else False
+    return {'black': black.name, 'white': white.name, 'result': result, 'plies': len(recorder.position_list) - 1,
+            'is adjudicated': is_adjudicated, 'path': os.path.join(recorder.saved_games_path, recorder.filename) if is_saved else None}
+
+
+def _score_to_elo(score: float) -> float:
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    return 400.0 * math.log10(score / (1.0 - score))
+
+
+def get_elo_difference(wins: int, draws: int, losses: int, z: float = kConfidence_z) -> tuple[float, float, float]:
+    """
+    Elo difference of a player over its opponent, from its match score, with the bounds of its confidence interval:
+    (elo, lower bound, upper bound). The interval comes from the normal approximation of the mean score per game
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0, -math.inf, math.inf
+    score = (wins + 0.5 * draws) / games
+    deviation = math.sqrt((wins * (1.0 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games)
+    margin = z * deviation / math.sqrt(games)
+    return _score_to_elo(score), _score_to_elo(score - margin), _score_to_elo(score + margin)
+
+
+def get_match_scores(games: list[dict], player: str, opponent: str) -> tuple[int, int, int]:
+    """ Wins, draws and losses of a player in its games against an opponent """
+    wins = draws = losses = 0
+    for game in games:
+        if {game['black'], game['white']} != {player, opponent}:
+            continue
+        if game['result'] == kDraw:
+            draws += 1
+        elif (game['result'] == kWhite_wins) == (game['white'] == player):
+            wins += 1
+        else:
+            losses += 1
+    return wins, draws, losses
+
+
+def run_tournament(players: list[TournamentPlayer], games_per_match: int, game_config: str = '', worker_processes: int = None,
+                   move_cap: int = kDefault_move_cap, adjudication_margin: float = kDefault_adjudication_margin,
+                   opening_plies: int = kDefault_opening_plies, seed: int = 0, save_path: str = None) -> list[dict]:
+    """
+    Play a round robin of matches between every pair of players, on worker_processes processes (all cores when None,
+    in this process when 0). Every engine the tournament created is closed when it ends. Returns the summaries of all games,
+    in the order they were scheduled
+    """
+    if len({player.name for player in players}) != len(players):
+        raise ValueError("Tournament players need distinct names")
+
+    run_id = datetime.datetime.today().strftime('%Y%m%d%H%M%S')
+    game_arguments = []
+    for first, second in itertools.combinations(players, 2):
+        for game_index in range(games_per_match):
+            # Each pair of games shares an opening, with colors swapped
+            black, white = (first, second) if game_index % 2 == 0 else (second, first)
+            opening_seed = seed + len(game_arguments) - game_index % 2
+            filename = f'hive_game_{black.name}_VS_{white.name}_{run_id}_{len(game_arguments)}'
+            game_arguments.append((black, white, game_config, move_cap, adjudication_margin, opening_plies, opening_seed, save_path, filename))
+
+    if worker_processes == 0:
+        try:
+            return [play_game(*arguments) for arguments in game_arguments]
+        finally:
+            _close_engines()
+    with ProcessPoolExecutor(max_workers=worker_processes, initializer=_init_worker) as process_pool:
+        futures = [process_pool.submit(play_game, *arguments) for arguments in game_arguments]
+        return [future.result() for future in futures]
+
+
+def format_report(players: list[TournamentPlayer], games: list[dict]) -> str:
+    """ One line per match: the first player's wins, draws and losses against the second, and its Elo difference """
+    lines = []
+    for first, second in itertools.combinations(players, 2):
+        wins, draws, losses = get_match_scores(games, first.name, second.name)
+        elo, lower_bound, upper_bound = get_elo_difference(wins, draws, losses)
+        lines.append(f'{first.name} vs {second.name}: +{wins} ={draws} -{losses}, '
+                     f'Elo {elo:+.0f} ({kConfidence_z:g} sigma interval {lower_bound:+.0f} to {upper_bound:+.0f})')
+    adjudicated_count = len([game for game in games if game['is adjudicated']])
+    lines.append(f'{len(games)} games, {adjudicated_count} adjudicated at the move cap')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play engines against each other and report their Elo differences")
+    parser.add_argument('players', nargs='+', help="'engine class:engine config:search depth', e.g. basic:pytest_engine_config:2")
+    parser.add_argument('--games', type=int, default=100, help="games per match")
+    parser.add_argument('--game-config', default='', help="game config file, default pytest_config")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, default one per core, 0 to play in this process")
+    parser.add_argument('--move-cap', type=int, default=kDefault_move_cap)
+    parser.add_argument('--adjudication-margin', type=float, default=kDefault_adjudication_margin)
+    parser.add_argument('--opening-plies', type=int, default=kDefault_opening_plies)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-path', default=os.path.join(HiveRecorder().saved_games_path, 'tournaments'))
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    tournament_players = [TournamentPlayer.from_spec(spec) for spec in args.players]
+    if len(tournament_players) < 2:
+        parser.error("a tournament needs at least two players")
+    for duplicate_index, player in enumerate(tournament_players):
+        if [other.name for other in tournament_players].count(player.name) > 1:
+            player.name += f'_{duplicate_index}'
+
+    tournament_games = run_tournament(tournament_players, args.games, args.game_config, args.workers, args.move_cap, args.adjudication_margin,
+                                      args.opening_plies, args.seed, None if args.no_save else args.save_path)
+    print(format_report(tournament_players, tournament_games))
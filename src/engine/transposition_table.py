@@ -0,0 +1,88 @@
+""" Fixed-size table of search results, indexed by Zobrist position hash """
+from src.engine.move_codec import pack_move, unpack_move
+
+
+class TranspositionEntry:
+    """ One stored search result. best_move is packed by move_codec, 0 meaning no move is known """
+    __slots__ = ('position_hash', 'depth', 'bound', 'score', 'best_move', 'generation')
+
+    def __init__(self, position_hash: int, depth: int, bound: int, score: float, best_move: int, generation: int):
+        self.position_hash = position_hash
+        self.depth = depth
+        self.bound = bound
+        self.score = score
+        self.best_move = best_move
+        self.generation = generation
+
+    @property
+    def move(self) -> dict:
+        return unpack_move(self.best_move) if self.best_move else {}
+
+
+class TranspositionTable:
+    """
+    Remember the score, bound type and best move found for positions, so positions reached again through a
+    different move order are not searched again.
+
+    The table holds a fixed number of entries, sized from a memory budget. Each position hash maps to a single slot.
+    Replacement policy: a slot is overwritten when it is empty, holds the same position, was written during an older
+    search (generation), or holds a result searched no deeper than the new one.
+    """
+
+    # Bound types
+    kExact = 0
+    kLower_bound = 1
+    kUpper_bound = 2
+
+    # Approximate size of a filled slot: entry object, its int/float fields and the list reference to it
+    kEntry_size_bytes = 160
+
+    def __init__(self, size_mb: float):
+        self.entry_count = self.get_entry_count(size_mb)
+        self.index_mask = self.entry_count - 1
+        self.entries: list[TranspositionEntry] = [None] * self.entry_count
+        self.generation = 0
+        self.probe_count = 0
+        self.hit_count = 0
+
+    @classmethod
+    def get_entry_count(cls, size_mb: float) -> int:
+        """ The largest power of two number of entries that fits in the memory budget """
+        entry_budget = max(1, int(size_mb * 1024 * 1024) // cls.kEntry_size_bytes)
+        return 1 << (entry_budget.bit_length() - 1)
+
+    def _read_slot(self, slot: int) -> TranspositionEntry:
+        return self.entries[slot]
+
+    def _write_slot(self, slot: int, entry: TranspositionEntry) -> None:
+        self.entries[slot] = entry
+
+    def new_search(self) -> None:
+        """ Mark the start of a new search. Results from older searches become the first to be replaced """
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        self.entries = [None] * self.entry_count
+        self.probe_count = 0
+        self.hit_count = 0
+
+    def probe(self, position_hash: int) -> TranspositionEntry:
+        """ Return the stored entry for a position, or None if the position is not in the table """
+        self.probe_count += 1
+        entry = self._read_slot(position_hash & self.index_mask)
+        if entry is not None and entry.position_hash == position_hash:
+            self.hit_count += 1
+            return entry
+        return None
+
+    def store(self, position_hash: int, depth: int, bound: int, score: float, best_move: dict = None) -> None:
+        """ Save a search result, subject to the replacement policy """
+        slot = position_hash & self.index_mask
+        entry = self._read_slot(slot)
+        packed_move = pack_move(best_move) if best_move else 0
+
+        if entry is None or entry.position_hash == position_hash or entry.generation != self.generation or depth >= entry.depth:
+            if not packed_move and entry is not None and entry.position_hash == position_hash:
+                # Keep the previously found best move rather than forget it
+                packed_move = entry.best_move
+            self._write_slot(slot, TranspositionEntry(position_hash, depth, bound, score, packed_move, self.generation))
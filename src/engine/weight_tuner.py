@@ -0,0 +1,236 @@
+"""
+Evaluation weight tuning from saved games, Texel style
+
+Every position of every saved game with a result becomes a training example: its feature vector (see
+batch_evaluator.py), and the game's result for white (1 win, 0.5 draw, 0 loss). The evaluation of a position, turned
+into an expected result by a logistic curve, should predict that result:
+
+    expected result = 1 / (1 + exp(-scale * features . weights))
+
+The tuner first fits the scale to the current weights, then fits the weights by gradient descent on the logistic loss
+(cross entropy) of all positions. Weights are pulled towards their current values by a small L2 penalty, so that
+features the games say little about keep their hand-picked values. The surrounded queen score is not a config value,
+and is not tuned: positions with a surrounded queen are left out.
+
+Features are extracted on a pool of worker processes, once, and cached next to the saved games. The loss and its
+gradient are computed over chunks of positions on a pool of threads: the matrix products release the GIL.
+
+The result is written as a new engine config file, in the same format as the config it started from. Tune with:
+python -m src.engine.weight_tuner <new config name>
+"""
+from src.game.model import HiveGame
+from src.engine.engine_config import get_config, get_config_path
+from src.engine.batch_evaluator import BatchEvaluator
+from src.engine.opening_book import get_result_score
+from src.records.hive_recorder import HiveRecorder
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import os
+import re
+
+import numpy
+
+# Config section and option of every tuned weight, as read by engine_config.get_config()
+kWeight_options = {
+    'kQueen_open_hexes': ('Queens', 'Open hexes around queen'),
+    'kQueen_slidable_hexes': ('Queens', 'Slidable hexes around queen penalty'),
+    'kQueen_in_play_bonus': ('Pieces in Play', 'Queen in play'),
+    'kAnt_in_play_bonus': ('Pieces in Play', 'Ant in play'),
+    'kBeetle_in_play_bonus': ('Pieces in Play', 'Beetle in play'),
+    'kSpider_in_play_bonus': ('Pieces in Play', 'Spider in play'),
+    'kGrasshopper_in_play_bonus': ('Pieces in Play', 'Grasshopper in play'),
+    'kQueen_adjacent_friendly_moves_scalar': ('Movement', 'Queen adjacent friendly moves scalar'),
+    'kTotal_moves_scalar': ('Movement', 'Total moves scalar'),
+    'kQueen moves scalar': ('Movement', 'Queen moves scalar'),
+    'kTotal_placements_scalar': ('Placements', 'Total placements scalar'),
+    'kEnemy_queen_adjacent_bonus': ('Placements', 'Enemy queen adjacent bonus'),
+    'kBeetle_on_enemy_queen_bonus': ('Beetles', 'Beetle on top of enemy queen'),
+    'kBeetle_on_enemy_ant_bonus': ('Beetles', 'Beetle on top of enemy ant'),
+    'kBeetle_on_enemy_beetle_bonus': ('Beetles', 'Beetle on top of enemy beetle'),
+    'kBeetle_on_enemy_spider_bonus': ('Beetles', 'Beetle on top of enemy spider'),
+    'kBeetle_on_enemy_grasshopper_bonus': ('Beetles', 'Beetle on top of enemy grasshopper'),
+    'kBeetle_on_friendly_queen_penalty': ('Beetles', 'Beetle on top of friendly queen'),
+    'kBeetle_on_friendly_ant_penalty': ('Beetles', 'Beetle on top of friendly ant'),
+    'kBeetle_on_friendly_beetle_penalty': ('Beetles', 'Beetle on top of friendly beetle'),
+    'kBeetle_on_friendly_spider_penalty': ('Beetles', 'Beetle on top of friendly spider'),
+    'kBeetle_on_friendly_grasshopper_penalty': ('Beetles', 'Beetle on top of friendly grasshopper'),
+    'kPlayer_turn_bonus': ('Misc', 'Turn advantage'),
+}
+
+kFeatures_cache_file = 'tuning_features.npz'
+kScale_candidates = numpy.logspace(-3, 1, 41)
+kL2_penalty = 1e-4
+kChunk_rows = 4096
+
+kSection_line = re.compile(r'^\s*\[([^\]]+)\]')
+kOption_line = re.compile(r'^(\s*([^\s=:#;\[][^=:]*?)\s*[=:])')  # Everything up to the value, and the option name
+
+
+def _get_game_features(game_path: str, engine_config: str) -> tuple[list[list[float]], list[float]]:
+    """ Feature vectors of every position of a saved game, and the game's result for white (1, 0.5 or 0) once per position """
+    game_data = HiveRecorder().load_game_from_file(game_path)
+    result_score = get_result_score(game_data['game information']['Result'])
+    if result_score is None:
+        return [], []
+
+    evaluator = BatchEvaluator(get_config(engine_config))
+    surrounded_queen_index = evaluator.feature_indexes['kSurrounded_queen_score']
+    game_model = HiveGame()
+    features = []
+    for board_state, _ in game_data['board state list']:
+        game_model.setup_board_state(board_state)
+        if game_model.is_white_wins or game_model.is_black_wins:
+            continue
+        position_features = evaluator.get_features(game_model)
+        if not position_features[surrounded_queen_index]:
+            features.append(position_features)
+    return features, [(result_score + 1.0) / 2.0] * len(features)
+
+
+def load_training_positions(game_paths: list[str], engine_config: str = '', cache_path: str = None,
+                            worker_processes: int = None) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Feature matrix (one row per position) and results of the saved games. Extracted on worker_processes processes (all
+    cores when None, in this process when 0), or read from cache_path if it was written for the same game files
+    """
+    game_keys = numpy.array([f'{os.path.basename(path)}:{os.path.getmtime(path)}' for path in game_paths], dtype=str)
+    if cache_path and os.path.isfile(cache_path):
+        with numpy.load(cache_path) as cache:
+            if numpy.array_equal(cache['game_keys'], game_keys):
+                return cache['features'], cache['results']
+
+    if worker_processes == 0:
+        game_features = [_get_game_features(path, engine_config) for path in game_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=worker_processes) as process_pool:
+            game_features = list(process_pool.map(_get_game_features, game_paths, [engine_config] * len(game_paths)))
+
+    feature_count = len(BatchEvaluator.kFeature_weight_keys)
+    features = numpy.array([row for rows, _ in game_features for row in rows], dtype=float).reshape(-1, feature_count)
+    results = numpy.array([result for _, game_results in game_features for result in game_results], dtype=float)
+    if cache_path:
+        numpy.savez(cache_path, game_keys=game_keys, features=features, results=results)
+    return features, results
+
+
+class WeightTuner:
+    """ Fits evaluation weights to a feature matrix and results, by minimizing the logistic loss """
+
+    def __init__(self, features: numpy.ndarray, results: numpy.ndarray, initial_weights: numpy.ndarray, worker_threads: int = None):
+        self.features = features
+        self.results = results
+        self.initial_weights = initial_weights.astype(float)
+        self.is_tuned = numpy.array([key in kWeight_options for key in BatchEvaluator.kFeature_weight_keys])
+        self.thread_pool = ThreadPoolExecutor(max_workers=worker_threads)
+        self.chunks = [slice(start, start + kChunk_rows) for start in range(0, len(results), kChunk_rows)]
+
+    def _get_chunk_loss(self, chunk: slice, weights: numpy.ndarray, scale: float) -> tuple[float, numpy.ndarray]:
+        """ Summed loss of a chunk of positions, and its gradient by the weights """
+        features, results = self.features[chunk], self.results[chunk]
+        logits = scale * (features @ weights)
+        log_partitions = numpy.logaddexp(0.0, logits)  # log(1 + exp(logit)), without overflow for large logits
+        loss = numpy.sum(log_partitions - results * logits)
+        predictions = numpy.exp(logits - log_partitions)
+        return float(loss), scale * (features.T @ (predictions - results))
+
+    def get_loss(self, weights: numpy.ndarray, scale: float) -> tuple[float, numpy.ndarray]:
+        """ Mean logistic loss over all positions, plus the L2 penalty, and its gradient by the tuned weights """
+        if not self.chunks:
+            return 0.0, numpy.zeros_like(weights)
+        chunk_losses = list(self.thread_pool.map(lambda chunk: self._get_chunk_loss(chunk, weights, scale), self.chunks))
+        weight_changes = weights - self.initial_weights
+        loss = sum(chunk_loss for chunk_loss, _ in chunk_losses) / len(self.results) + kL2_penalty * float(weight_changes @ weight_changes)
+        gradient = sum(chunk_gradient for _, chunk_gradient in chunk_losses) / len(self.results) + 2.0 * kL2_penalty * weight_changes
+        return loss, numpy.where(self.is_tuned, gradient, 0.0)
+
+    def fit_scale(self) -> float:
+        """ Scale of the logistic curve that best fits the results to the initial weights """
+        return float(min(kScale_candidates, key=lambda scale: self.get_loss(self.initial_weights, scale)[0]))
+
+    def tune(self, scale: float, iterations: int = 200, tolerance: float = 1e-9) -> numpy.ndarray:
+        """ Gradient descent from the initial weights, with a backtracking line search. Returns the tuned weights """
+        weights = self.initial_weights.copy()
+        loss, gradient = self.get_loss(weights, scale)
+        step = 1.0
+        for _ in range(iterations):
+            gradient_norm = float(gradient @ gradient)
+            if gradient_norm < tolerance:
+                break
+            while True:
+                new_weights = weights - step * gradient
+                new_loss, new_gradient = self.get_loss(new_weights, scale)
+                if new_loss <= loss - 0.5 * step * gradient_norm or step < 1e-12:
+                    break
+                step *= 0.5
+            if new_loss > loss:
+                break
+            weights, loss, gradient = new_weights, new_loss, new_gradient
+            step *= 2.0
+        return weights
+
+    def close(self) -> None:
+        self.thread_pool.shutdown()
+
+
+def write_engine_config(weights: numpy.ndarray, base_config_name: str, config_name: str) -> None:
+    """
+    Copy an engine config file, with the value of every tuned weight replaced by its new one. Every other line, comments
+    included, is copied as it is. Tuned weights missing from the base config are added to the end of their section.
+    Names are as for get_config()
+    """
+    new_values, option_names = dict(), dict()  # (section, lowercase option) -> new value, and the option's name
+    for key, weight in zip(BatchEvaluator.kFeature_weight_keys, weights):
+        if key in kWeight_options:
+            section, option = kWeight_options[key]
+            new_values[(section, option.lower())] = f'{weight:.6g}'
+            option_names[(section, option.lower())] = option
+
+    with open(get_config_path(base_config_name)) as f:
+        lines = f.read().splitlines()
+    section, section_ends = None, dict()  # Section -> index of the line after its last option
+    for line_index, line in enumerate(lines):
+        section_match = kSection_line.match(line)
+        option_match = kOption_line.match(line)
+        if section_match:
+            section = section_match.group(1).strip()
+            section_ends[section] = line_index + 1
+        elif option_match and section is not None:
+            key = (section, option_match.group(2).strip().lower())
+            if key in new_values:
+                lines[line_index] = option_match.group(1) + ' ' + new_values.pop(key)
+            section_ends[section] = line_index + 1
+
+    # Add the weights the base config lacks, inserting from the last section up so earlier line indexes stay valid
+    missing_sections = {section for section, _ in new_values}
+    for section in sorted(missing_sections.intersection(section_ends), key=section_ends.get, reverse=True):
+        lines[section_ends[section]:section_ends[section]] = [f'{option_names[key]} = {value}' for key, value in new_values.items() if key[0] == section]
+    for section in sorted(missing_sections.difference(section_ends)):
+        lines += ['', f'[{section}]'] + [f'{option_names[key]} = {value}' for key, value in new_values.items() if key[0] == section]
+    with open(get_config_path(config_name), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights to the results of the games in saved_games")
+    parser.add_argument('config_name', help="name of the tuned engine config file to write, next to the other config files")
+    parser.add_argument('--engine-config', default='pytest_engine_config', help="engine config to start from")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes and threads, default one per core")
+    args = parser.parse_args()
+
+    recorder = HiveRecorder()
+    training_features, training_results = load_training_positions(recorder.get_saved_game_paths(), args.engine_config,
+                                                                  os.path.join(recorder.saved_games_path, kFeatures_cache_file), args.workers)
+    if not len(training_results):
+        parser.exit(1, "No saved games with a result to tune from\n")
+
+    tuner = WeightTuner(training_features, training_results, BatchEvaluator(get_config(args.engine_config)).weights, args.workers)
+    logistic_scale = tuner.fit_scale()
+    start_loss = tuner.get_loss(tuner.initial_weights, logistic_scale)[0]
+    tuned_weights = tuner.tune(logistic_scale, args.iterations)
+    print(f"{len(training_results)} positions, scale {logistic_scale:.4g}: loss {start_loss:.5f} -> {tuner.get_loss(tuned_weights, logistic_scale)[0]:.5f}")
+    tuner.close()
+
+    write_engine_config(tuned_weights, args.engine_config, args.config_name)
+    print(f"Wrote {get_config_path(args.config_name)}")
@@ -38,6 +38,12 @@ def get_surrounding_hex_indexes(location: tuple) -> set[tuple]:
     return set((vector_add(location, offset)) for offset in Consts.neighboring_hex_offsets)
 
 
+def get_hex_distance(first: tuple, second: tuple) -> int:
+    """ Number of steps between two hexes. A step changes x by 1 and y by 1, or y by 2 """
+    dx, dy = abs(first[0] - second[0]), abs(first[1] - second[1])
+    return dx + max(0, (dy - dx) // 2)
+
+
 def is_move_slide_locked(start_hex: tuple, ending_hex: tuple, board_piece_locations: set[tuple]) -> bool:
     """
     A move is 'slide locked' if a piece on a physical board cannot be slid from its current hex to an adjacent, empty
@@ -108,31 +114,90 @@ def get_all_slidable_moves(starting_hex: tuple, board_piece_locations: set[tuple
 
 
 def get_valid_moves(candidate_moves: set[tuple], board_piece_locations: set[tuple]) -> set[tuple]:
-    """ For a set of candidate moves, filter out any moves that would result in a broken hive of multiple clusters """
+    """
+    For a set of candidate moves, filter out any moves that would result in a broken hive of multiple clusters
+
+    The board is split into its clusters once. Adding a hex yields a single hive exactly when that hex touches every
+    cluster, so each candidate then only costs a look at its six neighbors.
+    """
+    cluster_ids = get_hive_cluster_ids(board_piece_locations)
+    cluster_count = len(set(cluster_ids.values()))
 
-    # TODO: (Hash?) and cache known good board configurations? A lookup may be faster than topological analysis
     valid_moves = set()
     for move in candidate_moves:
-        candidate_board_state = board_piece_locations.copy()
-        candidate_board_state.add(move)
-        if is_hive_intact(candidate_board_state):
+        if move in cluster_ids:
+            is_intact = cluster_count <= 1
+        else:
+            touched_clusters = {cluster_ids[hex_loc] for hex_loc in get_surrounding_hex_indexes(move) if hex_loc in cluster_ids}
+            is_intact = len(touched_clusters) == cluster_count
+        if is_intact:
             valid_moves.add(move)
     return valid_moves
 
 
+def get_hive_cluster_ids(board_piece_locations: set[tuple]) -> dict[tuple, int]:
+    """ Label every occupied hex with the id of the connected cluster of pieces it belongs to """
+    cluster_ids = dict()
+    for starting_hex_loc in board_piece_locations:
+        if starting_hex_loc in cluster_ids:
+            continue
+        cluster_id = len(cluster_ids)
+        cluster_ids[starting_hex_loc] = cluster_id
+        hexes_to_visit = [starting_hex_loc]
+        while hexes_to_visit:
+            for neighbor_loc in get_surrounding_hex_indexes(hexes_to_visit.pop()).intersection(board_piece_locations):
+                if neighbor_loc not in cluster_ids:
+                    cluster_ids[neighbor_loc] = cluster_id
+                    hexes_to_visit.append(neighbor_loc)
+    return cluster_ids
+
+
 def is_hive_intact(board_piece_locations: set[tuple]) -> bool:
     """ For a given board state, determine if every piece is part of a single hive cluster. """
+    return len(set(get_hive_cluster_ids(board_piece_locations).values())) <= 1
+
 
-    def traverse_hive(hex_loc: tuple, _visited_hexes: set[tuple], _board_piece_locations: set[tuple]) -> set[tuple]:
-        unvisited_neighbors = get_surrounding_hex_indexes(hex_loc).intersection(_board_piece_locations).difference(
-            _visited_hexes)
-        if unvisited_neighbors:
-            _visited_hexes.update(unvisited_neighbors)
-            for neighbor_loc in unvisited_neighbors:
-                _visited_hexes.update(traverse_hive(neighbor_loc, _visited_hexes, board_piece_locations))
-        return _visited_hexes
-
-    board_size = len(board_piece_locations)
-    starting_hex_loc = board_piece_locations.pop()
-    all_visited_hexes = traverse_hive(starting_hex_loc, {starting_hex_loc}, board_piece_locations)
-    return len(all_visited_hexes) == board_size
+def get_articulation_points(board_piece_locations: set[tuple]) -> set[tuple]:
+    """
+    Find every occupied hex whose removal would split the hive into disparate clusters, ie the pieces that are pinned
+    by the 'one hive' rule.
+
+    This is a single iterative depth-first pass (Tarjan's articulation point algorithm), so the pinned status of every
+    piece on the board costs one traversal per position instead of one traversal per piece. A board that is already
+    broken into several clusters has no legal moves that keep one hive, so every hex of it is reported as pinned.
+    """
+    if not board_piece_locations:
+        return set()
+
+    root_hex_loc = next(iter(board_piece_locations))
+    discovery_order = {root_hex_loc: 0}
+    lowest_reachable = {root_hex_loc: 0}
+    articulation_points = set()
+    root_child_count = 0
+
+    # Each entry is (hex, parent hex, iterator over the occupied neighbors of hex still to explore)
+    search_stack = [(root_hex_loc, None, iter(get_surrounding_hex_indexes(root_hex_loc).intersection(board_piece_locations)))]
+    while search_stack:
+        hex_loc, parent_loc, neighbors_to_explore = search_stack[-1]
+        for neighbor_loc in neighbors_to_explore:
+            if neighbor_loc not in discovery_order:
+                discovery_order[neighbor_loc] = lowest_reachable[neighbor_loc] = len(discovery_order)
+                search_stack.append((neighbor_loc, hex_loc, iter(get_surrounding_hex_indexes(neighbor_loc).intersection(board_piece_locations))))
+                break
+            elif neighbor_loc != parent_loc:
+                lowest_reachable[hex_loc] = min(lowest_reachable[hex_loc], discovery_order[neighbor_loc])
+        else:
+            search_stack.pop()
+            if parent_loc == root_hex_loc:
+                root_child_count += 1
+            elif parent_loc is not None:
+                lowest_reachable[parent_loc] = min(lowest_reachable[parent_loc], lowest_reachable[hex_loc])
+                if lowest_reachable[hex_loc] >= discovery_order[parent_loc]:
+                    articulation_points.add(parent_loc)
+
+    if len(discovery_order) != len(board_piece_locations):
+        return set(board_piece_locations)
+
+    if root_child_count > 1:
+        articulation_points.add(root_hex_loc)
+    return articulation_points
@@ -99,6 +99,34 @@ class HiveGameManager:
         """ Tell the game model to load a new board state. board_state is what is packaged by get_raw_game_state() """
         self.game_model.setup_board_state(board_state)
 
+    def get_possible_moves(self) -> list[dict]:
+        """
+        Create all possible moves for the player on turn straight from the game model. Gives the same moves as
+        generate_all_possible_moves(get_raw_game_state()), without computing the opponent's moves and placements
+        """
+        player_color = self.game_model.player_on_turn
+        possible_moves = []
+
+        # Placements
+        if (self.game_model.is_black_must_place_queen if player_color == Consts.kBlack else self.game_model.is_white_must_place_queen):
+            types_to_place = ['queen']
+        else:
+            types_to_place = [piece_type for piece_type, pieces in self.game_model.pieces_dict.items() if any(piece.color == player_color and not piece.location for piece in pieces)]
+        if types_to_place:
+            placement_locations = self.game_model.get_piece_placement_locations(player_color)
+            for piece_type in types_to_place:
+                for location in placement_locations:
+                    possible_moves.append({'place piece': {'color': player_color, 'location': location, 'type': piece_type}})
+
+        # Movements
+        for location, stack in self.game_model.stacks.items():
+            piece = stack[-1]
+            if piece.color == player_color:
+                for moveable_hex in self.game_model.get_piece_movement_locations(location, piece.z_index):
+                    possible_moves.append({'move piece': {'from': location, 'to': moveable_hex, 'type': str(piece)}})
+
+        return possible_moves
+
     @staticmethod
     def generate_all_possible_moves(board_state: dict) -> list[dict]:
         """
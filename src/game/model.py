@@ -1,5 +1,7 @@
 """ Module for the core game model """
 import src.game.pieces as game_pieces
+import src.game.functions as hive_funcs
+import src.game.zobrist as zobrist
 from src.game.consts import Consts, get_config
 
 
@@ -9,6 +11,13 @@ class HiveGame(object):
     def __init__(self, config=None):
         self.config = get_config(config) if not config else config
         self.pieces_dict: dict[str, list[game_pieces.HivePiece]] = dict()
+        self.all_pieces: list[game_pieces.HivePiece] = []
+        self.stacks: dict[tuple, list[game_pieces.HivePiece]] = dict()  # hex location -> pieces, bottom to top
+        self.occupied_locations: set[tuple] = set()
+        self._pinned_locations: set[tuple] = None  # Cached per position, cleared whenever a hex is (un)occupied
+        self.undo_stack: list[tuple] = []  # Records pushed by make_move(), popped by unmake_move()
+        self.board_hash: int = 0  # Zobrist hash of the placed pieces, see zobrist.py
+        self.move_listeners: list = []  # Objects told of every make_move() and unmake_move(), e.g. an incremental evaluator
         self.white_turn_counter: int = 0
         self.black_turn_counter: int = 0
         self.reset_game()
@@ -23,16 +32,23 @@ class HiveGame(object):
 
     @property
     def piece_locations(self) -> list[tuple]:
-        """ The x/y location of every piece placed on the game board """
-        return [piece.location for piece in self.pieces if piece.location]
+        """ The x/y location of every occupied hex on the game board """
+        return list(self.occupied_locations)
+
+    @property
+    def pinned_locations(self) -> set[tuple]:
+        """ Occupied hexes whose piece may not move without breaking the hive. Computed once per position """
+        if self._pinned_locations is None:
+            self._pinned_locations = hive_funcs.get_articulation_points(self.occupied_locations)
+        return self._pinned_locations
 
     @property
     def is_black_wins(self) -> bool:
-        return self.white_queen.is_piece_surrounded(set(self.piece_locations))
+        return self.white_queen.is_piece_surrounded(self.occupied_locations)
 
     @property
     def is_white_wins(self) -> bool:
-        return self.black_queen.is_piece_surrounded(set(self.piece_locations))
+        return self.black_queen.is_piece_surrounded(self.occupied_locations)
 
     @property
     def is_white_must_place_queen(self) -> bool:
@@ -50,17 +66,19 @@ class HiveGame(object):
 
     @property
     def pieces(self) -> list[game_pieces.HivePiece]:
-        """ flatten the dict of hive pieces into a single list containing every piece, placed or not """
-        all_pieces = []
-        for piece_type in self.pieces_dict.values():
-            [all_pieces.append(piece) for piece in piece_type]
-        return all_pieces
+        """ The dict of hive pieces flattened into a single list containing every piece, placed or not """
+        return self.all_pieces
 
     @property
     def player_on_turn(self) -> str:
         """ Compare each player's turn counters to see who is on turn. Black always goes first. """
         return Consts.kBlack if (self.white_turn_counter >= self.black_turn_counter) else Consts.kWhite
 
+    @property
+    def position_hash(self) -> int:
+        """ 64-bit Zobrist hash of the position: every placed piece and its stack height, and the player on turn """
+        return self.board_hash if self.white_turn_counter >= self.black_turn_counter else self.board_hash ^ zobrist.white_to_move_key
+
     def _gen_pieces(self, _game_pieces_to_play: list[tuple]) -> None:
         """
         Create the dict that the model will use to manage all game pieces.
@@ -74,6 +92,48 @@ class HiveGame(object):
                 for _ in range(number):
                     self.pieces_dict[piece].append(game_pieces.piece_types[piece](color))
 
+        self.all_pieces = [piece for pieces_of_type in self.pieces_dict.values() for piece in pieces_of_type]
+        self.stacks = dict()
+        self.occupied_locations = set()
+        self._pinned_locations = None
+        self.undo_stack = []
+        self.board_hash = 0
+
+    def _get_stack_hash(self, location: tuple) -> int:
+        """ XOR of the zobrist keys of every piece stacked on a hex """
+        stack_hash = 0
+        for stack_height, piece in enumerate(self.stacks.get(location, [])):
+            stack_hash ^= zobrist.get_piece_key(str(piece), piece.color, location, stack_height)
+        return stack_hash
+
+    def _add_to_stack(self, piece: game_pieces.HivePiece, location: tuple) -> list[game_pieces.HivePiece]:
+        """ Put a piece on the hex stack at location, keeping the stack ordered from the bottom (lowest z-index) up """
+        if location not in self.occupied_locations:
+            self._pinned_locations = None
+        stack = self.stacks.setdefault(location, [])
+        if stack and stack[-1].z_index > piece.z_index:
+            # Only happens while setting up a board state: the piece goes beneath others, which shifts their heights
+            self.board_hash ^= self._get_stack_hash(location)
+            stack.append(piece)
+            stack.sort(key=lambda stacked_piece: stacked_piece.z_index)
+            self.board_hash ^= self._get_stack_hash(location)
+        else:
+            stack.append(piece)
+            self.board_hash ^= zobrist.get_piece_key(str(piece), piece.color, location, len(stack) - 1)
+        self.occupied_locations.add(location)
+        return stack
+
+    def _remove_from_stack(self, location: tuple) -> game_pieces.HivePiece:
+        """ Take the top piece off of the hex stack at location, freeing the hex if nothing is left beneath it """
+        stack = self.stacks[location]
+        piece = stack.pop()
+        self.board_hash ^= zobrist.get_piece_key(str(piece), piece.color, location, len(stack))
+        if not stack:
+            del self.stacks[location]
+            self.occupied_locations.discard(location)
+            self._pinned_locations = None
+        return piece
+
     def _update_turn(self, color: str) -> None:
         if color == Consts.kBlack:
             self.black_turn_counter += 1
@@ -85,19 +145,18 @@ class HiveGame(object):
         player_queen = [queen for queen in self.pieces_dict['queen'] if queen.color == player_color][0]
         return player_queen.location != ()
 
-    def _get_piece_by_location(self, selected_piece_location: tuple) -> int:
-        """ Search the list of pieces for a matching location and return the list index of that piece. """
-        for ix, piece in enumerate(self.pieces):
-            if piece.location == selected_piece_location and piece.z_index == 0:
-                return ix
+    def _get_piece_by_location(self, selected_piece_location: tuple) -> game_pieces.HivePiece:
+        """ Return the uncovered piece on top of the stack at a given location, or None for an empty hex """
+        stack = self.stacks.get(selected_piece_location)
+        return stack[-1] if stack else None
 
     def _get_open_spaces(self, color: str) -> set[tuple]:
         """ Find and return all open hexes neighboring a given color complex and that have at least 1 neighbor piece """
         open_hexes = set()
-        for piece in self.pieces:
-            if piece.color == color and piece.location:
-                open_hexes.update(piece.get_surrounding_locations())
-        return open_hexes.difference(self.piece_locations)
+        for stack in self.stacks.values():
+            if stack[-1].color == color:
+                open_hexes.update(stack[-1].get_surrounding_locations())
+        return open_hexes.difference(self.occupied_locations)
 
     def _cover_and_uncover_pieces(self, vacated_location: tuple, newly_occupied_location: tuple, moving_piece: game_pieces.HivePiece) -> None:
         """
@@ -107,9 +166,9 @@ class HiveGame(object):
         moving piece has moved off of the hive. Next we see if any piece(s) have been newly covered, which places the
         moving piece back on top of the hive. Reversing this order would leave the moving piece always off of the hive
         """
-        if [piece.remove_covering_piece() for piece in self.pieces if piece.location == vacated_location]:
+        if [piece.remove_covering_piece() for piece in self.stacks.get(vacated_location, [])]:
             moving_piece.is_ontop_of_hive = False
-        if [piece.add_covering_piece() for piece in self.pieces if piece.location == newly_occupied_location and piece is not moving_piece]:
+        if [piece.add_covering_piece() for piece in self.stacks[newly_occupied_location] if piece is not moving_piece]:
             moving_piece.is_ontop_of_hive = True
 
     def is_player_must_pass(self, color: str) -> bool:
@@ -144,9 +203,9 @@ class HiveGame(object):
     def get_piece_movement_locations(self, selected_piece_location: tuple, z_index: int = 0) -> set[tuple]:
         """ For a piece on top of the hive at a given location, return a set of all possible movement locations """
         if selected_piece_location != () and z_index == 0:
-            selected_piece = self.pieces[self._get_piece_by_location(selected_piece_location)]
+            selected_piece = self._get_piece_by_location(selected_piece_location)
             if self._can_player_move(selected_piece.color):
-                return selected_piece.get_movement_locations(set(self.piece_locations))
+                return selected_piece.get_movement_locations(self.occupied_locations, self.pinned_locations)
         return set()
 
     def setup_board_state(self, board_state: dict) -> None:
@@ -158,18 +217,34 @@ class HiveGame(object):
 
         # Place pieces first, before setting turn counters
         self._gen_pieces(Consts.standard_game_pieces)
-        buried_locations = []
         for piece in board_state['pieces']:
-            self.place_piece(piece['color'], tuple(piece['location']), piece['type'], piece['z-index'])
-            if piece['z-index'] < 0:
-                buried_locations.append(tuple(piece['location']))
+            if piece['location']:
+                self.place_piece(piece['color'], tuple(piece['location']), piece['type'], piece['z-index'])
 
-        for top_piece_location in buried_locations:
-            self.pieces[self._get_piece_by_location(top_piece_location)].is_ontop_of_hive = True
+        for stack in self.stacks.values():
+            if len(stack) > 1:
+                stack[-1].is_ontop_of_hive = True
 
         self.white_turn_counter = board_state['white turns']
         self.black_turn_counter = board_state['black turns']
 
+    def get_compact_state(self) -> tuple:
+        """
+        Small, picklable description of the position, for handing to other processes:
+        ((type, color, location, z-index) of each placed piece, bottom to top of each stack), white turns, black turns
+        """
+        placed_pieces = tuple((str(piece), piece.color, location, piece.z_index) for location, stack in self.stacks.items() for piece in stack)
+        return placed_pieces, self.white_turn_counter, self.black_turn_counter
+
+    def setup_compact_state(self, compact_state: tuple) -> None:
+        """ Configure internal state from a position packaged by get_compact_state() """
+        placed_pieces, white_turns, black_turns = compact_state
+        self.setup_board_state({
+            'pieces': [{'type': piece_type, 'color': color, 'location': location, 'z-index': z_index} for piece_type, color, location, z_index in placed_pieces],
+            'white turns': white_turns,
+            'black turns': black_turns,
+        })
+
     def reset_game(self) -> None:
         """ Initialize the game board with standard pieces and any selected optional pieces """
         self.white_turn_counter = 0
@@ -192,19 +267,64 @@ class HiveGame(object):
         z-index parameter is zero for new pieces, possibly a negative value when setting up pieces from an existing
         game state via setup_board_state()
         """
-        unplaced_of_type = [piece for piece in self.pieces if isinstance(piece, game_pieces.piece_types[piece_type]) and piece.color == color and not piece.location]
+        unplaced_of_type = [piece for piece in self.pieces_dict.get(piece_type, []) if piece.color == color and not piece.location]
         if unplaced_of_type:
             unplaced_of_type[0].location = location
             unplaced_of_type[0].z_index = z_index
+            self._add_to_stack(unplaced_of_type[0], location)
             self._update_turn(unplaced_of_type[0].color)
 
     def move_piece(self, selected_piece_location: tuple, new_location: tuple) -> None:
         """ Move a placed piece to a new location. This may (un)cover other pieces """
-        piece_to_move = self.pieces[self._get_piece_by_location(selected_piece_location)]
+        piece_to_move = self._remove_from_stack(selected_piece_location)
         piece_to_move.location = new_location
+        self._add_to_stack(piece_to_move, new_location)
         self._update_turn(piece_to_move.color)
         self._cover_and_uncover_pieces(selected_piece_location, new_location, piece_to_move)
 
+    def make_move(self, move: dict[str, dict]) -> None:
+        """
+        Play a turn given in the dict format of HiveGameManager.execute_turn(), and push an undo record so the turn can
+        be taken back with unmake_move(). Lets a search walk the game tree in place instead of rebuilding positions.
+
+        Undo record: (moved piece, its starting location, z-index, is_ontop_of_hive, white turns, black turns)
+        """
+        previous_position_hash = self.position_hash
+        undo_record = (None, (), 0, False, self.white_turn_counter, self.black_turn_counter)
+        if 'place piece' in move:
+            location = tuple(move['place piece']['location'])
+            self.place_piece(move['place piece']['color'], location, move['place piece']['type'])
+            if self.white_turn_counter != undo_record[4] or self.black_turn_counter != undo_record[5]:
+                undo_record = (self._get_piece_by_location(location), ) + undo_record[1:]
+        elif 'move piece' in move:
+            from_hex = tuple(move['move piece']['from'])
+            piece_to_move = self._get_piece_by_location(from_hex)
+            undo_record = (piece_to_move, from_hex, piece_to_move.z_index, piece_to_move.is_ontop_of_hive) + undo_record[4:]
+            self.move_piece(from_hex, tuple(move['move piece']['to']))
+        self.undo_stack.append(undo_record)
+        [listener.on_make_move(move, previous_position_hash) for listener in self.move_listeners]
+
+    def unmake_move(self) -> None:
+        """ Take back the most recent make_move(), restoring pieces, stacks and turn counters to their prior state """
+        previous_position_hash = self.position_hash
+        piece, from_location, z_index, is_ontop_of_hive, self.white_turn_counter, self.black_turn_counter = self.undo_stack.pop()
+        if piece is not None:
+            self._restore_moved_piece(piece, from_location, z_index, is_ontop_of_hive)
+        [listener.on_unmake_move(previous_position_hash) for listener in self.move_listeners]
+
+    def _restore_moved_piece(self, piece: game_pieces.HivePiece, from_location: tuple, z_index: int, is_ontop_of_hive: bool) -> None:
+        """ Put a piece back where it was before make_move() placed or moved it """
+        to_location = piece.location
+        self._remove_from_stack(to_location)
+        [covered_piece.remove_covering_piece() for covered_piece in self.stacks.get(to_location, [])]
+
+        piece.location = from_location
+        piece.z_index = z_index
+        piece.is_ontop_of_hive = is_ontop_of_hive
+        if from_location:
+            [uncovered_piece.add_covering_piece() for uncovered_piece in self.stacks.get(from_location, [])]
+            self._add_to_stack(piece, from_location)
+
 
 # Example of a board state dict:
 # sample_state = {'pieces': [{'type': 'queen', 'color': 'black', 'location': (0, 0), 'z-index': 0, 'moves': [(-1, 1), (-1, -1)]}, {'type': 'queen', 'color': 'white', 'location': (0, 2), 'z-index': -2, 'moves': []}, {'type': 'ant', 'color': 'black', 'location': (1, -1), 'z-index': 0, 'moves': [(2, -2), (2, 4), (4, 0), (-1, -1), (1, 5), (3, 1), (-1, 1), (3, -3), (-1, -3), (0, 6), (0, -4), (3, 3), (1, -3), (-1, 3), (4, -2), (-1, 5)]}, {'type': 'ant', 'color': 'black', 'location': (3, -1), 'z-index': 0, 'moves': [(2, -2), (2, 4), (-1, -1), (1, 5), (3, 1), (-1, 1), (-1, -3), (0, 6), (0, -4), (3, 3), (1, -3), (-1, 3), (-1, 5)]}, {'type': 'ant', 'color': 'black', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'ant', 'color': 'white', 'location': (1, 3), 'z-index': 0, 'moves': [(2, -2), (2, 4), (4, 0), (-1, -1), (1, 5), (3, 1), (-1, 1), (3, -3), (-1, -3), (0, 6), (0, -4), (3, 3), (-1, 3), (1, -3), (4, -2), (-1, 5)]}, {'type': 'ant', 'color': 'white', 'location': (1, 1), 'z-index': 0, 'moves': []}, {'type': 'ant', 'color': 'white', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'spider', 'color': 'black', 'location': (2, 0), 'z-index': 0, 'moves': []}, {'type': 'spider', 'color': 'black', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'spider', 'color': 'white', 'location': (2, 2), 'z-index': 0, 'moves': [(4, -2), (0, 6)]}, {'type': 'spider', 'color': 'white', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'beetle', 'color': 'black', 'location': (0, 2), 'z-index': -1, 'moves': []}, {'type': 'beetle', 'color': 'black', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'beetle', 'color': 'white', 'location': (0, 2), 'z-index': 0, 'moves': [(0, 4), (0, 0), (-1, 1), (1, 1), (-1, 3), (1, 3)]}, {'type': 'beetle', 'color': 'white', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'grasshopper', 'color': 'black', 'location': (0, -2), 'z-index': 0, 'moves': [(3, 1), (0, 6)]}, {'type': 'grasshopper', 'color': 'black', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'grasshopper', 'color': 'black', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'grasshopper', 'color': 'white', 'location': (0, 4), 'z-index': 0, 'moves': [(3, 1), (0, -4)]}, {'type': 'grasshopper', 'color': 'white', 'location': (), 'z-index': 0, 'moves': []}, {'type': 'grasshopper', 'color': 'white', 'location': (), 'z-index': 0, 'moves': []}], 'player turn': 'black', 'black placements': [(2, -2), (4, 0), (-1, -1), (3, -3), (-1, -3), (0, -4), (1, -3), (4, -2)], 'white placements': [(2, 4), (1, 5), (0, 6), (3, 3), (-1, 3), (-1, 5)], 'white must place queen': False, 'black must place queen': False, 'white wins': False, 'black wins': False, 'black turns': 8, 'white turns': 8}
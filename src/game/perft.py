@@ -0,0 +1,131 @@
+"""
+Perft: counts of the positions reachable from a position in an exact number of moves
+
+Walks the whole move tree to a depth with HiveGameManager.get_possible_moves() and the model's make_move() /
+unmake_move(), and counts the positions at that depth. The counts only depend on the rules, so any change to move
+generation that alters them has changed which moves are legal: they are pinned in the tests for the reference positions
+below. Timing the walk gives move generation throughput in positions per second.
+
+A finished game has no moves: positions where a queen is surrounded are not searched any further. Neither are positions
+without any legal move, as the game model has no pass move yet.
+
+Divide reports the count below each root move separately, to narrow a wrong total down to the moves that cause it.
+Root moves can be counted on a pool of worker processes.
+
+Run with, e.g.: python -m src.game.perft 3 --position opening --divide
+"""
+from src.game.manager import HiveGameManager
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import time
+
+
+def _place(color: str, location: tuple, piece_type: str) -> dict[str, dict]:
+    return {'place piece': {'color': color, 'location': location, 'type': piece_type}}
+
+
+def _move(from_location: tuple, to_location: tuple, piece_type: str) -> dict[str, dict]:
+    return {'move piece': {'from': from_location, 'to': to_location, 'type': piece_type}}
+
+
+# Reference positions, as the moves that lead to them from the start of a game
+kReference_positions = {
+    'start': [],
+    'opening': [_place('black', (0, 0), 'queen'), _place('white', (0, 2), 'queen'),
+                _place('black', (0, -2), 'ant'), _place('white', (0, 4), 'ant')],
+    'midgame': [_place('black', (0, 0), 'queen'), _place('white', (0, 2), 'queen'),
+                _place('black', (0, -2), 'ant'), _place('white', (0, 4), 'ant'),
+                _place('black', (1, -3), 'beetle'), _place('white', (1, 5), 'beetle'),
+                _place('black', (-1, -3), 'grasshopper'), _place('white', (-1, 5), 'spider'),
+                _move((1, -3), (0, -2), 'beetle'), _move((1, 5), (1, 3), 'beetle')],
+}
+
+
+def setup_reference_position(game_manager: HiveGameManager, position_name: str) -> None:
+    """ Play the moves of a reference position from the start of a new game """
+    game_manager.game_model.reset_game()
+    for move in kReference_positions[position_name]:
+        game_manager.execute_turn(move)
+
+
+def perft(game_manager: HiveGameManager, depth: int) -> int:
+    """ Number of positions exactly depth moves below the game model's position """
+    game_model = game_manager.game_model
+    if depth <= 0:
+        return 1
+    if game_model.is_white_wins or game_model.is_black_wins:
+        return 0
+    moves = game_manager.get_possible_moves()
+    if depth == 1:
+        return len(moves)
+
+    position_count = 0
+    for move in moves:
+        game_model.make_move(move)
+        position_count += perft(game_manager, depth - 1)
+        game_model.unmake_move()
+    return position_count
+
+
+# Worker processes each hold one game manager of their own, created when first needed
+_worker_game_manager: HiveGameManager = None
+
+
+def _perft_move_in_worker(compact_state: tuple, move: dict[str, dict], depth: int) -> int:
+    """ perft() below one root move, in a worker process """
+    global _worker_game_manager
+    if _worker_game_manager is None:
+        _worker_game_manager = HiveGameManager()
+    game_model = _worker_game_manager.game_model
+    game_model.setup_compact_state(compact_state)
+    game_model.make_move(move)
+    return perft(_worker_game_manager, depth - 1)
+
+
+def divide(game_manager: HiveGameManager, depth: int, worker_processes: int = 0) -> list[tuple[dict, int]]:
+    """
+    perft() below each root move of the model's position: (move, count) per move. Root moves are spread across
+    worker_processes processes, all cores when None, or counted in this process when 0
+    """
+    game_model = game_manager.game_model
+    if depth <= 0 or game_model.is_white_wins or game_model.is_black_wins:
+        return []
+    moves = game_manager.get_possible_moves()
+
+    if worker_processes == 0:
+        counts = []
+        for move in moves:
+            game_model.make_move(move)
+            counts.append(perft(game_manager, depth - 1))
+            game_model.unmake_move()
+    else:
+        compact_state = game_model.get_compact_state()
+        with ProcessPoolExecutor(max_workers=worker_processes) as process_pool:
+            counts = list(process_pool.map(_perft_move_in_worker, [compact_state] * len(moves), moves, [depth] * len(moves)))
+    return list(zip(moves, counts))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count the positions reachable in an exact number of moves, and time it")
+    parser.add_argument('depth', type=int)
+    parser.add_argument('--position', choices=list(kReference_positions), default=None, help="reference position, default all of them")
+    parser.add_argument('--divide', action='store_true', help="show the count below each root move")
+    parser.add_argument('--workers', type=int, default=0, help="worker processes for root moves, 0 (default) to count in this process")
+    args = parser.parse_args()
+
+    manager = HiveGameManager()
+    for name in [args.position] if args.position else kReference_positions:
+        setup_reference_position(manager, name)
+        start = time.perf_counter()
+        if args.divide or args.workers != 0:
+            move_counts = divide(manager, args.depth, args.workers)
+            total = sum(count for _, count in move_counts)
+        else:
+            move_counts, total = [], perft(manager, args.depth)
+        elapsed = time.perf_counter() - start
+
+        if args.divide:
+            for root_move, count in move_counts:
+                print(f'    {root_move}: {count}')
+        print(f'{name} perft({args.depth}) = {total} in {elapsed:.2f}s, {total / elapsed if elapsed > 0 else 0:.0f} positions/s')
@@ -29,13 +29,16 @@ class HivePiece(ABC):
             return len(hive_funcs.get_surrounding_hex_indexes(self.location).difference(board_piece_locations)) == 0
         return False
 
-    def can_piece_move(self, board_piece_locations: set[tuple]) -> bool:
+    def can_piece_move(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> bool:
         """
         Determine if a piece is eligible to be moved
 
         - Piece covered by other pieces cannot move
         - Pieces that slide when moving cannot move if they are locked in place by other pieces
         - No movement may isolate a portion of the hive
+
+        pinned_locations are the articulation points of the board (see hive_funcs.get_articulation_points). They are
+        computed here if not given, but callers checking many pieces of one position should compute them once and share.
         """
 
         # Cannot move if covered by another piece
@@ -47,7 +50,9 @@ class HivePiece(ABC):
             return False
 
         # Pieces in motion may not separate the hive into disparate pieces
-        return hive_funcs.is_hive_intact(board_piece_locations.difference({self.location}))
+        if pinned_locations is None:
+            pinned_locations = hive_funcs.get_articulation_points(board_piece_locations)
+        return self.location not in pinned_locations
 
     def update_location(self, new_location: tuple) -> None:
         self.location = new_location
@@ -67,31 +72,31 @@ class HivePiece(ABC):
         self.z_index += 1
 
     @abstractmethod
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Unique movement method that must be implemented by each piece """
         pass
 
 
 class Queen(HivePiece):
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Moves one hex in any direction """
-        if self.can_piece_move(board_piece_locations):
+        if self.can_piece_move(board_piece_locations, pinned_locations):
             return hive_funcs.get_slidable_moves(self.location, board_piece_locations)
         return set()
 
 
 class Ant(HivePiece):
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Moves any number of hexes along the hive, provided it can slide across the table into position """
-        if self.can_piece_move(board_piece_locations):
+        if self.can_piece_move(board_piece_locations, pinned_locations):
             return hive_funcs.get_all_slidable_moves(self.location, board_piece_locations)
         return set()
 
 
 class Spider(HivePiece):
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Moves by sliding exactly three hexes from it's location """
-        if self.can_piece_move(board_piece_locations):
+        if self.can_piece_move(board_piece_locations, pinned_locations):
             return hive_funcs.get_all_slidable_moves(self.location, board_piece_locations, is_spider_move=True)
         return set()
 
@@ -101,13 +106,13 @@ class Beetle(HivePiece):
         super().__init__(*args, **kwargs)
         self.is_slide_rule_applied = False
 
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Slides one hex in any direction. May climb on hive. May dismount the hive in any direction """
         if self.is_ontop_of_hive and self.z_index >= 0:
             # Every hex is available when moving off of the hive
             return hive_funcs.get_surrounding_hex_indexes(self.location)
 
-        if self.can_piece_move(board_piece_locations):
+        if self.can_piece_move(board_piece_locations, pinned_locations):
             open_moves = hive_funcs.get_slidable_moves(self.location, board_piece_locations)
             open_moves.update(board_piece_locations.intersection(hive_funcs.get_surrounding_hex_indexes(self.location)))
             return open_moves
@@ -119,10 +124,10 @@ class Grasshopper(HivePiece):
         super().__init__(*args, **kwargs)
         self.is_slide_rule_applied = False
 
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Moves by hopping in straight lines over neighbors. No distance limit. No slide rule """
         hoppable_hexes = set()
-        if self.can_piece_move(board_piece_locations):
+        if self.can_piece_move(board_piece_locations, pinned_locations):
             neighbor_locations = hive_funcs.get_surrounding_hex_indexes(self.location).intersection(board_piece_locations)
             vectors_to_neighbors = [hive_funcs.vector_subtract(loc, self.location) for loc in neighbor_locations]
             for vector in vectors_to_neighbors:
@@ -136,7 +141,7 @@ class Grasshopper(HivePiece):
 
 
 class Mosquito(HivePiece):
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Not yet implemented """
         pass
 
@@ -146,13 +151,13 @@ class Ladybug(HivePiece):
         super().__init__(*args, **kwargs)
         self.is_slide_rule_applied = False
 
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Not yet implemented """
         pass
 
 
 class Mealworm(HivePiece):
-    def get_movement_locations(self, board_piece_locations: set[tuple]) -> set[tuple]:
+    def get_movement_locations(self, board_piece_locations: set[tuple], pinned_locations: set[tuple] = None) -> set[tuple]:
         """ Not yet implemented """
         pass
 
@@ -0,0 +1,29 @@
+"""
+Zobrist keys for hashing Hive positions
+
+A position hash is the XOR of one key per placed piece, chosen by (piece type, color, hex, stack height), plus a key
+for the side to move. Placing, moving or taking back a piece therefore only XORs one or two keys in or out of the hash.
+
+The Hive board has no edges, so keys are derived on demand from the key's own description instead of coming from a
+pre-generated table. The derivation is deterministic, which keeps hashes identical across processes and sessions.
+"""
+import hashlib
+
+_piece_keys: dict[tuple, int] = dict()
+
+
+def _derive_key(description: str) -> int:
+    """ Deterministically derive a 64-bit key from a text description """
+    return int.from_bytes(hashlib.blake2b(description.encode(), digest_size=8).digest(), 'little')
+
+
+def get_piece_key(piece_type: str, color: str, location: tuple, stack_height: int) -> int:
+    """ Key for a piece of a given type and color at a hex location. Stack height is 0 for a piece on the table """
+    key_description = (piece_type, color, location, stack_height)
+    key = _piece_keys.get(key_description)
+    if key is None:
+        key = _piece_keys[key_description] = _derive_key(repr(key_description))
+    return key
+
+
+white_to_move_key: int = _derive_key('white to move')
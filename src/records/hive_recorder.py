@@ -63,3 +63,20 @@ class HiveRecorder:
                 return True
         else:
             return False
+
+    def get_saved_game_paths(self) -> list[str]:
+        """ Paths of every game saved by save_game_to_file(), in the saved games directory and its subdirectories, oldest first """
+        paths = [os.path.join(directory, filename) for directory, _, filenames in os.walk(self.saved_games_path)
+                 for filename in filenames if filename.startswith('hive_game_')]
+        return sorted(paths, key=os.path.getmtime)
+
+    def load_game_from_file(self, path: str) -> dict[str, [dict, list]]:
+        """ Load a game saved by save_game_to_file() into the recorder. Returns the game data: header and board state list """
+        with open(path) as f:
+            game_data = json.load(f)
+
+        self.reset()
+        self.filename = os.path.basename(path)
+        self.game_information_header.update(game_data['game information'])
+        self.position_list.extend((board_state, move_time) for board_state, move_time in game_data['board state list'])
+        return self.game_data
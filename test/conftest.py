@@ -109,3 +109,29 @@ def empty_saved_game():
     game_record = HiveRecorder()
     game_record.start_recording({'test_key': 'test_value'}, 'pytest', 'unittest', time_control='10+10')
     return game_record
+
+
+@pytest.fixture
+def black_wins_in_one_board_state():
+    """ Black to move. Sliding the black ant from (0, -2) around to (1, 3) surrounds the white queen """
+    placed_pieces = [
+        ('queen', Consts.kBlack, (0, 0)), ('queen', Consts.kWhite, (0, 2)), ('beetle', Consts.kBlack, (-1, 1)),
+        ('spider', Consts.kBlack, (-1, 3)), ('ant', Consts.kWhite, (0, 4)), ('spider', Consts.kWhite, (1, 1)),
+        ('ant', Consts.kBlack, (0, -2)), ('grasshopper', Consts.kWhite, (2, 0)),
+    ]
+    return {
+        'pieces': [{'type': piece_type, 'color': color, 'location': location, 'z-index': 0} for piece_type, color, location in placed_pieces],
+        'white turns': 4,
+        'black turns': 4,
+    }
+
+
+@pytest.fixture
+def two_queens_board_state():
+    """ Black to move. Both queens placed, black's at (0, 0) and white's at (0, 2), and nothing else """
+    return {
+        'pieces': [{'type': 'queen', 'color': color, 'location': location, 'z-index': 0}
+                   for color, location in ((Consts.kBlack, (0, 0)), (Consts.kWhite, (0, 2)))],
+        'white turns': 1,
+        'black turns': 1,
+    }
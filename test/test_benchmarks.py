@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from src.game.manager import HiveGameManager
+from src.benchmarks.micro_benchmarks import load_corpus, get_benchmarks, run_benchmarks, load_baselines, save_baselines, get_regressions
+
+
+def test_corpus_and_baselines():
+    manager = HiveGameManager()
+    corpus = load_corpus()
+    assert list(corpus) == ['early', 'middle', 'late']
+    for board_state in corpus.values():
+        manager.set_board_state(board_state)
+        assert not manager.game_model.is_white_wins and not manager.game_model.is_black_wins
+        assert manager.get_possible_moves()
+
+    # Every benchmark has a committed baseline
+    assert sorted(benchmark.name for benchmark in get_benchmarks(corpus)) == sorted(load_baselines()['benchmarks'])
+
+
+def test_run_benchmarks(tmp_path):
+    benchmarks = get_benchmarks(name_filter='[early]')
+    benchmarks = [benchmark for benchmark in benchmarks if benchmark.name.startswith(('is_hive_intact', 'choose_move'))]
+    results = run_benchmarks(benchmarks, repeats=2, min_run_time_s=0.001)
+    assert sorted(results) == ['choose_move[early]', 'is_hive_intact[early]']
+    assert all(0.0 < seconds < 10.0 for seconds in results.values())
+
+    baselines_path = str(tmp_path / 'baselines.json')
+    assert load_baselines(baselines_path) == {'machine': {}, 'benchmarks': {}}
+    save_baselines(results, baselines_path)
+    save_baselines({'get_raw_game_state[late]': 1e-3}, baselines_path)
+    baselines = load_baselines(baselines_path)
+    assert baselines['benchmarks'] == {**results, 'get_raw_game_state[late]': 1e-3}
+    assert baselines['machine']
+
+
+def test_get_regressions():
+    baseline_results = {'a': 1.0, 'b': 1.0, 'c': 1.0}
+    results = {'a': 1.2, 'b': 1.3, 'c': 0.5, 'new': 100.0}
+    assert get_regressions(results, baseline_results, tolerance=0.25) == ['b']
+    assert get_regressions(results, baseline_results, tolerance=0.1) == ['a', 'b']
+    assert get_regressions(results, {}, tolerance=0.0) == []
+
+
+def test_incremental_evaluation_speedup():
+    # Following the model move by move evaluates a position's children well ahead of evaluating each from scratch
+    benchmarks = [benchmark for benchmark in get_benchmarks(name_filter='[late]') if benchmark.name.startswith(('evaluate_game', 'IncrementalEvaluator'))]
+    results = run_benchmarks(benchmarks, repeats=3, min_run_time_s=0.001)
+    assert results['IncrementalEvaluator.evaluate[late]'] * 2 < results['evaluate_game[late]']
+
+
+def test_benchmarks_without_numpy():
+    # The benchmarks, and the engine they time, import on a Python without numpy
+    code = "import sys; sys.modules['numpy'] = None; import src.benchmarks.micro_benchmarks"
+    subprocess.run([sys.executable, '-c', code], cwd=os.path.join(os.path.dirname(__file__), os.pardir), check=True)
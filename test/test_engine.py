@@ -0,0 +1,433 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import math
+import numpy
+import pytest
+import random
+import time
+
+from src.game.consts import Consts
+from src.engine.move_codec import pack_move, unpack_move
+from src.engine.transposition_table import TranspositionTable
+from src.engine.shared_transposition_table import SharedTranspositionTable
+from src.engine.move_ordering import MoveOrderer
+from src.engine.hive_engine import BasicEngine, _search_root_move_in_worker
+from src.engine.evaluator import Evaluator
+from src.engine.evaluation_cache import EvaluationCache
+from src.engine.incremental_evaluator import IncrementalEvaluator
+from src.engine.engine_config import get_config, get_config_path
+from src.engine.batch_evaluator import BatchEvaluator
+from src.game.manager import HiveGameManager
+from src.benchmarks.micro_benchmarks import load_corpus
+
+
+def test_config_without_search_options(tmp_path):
+    # Configs that only hold the evaluation weights, as written before the search options existed, still load
+    with open(get_config_path()) as f:
+        weight_lines = f.read().split('[Search]')[0]
+    config_path = str(tmp_path / 'weights_only_engine_config')
+    with open(config_path, 'w') as f:
+        f.write(weight_lines)
+    config = get_config(config_path)
+    assert config['kPlayer_turn_bonus'] == get_config()['kPlayer_turn_bonus']
+    assert config['kWorker_processes'] == 0 and config['kQuiescence_node_limit'] == 50 and not config['kIs_pondering']
+    assert config['kOpening_book_file'] == 'opening_book.bin' and config['kMcts_playouts_per_move'] == 100
+    BasicEngine(config_path).close()
+
+
+def test_move_codec():
+    placement = {'place piece': {'color': Consts.kWhite, 'location': (-3, 5), 'type': 'grasshopper'}}
+    movement = {'move piece': {'from': (0, -2), 'to': (-1, 1), 'type': 'beetle'}}
+    assert unpack_move(pack_move(placement)) == placement
+    assert unpack_move(pack_move(movement)) == movement
+    assert pack_move(placement) != pack_move({'place piece': {'color': Consts.kBlack, 'location': (-3, 5), 'type': 'grasshopper'}})
+
+
+def test_transposition_table():
+    table = TranspositionTable(0.01)
+    move = {'place piece': {'color': Consts.kBlack, 'location': (0, 0), 'type': 'ant'}}
+    colliding_hash = 12345 + table.entry_count
+
+    assert table.probe(12345) is None
+    table.store(12345, 2, TranspositionTable.kLower_bound, 1.5, move)
+    entry = table.probe(12345)
+    assert (entry.depth, entry.bound, entry.score, entry.move) == (2, TranspositionTable.kLower_bound, 1.5, move)
+
+    # Shallower results for another position in the same slot do not replace deeper ones from the current search...
+    table.store(colliding_hash, 1, TranspositionTable.kExact, 0.0)
+    assert table.probe(colliding_hash) is None
+
+    # ...but results left over from an older search do get replaced
+    table.new_search()
+    table.store(colliding_hash, 1, TranspositionTable.kExact, 0.0)
+    assert table.probe(colliding_hash).score == 0.0
+    assert table.probe(12345) is None
+
+    # Results for the same position keep a known best move if the new result has none
+    table.store(colliding_hash, 0, TranspositionTable.kExact, 0.5, move)
+    table.store(colliding_hash, 3, TranspositionTable.kUpper_bound, -0.5)
+    assert table.probe(colliding_hash).move == move
+
+
+def test_engine_finds_win_in_one(black_wins_in_one_board_state):
+    engine = BasicEngine()
+    engine.reset(black_wins_in_one_board_state, 2)
+    best_move = engine.choose_move()
+    assert best_move['move piece']['to'] == (1, 3)
+    assert engine.best_evaluation == -BasicEngine.kWin_score
+
+
+def test_alpha_beta_matches_minimax(two_queens_board_state):
+    engine = BasicEngine()
+    engine.config['kQuiescence_node_limit'] = 0
+    engine.reset(two_queens_board_state, 2)
+    game_model = engine.model_manager.game_model
+
+    def minimax(depth):
+        terminal_score = engine._get_terminal_score()
+        if terminal_score is not None:
+            return terminal_score
+        if depth == 0:
+            return engine._evaluate()
+        scores = []
+        for move in engine.model_manager.get_possible_moves():
+            game_model.make_move(move)
+            scores.append(-minimax(depth - 1))
+            game_model.unmake_move()
+        return max(scores)
+
+    assert engine._search_root(2)[1] == minimax(2)
+
+
+def test_engine_respects_move_time_limit(two_queens_board_state):
+    engine = BasicEngine()
+    engine.model_manager.config['kTime_per_move'] = 1
+    engine.reset(two_queens_board_state, 20)
+
+    start = time.perf_counter()
+    best_move = engine.choose_move()
+    assert time.perf_counter() - start < 1.25
+    assert best_move in engine.model_manager.get_possible_moves()
+    assert 1 <= engine.completed_depth < 20
+
+
+def test_engine_game_clock():
+    engine = BasicEngine()
+    engine.model_manager.config['kTime_per_game'] = 10
+    engine.model_manager.config['kTime_increment_per_move'] = 2
+    engine.reset({'pieces': [], 'white turns': 0, 'black turns': 0}, 1)
+    assert engine.clock_remaining_s == 10
+    assert engine._get_move_time_budget() == 10 / BasicEngine.kMoves_to_go_estimate + 2
+
+    engine.clock_remaining_s = 0.5
+    assert engine._get_move_time_budget() == 0.5 - BasicEngine.kClock_safety_margin_s
+
+
+def test_move_ordering(game_board_2_queens):
+    orderer = MoveOrderer()
+    hash_move = {'place piece': {'color': Consts.kBlack, 'location': (0, -2), 'type': 'spider'}}
+    killer_move = {'place piece': {'color': Consts.kBlack, 'location': (1, -1), 'type': 'ant'}}
+    history_move = {'place piece': {'color': Consts.kBlack, 'location': (-1, -1), 'type': 'beetle'}}
+    queen_threat_move = {'move piece': {'from': (0, -2), 'to': (1, 1), 'type': 'ant'}}
+    quiet_move = {'place piece': {'color': Consts.kBlack, 'location': (-1, -1), 'type': 'grasshopper'}}
+
+    orderer.record_cutoff(killer_move, 1, 3)
+    orderer.record_cutoff(history_move, 2, 5)
+
+    moves = [quiet_move, history_move, killer_move, queen_threat_move, hash_move]
+    assert orderer.order_moves(moves, game_board_2_queens, 3, hash_move) == [hash_move, queen_threat_move, killer_move, history_move, quiet_move]
+
+    # Killers only apply at their own ply, and are forgotten by the next search
+    assert orderer.order_moves(moves, game_board_2_queens, 4)[1:3] == [history_move, killer_move]
+    orderer.reset()
+    assert orderer.order_moves(moves, game_board_2_queens, 3)[1:4] == moves[:3]
+
+
+def test_parallel_root_search_matches_serial(two_queens_board_state):
+    # White on turn, after black's ant
+    two_queens_board_state['pieces'].append({'type': 'ant', 'color': Consts.kBlack, 'location': (0, -2), 'z-index': 0})
+    two_queens_board_state['black turns'] = 2
+    serial_engine = BasicEngine()
+    serial_engine.reset(two_queens_board_state, 2)
+    serial_move = serial_engine.choose_move()
+
+    parallel_engine = BasicEngine()
+    parallel_engine.config['kWorker_processes'] = 2
+    try:
+        for _ in range(2):
+            # The worker pool is reused by the second search
+            parallel_engine.reset(two_queens_board_state, 2)
+            assert parallel_engine.choose_move() == serial_move
+            assert parallel_engine.best_evaluation == serial_engine.best_evaluation
+    finally:
+        parallel_engine.close()
+
+
+def test_stop_parallel_search(black_wins_in_one_board_state):
+    # Stopping a parallel search also stops the root moves running in the worker processes
+    black_wins_in_one_board_state['white turns'] = 3
+    engine = BasicEngine()
+    engine.config['kWorker_processes'] = 2
+    try:
+        engine.reset(black_wins_in_one_board_state, 20)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(engine.choose_move)
+            time.sleep(2.0)
+            engine.stop_search()
+            start = time.perf_counter()
+            assert future.result(timeout=5.0) in engine.model_manager.get_possible_moves()
+        assert time.perf_counter() - start < 1.0
+
+        # A root move that a worker would search for far longer stops as soon as it is told to
+        game_model = engine.model_manager.game_model
+        move = engine.model_manager.get_possible_moves()[0]
+        engine.worker_stop_event.clear()
+        worker_future = engine.process_pool.submit(_search_root_move_in_worker, game_model.get_compact_state(), move, 20, -math.inf, True, 0, None)
+        time.sleep(0.5)
+        engine.worker_stop_event.set()
+        assert worker_future.result(timeout=2.0) is None
+
+        engine.reset(black_wins_in_one_board_state, 1)
+        engine.choose_move()
+        assert engine.completed_depth == 1
+    finally:
+        engine.close()
+
+
+def test_shared_transposition_table():
+    move = {'move piece': {'from': (0, -2), 'to': (1, 1), 'type': 'ant'}}
+    owner_table = SharedTranspositionTable(0.01)
+    attached_table = SharedTranspositionTable.attach(owner_table.name)
+    try:
+        assert attached_table.entry_count == owner_table.entry_count
+
+        # Results stored by one process are seen by the others
+        owner_table.store(987654321, 4, TranspositionTable.kUpper_bound, -2.5, move)
+        entry = attached_table.probe(987654321)
+        assert (entry.depth, entry.bound, entry.score, entry.move) == (4, TranspositionTable.kUpper_bound, -2.5, move)
+
+        owner_table.new_search()
+        assert attached_table.generation == owner_table.generation == 1
+
+        # A torn write leaves an entry that no longer validates against its position hash
+        slot_offset = owner_table.kHeader_size_bytes + (987654321 & owner_table.index_mask) * owner_table.kEntry_size_bytes
+        owner_table.buffer[slot_offset + 16] ^= 0xFF
+        assert attached_table.probe(987654321) is None
+    finally:
+        attached_table.close()
+        owner_table.close()
+        owner_table.unlink()
+
+
+def test_parallel_search_with_shared_table(two_queens_board_state):
+    engine = BasicEngine()
+    engine.config['kWorker_processes'] = 2
+    engine.config['kIs_deterministic_search'] = False
+    try:
+        engine.reset(two_queens_board_state, 2)
+        assert engine.choose_move() in engine.model_manager.get_possible_moves()
+        assert isinstance(engine.transposition_table, SharedTranspositionTable)
+        assert engine.transposition_table.probe(engine.model_manager.game_model.position_hash).depth == 2
+    finally:
+        engine.close()
+
+
+def test_incremental_evaluator(black_wins_in_one_board_state):
+    manager = HiveGameManager()
+    game_model = manager.game_model
+    evaluator = Evaluator()
+    incremental_evaluator = IncrementalEvaluator(evaluator.config, game_model)
+    manager.set_board_state(black_wins_in_one_board_state)
+
+    def assert_matches_evaluator():
+        assert abs(incremental_evaluator.evaluate() - evaluator.evaluate_board_state(manager.get_raw_game_state())) < 1e-9
+
+    assert_matches_evaluator()
+    for move in manager.get_possible_moves():
+        game_model.make_move(move)
+        assert_matches_evaluator()
+        for reply in manager.get_possible_moves()[::20]:
+            game_model.make_move(reply)
+            assert_matches_evaluator()
+            game_model.unmake_move()
+        game_model.unmake_move()
+    assert_matches_evaluator()
+    assert not incremental_evaluator.changed_locations_stack
+
+    # Changes made outside of make_move() are caught by position hash
+    manager.execute_turn({'place piece': {'color': Consts.kBlack, 'location': (-2, 0), 'type': 'ant'}})
+    assert_matches_evaluator()
+
+
+def test_incremental_mobility():
+    # Random walks of makes and unmakes from a full board: the kept moves always match moves generated from scratch
+    manager = HiveGameManager()
+    game_model = manager.game_model
+    evaluator = Evaluator()
+    incremental_evaluator = IncrementalEvaluator(evaluator.config, game_model)
+    manager.set_board_state(load_corpus()['late'])
+    incremental_evaluator.evaluate()
+    move_random = random.Random(1)
+    for _ in range(150):
+        moves = manager.get_possible_moves()
+        if moves and len(game_model.undo_stack) < 6 and not (game_model.is_white_wins or game_model.is_black_wins):
+            game_model.make_move(move_random.choice(moves))
+        elif game_model.undo_stack:
+            game_model.unmake_move()
+        update_count = incremental_evaluator.mobility_update_count
+        assert incremental_evaluator.evaluate() == pytest.approx(evaluator.evaluate_game(game_model), abs=1e-9)
+        assert incremental_evaluator.moves_by_location == Evaluator.get_moves_by_location(game_model)
+        assert incremental_evaluator.mobility_update_count - update_count <= len(game_model.stacks)
+
+    # Only the pieces a move can affect have their moves generated again
+    update_count = incremental_evaluator.mobility_update_count
+    game_model.make_move(manager.get_possible_moves()[0])
+    incremental_evaluator.evaluate()
+    assert incremental_evaluator.mobility_update_count - update_count < len(game_model.stacks)
+
+
+def test_evaluate_game(black_wins_in_one_board_state):
+    manager = HiveGameManager()
+    manager.set_board_state(black_wins_in_one_board_state)
+    evaluator = Evaluator()
+    evaluation = evaluator.evaluate_game(manager.game_model)
+    assert evaluation == evaluator.evaluate_board_state(manager.get_raw_game_state())
+    assert evaluation == evaluator.evaluate_board_state(black_wins_in_one_board_state)
+
+    # Black, on turn, can surround the white queen: once it does, white's queen term dominates
+    manager.game_model.make_move({'move piece': {'from': (0, -2), 'to': (1, 3), 'type': 'ant'}})
+    assert evaluator.evaluate_game(manager.game_model) < -900
+
+
+def test_batch_evaluator(black_wins_in_one_board_state):
+    manager = HiveGameManager()
+    manager.set_board_state(black_wins_in_one_board_state)
+    game_model = manager.game_model
+    batch_evaluator = BatchEvaluator()
+    moves = manager.get_possible_moves()
+
+    scores = batch_evaluator.evaluate_moves(game_model, moves)
+    assert scores.shape == (len(moves), )
+    for move, score in zip(moves, scores):
+        game_model.make_move(move)
+        assert score == pytest.approx(batch_evaluator.evaluate_game(game_model), abs=1e-9)
+        game_model.unmake_move()
+
+    # Features read from an incremental evaluator's kept records are the ones generated from scratch
+    incremental_evaluator = IncrementalEvaluator(batch_evaluator.config, game_model)
+    incremental_evaluator.evaluate()
+    assert numpy.array_equal(batch_evaluator.evaluate_moves(game_model, moves, incremental_evaluator), scores)
+
+
+def test_evaluation_cache():
+    cache = EvaluationCache(2)
+    cache.put(1, 0.5)
+    cache.put(2, -0.5)
+    assert cache.get(1) == 0.5
+    cache.put(3, 1.5)
+    assert cache.get(2) is None
+    assert (cache.get(1), cache.get(3), len(cache)) == (0.5, 1.5, 2)
+    assert (cache.hits, cache.misses, cache.hit_rate) == (3, 1, 0.75)
+
+    # The same placements, made in a different order, share one entry
+    evaluator = Evaluator(evaluation_cache=EvaluationCache(100))
+    placements = [{'place piece': {'color': Consts.kBlack, 'location': (0, 0), 'type': 'queen'}},
+                  {'place piece': {'color': Consts.kWhite, 'location': (0, 2), 'type': 'queen'}},
+                  {'place piece': {'color': Consts.kBlack, 'location': (0, -2), 'type': 'ant'}},
+                  {'place piece': {'color': Consts.kWhite, 'location': (0, 4), 'type': 'ant'}}]
+    for order in ([0, 1, 2, 3], [2, 3, 0, 1]):
+        manager = HiveGameManager()
+        [manager.game_model.make_move(placements[index]) for index in order]
+        evaluator.evaluate_game(manager.game_model)
+    assert (evaluator.evaluation_cache.hits, evaluator.evaluation_cache.misses) == (1, 1)
+
+
+def test_quiescence_search(black_wins_in_one_board_state):
+    # White on turn. Placing an ant far from the action leaves the black win in one on the board
+    black_wins_in_one_board_state['white turns'] = 3
+    blunder = {'place piece': {'color': Consts.kWhite, 'location': (2, -2), 'type': 'ant'}}
+    engine = BasicEngine()
+    engine.reset(black_wins_in_one_board_state, 1)
+
+    engine.config['kQuiescence_node_limit'] = 0
+    assert engine._search_root_move(blunder, 1, -BasicEngine.kWin_score) > -BasicEngine.kWin_score
+    engine.config['kQuiescence_node_limit'] = 50
+    assert engine._search_root_move(blunder, 1, -BasicEngine.kWin_score) == -BasicEngine.kWin_score
+    assert blunder not in engine._get_forcing_moves()
+
+
+def test_pondering(black_wins_in_one_board_state):
+    # White on turn. The engine ponders white's replies, then plays black's win in one after white's blunder
+    black_wins_in_one_board_state['white turns'] = 3
+    blunder = {'place piece': {'color': Consts.kWhite, 'location': (2, -2), 'type': 'ant'}}
+    engine = BasicEngine()
+    engine.start_pondering(black_wins_in_one_board_state, 1)
+    engine.ponder_thread.join(timeout=60)
+    assert engine.transposition_table.probe(engine.model_manager.game_model.position_hash).depth == 2
+    engine.stop_pondering()
+    assert engine.ponder_thread is None
+
+    manager = HiveGameManager()
+    manager.set_board_state(black_wins_in_one_board_state)
+    manager.execute_turn(blunder)
+    engine.reset(manager.get_raw_game_state(), 1)
+    assert engine.transposition_table.probe(engine.model_manager.game_model.position_hash) is not None
+    assert engine.choose_move()['move piece']['to'] == (1, 3)
+
+    # Pondering stops as soon as it is told to, however deep it was set to search
+    engine.start_pondering(black_wins_in_one_board_state, 20)
+    start = time.perf_counter()
+    engine.stop_pondering()
+    assert time.perf_counter() - start < 1.0
+    engine.close()
+
+
+def test_stop_search(black_wins_in_one_board_state):
+    # White on turn, searched far deeper than can finish. Stopping the search returns the best move found so far
+    black_wins_in_one_board_state['white turns'] = 3
+    engine = BasicEngine()
+    engine.reset(black_wins_in_one_board_state, 20)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(engine.choose_move)
+        time.sleep(0.5)
+        best_move_so_far, _ = engine.get_search_progress()
+        engine.stop_search()
+        best_move = future.result(timeout=1.0)
+    assert best_move in engine.model_manager.get_possible_moves()
+    assert best_move_so_far in engine.model_manager.get_possible_moves()
+    assert not engine.stop_event.is_set()
+
+    # A stop that comes after the search has finished does not cut the next search short
+    engine.stop_search()
+    engine.reset(black_wins_in_one_board_state, 1)
+    engine.choose_move()
+    assert engine.completed_depth == 1
+    engine.stop_search()
+    engine.start_pondering(black_wins_in_one_board_state, 1)
+    engine.ponder_thread.join(timeout=60)
+    assert engine.transposition_table.probe(engine.model_manager.game_model.position_hash).depth == 2
+    engine.close()
+
+
+def test_search_stats(black_wins_in_one_board_state, tmp_path):
+    black_wins_in_one_board_state['white turns'] = 3
+    engine = BasicEngine()
+    engine.config['kSearch_log_file'] = str(tmp_path / 'search_log.jsonl')
+    engine.reset(black_wins_in_one_board_state, 2)
+    best_move = engine.choose_move()
+
+    search_stats = engine.search_stats
+    assert search_stats.completed_depth == 2
+    assert search_stats.best_move == best_move
+    assert search_stats.principal_variation[0] == best_move
+    assert 1 <= len(search_stats.principal_variation) <= 2
+    assert search_stats.nodes >= sum(search_stats.nodes_per_depth.values()) > 0
+    assert search_stats.effective_branching_factor == search_stats.nodes_per_depth[2] / search_stats.nodes_per_depth[1]
+    assert search_stats.leaf_evaluations > 0 and search_stats.evaluation_s > 0 and search_stats.move_generation_s > 0
+    assert 0 <= search_stats.transposition_hit_rate <= 1 and 0 <= search_stats.evaluation_cache_hit_rate <= 1
+
+    engine.reset(black_wins_in_one_board_state, 1)
+    engine.choose_move()
+    log_lines = [json.loads(line) for line in (tmp_path / 'search_log.jsonl').read_text().splitlines()]
+    assert [line['completed_depth'] for line in log_lines] == [2, 1]
+    assert log_lines[0]['nodes'] == search_stats.nodes
@@ -64,3 +64,21 @@ def test_vector_add():
     assert hive_funcs.vector_add(vector2, vector1) == (7, 6)
     assert hive_funcs.vector_subtract(vector1, vector2) == (-3, -4)
     assert hive_funcs.vector_subtract(vector2, vector1) == (3, 4)
+
+
+def test_get_articulation_points():
+    piece_chain_locations = {(0, 2), (0, 0), (0, -2), (0, -4)}
+    ring_locations = {(0, -2), (-1, -1), (1, -1), (-1, 1), (0, 2), (1, 1)}
+    ring_with_tail_locations = ring_locations.union({(0, 4), (0, 6)})
+
+    assert hive_funcs.get_articulation_points(set()) == set()
+    assert hive_funcs.get_articulation_points({(0, 0)}) == set()
+    assert hive_funcs.get_articulation_points(piece_chain_locations) == {(0, 0), (0, -2)}
+    assert hive_funcs.get_articulation_points(ring_locations) == set()
+    assert hive_funcs.get_articulation_points(ring_with_tail_locations) == {(0, 2), (0, 4)}
+
+
+def test_get_valid_moves():
+    broken_hive = {(0, 0), (0, 4)}
+    assert hive_funcs.get_valid_moves({(0, 2), (1, 1), (0, 6)}, broken_hive) == {(0, 2)}
+    assert hive_funcs.get_valid_moves({(1, 1), (1, 3), (0, 0)}, {(0, 0)}) == {(1, 1), (0, 0)}
@@ -11,6 +11,23 @@ def test_get_open_spaces(game_board_2_queens):
     assert game_board_2_queens._get_open_spaces(Consts.kWhite) == {(-1, 1), (1, 1), (0, 4), (1, 3), (-1, 3)}
 
 
+def test_open_spaces_and_piece_locations_with_stack(empty_game_board):
+    # A white beetle on top of the black queen: the buried queen opens no hexes to black, and its hex is listed once
+    empty_game_board.setup_board_state({
+        'pieces': [
+            {'type': 'queen', 'color': 'black', 'location': (0, 0), 'z-index': -1},
+            {'type': 'beetle', 'color': 'white', 'location': (0, 0), 'z-index': 0},
+            {'type': 'queen', 'color': 'white', 'location': (0, 2), 'z-index': 0},
+            {'type': 'ant', 'color': 'black', 'location': (0, -2), 'z-index': 0},
+        ],
+        'white turns': 2,
+        'black turns': 2,
+    })
+    assert empty_game_board._get_open_spaces(Consts.kBlack) == {(-1, -3), (1, -3), (0, -4), (-1, -1), (1, -1)}
+    assert empty_game_board._get_open_spaces(Consts.kWhite) == {(-1, -1), (1, -1), (-1, 1), (1, 1), (-1, 3), (1, 3), (0, 4)}
+    assert sorted(empty_game_board.piece_locations) == [(0, -2), (0, 0), (0, 2)]
+
+
 def test_get_piece_movement_locations_queen(game_board_2_queens, game_board_locked_center_piece):
     assert game_board_2_queens.get_piece_movement_locations((0, 0)) == {(-1, 1), (1, 1)}
     assert game_board_locked_center_piece.get_piece_movement_locations((0, 0)) == set()
@@ -86,3 +103,97 @@ def test_turn_one_placement_locations(game_board_single_queen):
 
 def test_turn_zero_placement_locations(empty_game_board):
     assert empty_game_board.get_piece_placement_locations(Consts.kBlack) == {(0, 0)}
+
+
+def test_location_index(game_board_surrounded_beetle):
+    assert game_board_surrounded_beetle.occupied_locations == {piece.location for piece in game_board_surrounded_beetle.pieces if piece.location}
+    assert game_board_surrounded_beetle._get_piece_by_location((0, 0)).color == Consts.kBlack
+    assert game_board_surrounded_beetle._get_piece_by_location((0, 6)) is None
+
+    # Climb a beetle onto the queen, then climb down into an empty hex
+    game_board_surrounded_beetle.move_piece((0, 0), (0, -2))
+    assert (0, 0) not in game_board_surrounded_beetle.occupied_locations
+    assert [str(piece) for piece in game_board_surrounded_beetle.stacks[(0, -2)]] == ['queen', 'beetle']
+    assert game_board_surrounded_beetle._get_piece_by_location((0, -2)).is_ontop_of_hive is True
+
+    game_board_surrounded_beetle.move_piece((0, -2), (0, 0))
+    assert [str(piece) for piece in game_board_surrounded_beetle.stacks[(0, -2)]] == ['queen']
+    assert game_board_surrounded_beetle._get_piece_by_location((0, 0)).is_ontop_of_hive is False
+
+
+def test_setup_board_state_stacks(empty_game_board):
+    board_state = {
+        'pieces': [
+            {'type': 'beetle', 'color': 'white', 'location': (0, 2), 'z-index': 0},
+            {'type': 'queen', 'color': 'black', 'location': (0, 0), 'z-index': 0},
+            {'type': 'queen', 'color': 'white', 'location': (0, 2), 'z-index': -1},
+            {'type': 'ant', 'color': 'black', 'location': (), 'z-index': 0},
+        ],
+        'white turns': 2,
+        'black turns': 1,
+    }
+    empty_game_board.setup_board_state(board_state)
+    assert empty_game_board.occupied_locations == {(0, 0), (0, 2)}
+    assert [str(piece) for piece in empty_game_board.stacks[(0, 2)]] == ['queen', 'beetle']
+    assert empty_game_board._get_piece_by_location((0, 2)).is_ontop_of_hive is True
+    assert empty_game_board.player_on_turn == Consts.kBlack
+
+
+def test_make_and_unmake_move(game_board_surrounded_beetle):
+    def snapshot(game):
+        return [(str(piece), piece.color, piece.location, piece.z_index, piece.is_ontop_of_hive) for piece in game.pieces], \
+            {location: list(stack) for location, stack in game.stacks.items()}, game.white_turn_counter, game.black_turn_counter
+
+    starting_snapshot = snapshot(game_board_surrounded_beetle)
+    moves = [
+        {'place piece': {'color': Consts.kWhite, 'location': (1, 5), 'type': 'queen'}},
+        {'move piece': {'from': (0, 0), 'to': (0, -2)}},
+        {'move piece': {'from': (-1, 1), 'to': (0, 2)}},
+        {'move piece': {'from': (0, -2), 'to': (0, 2)}},
+    ]
+    for move in moves:
+        game_board_surrounded_beetle.make_move(move)
+
+    assert [str(piece) for piece in game_board_surrounded_beetle.stacks[(0, 2)]] == ['beetle', 'beetle', 'beetle']
+    assert game_board_surrounded_beetle.black_queen.z_index == 0
+
+    for _ in moves:
+        game_board_surrounded_beetle.unmake_move()
+    assert snapshot(game_board_surrounded_beetle) == starting_snapshot
+    assert game_board_surrounded_beetle.undo_stack == []
+
+
+def test_position_hash(empty_game_board, game_board_surrounded_beetle):
+    first_order = [
+        {'place piece': {'color': Consts.kBlack, 'location': (0, 0), 'type': 'queen'}},
+        {'place piece': {'color': Consts.kWhite, 'location': (0, 2), 'type': 'ant'}},
+        {'place piece': {'color': Consts.kBlack, 'location': (0, -2), 'type': 'spider'}},
+        {'place piece': {'color': Consts.kWhite, 'location': (0, 4), 'type': 'queen'}},
+    ]
+    second_order = [first_order[2], first_order[3], first_order[0], first_order[1]]
+
+    empty_hash = empty_game_board.position_hash
+    [empty_game_board.make_move(move) for move in first_order]
+    first_order_hash = empty_game_board.position_hash
+    [empty_game_board.unmake_move() for _ in first_order]
+    assert empty_game_board.position_hash == empty_hash
+
+    [empty_game_board.make_move(move) for move in second_order]
+    assert empty_game_board.position_hash == first_order_hash
+
+    # The side to move is part of the hash
+    empty_game_board.make_move({'place piece': {'color': Consts.kBlack, 'location': (0, -4), 'type': 'ant'}})
+    black_ant_hash = empty_game_board.position_hash
+    empty_game_board.black_turn_counter -= 1
+    assert empty_game_board.position_hash != black_ant_hash
+
+    # Incrementally updated hashes match a hash of the same stacked position built from scratch
+    game_board_surrounded_beetle.move_piece((0, 0), (0, -2))
+    game_board_surrounded_beetle.move_piece((-1, 1), (0, -2))
+    board_state = {
+        'pieces': [{'type': str(piece), 'color': piece.color, 'location': piece.location, 'z-index': piece.z_index} for piece in reversed(game_board_surrounded_beetle.pieces)],
+        'white turns': game_board_surrounded_beetle.white_turn_counter,
+        'black turns': game_board_surrounded_beetle.black_turn_counter,
+    }
+    empty_game_board.setup_board_state(board_state)
+    assert empty_game_board.position_hash == game_board_surrounded_beetle.position_hash
@@ -1,6 +1,8 @@
 import datetime
 import time
 
+from src.records.hive_recorder import HiveRecorder
+
 
 def test_header_information(empty_saved_game):
     assert empty_saved_game.game_data['game information']['Player 1'] == 'pytest'
@@ -48,3 +50,16 @@ def test_log_result(empty_saved_game):
 
 def test_save_game(empty_saved_game):
     assert empty_saved_game.save_game_to_file() is False
+
+
+def test_load_game_from_file(empty_saved_game, tmp_path):
+    empty_saved_game.saved_games_path = str(tmp_path)
+    empty_saved_game.log_result('White wins')
+    assert empty_saved_game.save_game_to_file() is True
+
+    [path] = empty_saved_game.get_saved_game_paths()
+    loaded_game = HiveRecorder()
+    game_data = loaded_game.load_game_from_file(path)
+    assert game_data['game information'] == {'Player 1': 'pytest', 'Player 2': 'unittest', 'Time control': '10+10', 'Result': 'White wins'}
+    assert game_data['board state list'] == [({'test_key': 'test_value'}, '0.00')]
+    assert loaded_game.filename == empty_saved_game.filename
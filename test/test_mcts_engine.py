@@ -0,0 +1,58 @@
+from src.engine.mcts_engine import MctsEngine
+from src.engine.node import NodePool
+
+
+def test_mcts_engine(black_wins_in_one_board_state):
+    engine = MctsEngine()
+    engine.random.seed(0)
+    engine.config['kMcts_playouts_per_move'] = 20
+    engine.reset(black_wins_in_one_board_state, 1)
+    best_move = engine.choose_move()
+    assert best_move['move piece']['to'] == (1, 3)
+    assert engine.best_evaluation == -1.0
+    assert engine.playout_count == 20
+    assert engine.tree.visit_count[MctsEngine.kRoot] == 20
+    assert engine.node_count == engine.tree.get_subtree_size(MctsEngine.kRoot) == 2
+
+    # After the engine's move, the tree below it is kept for the next search
+    game_model = engine.model_manager.game_model
+    game_model.make_move(best_move)
+    next_board_state = engine.model_manager.get_raw_game_state()
+    engine.reset(next_board_state, 1)
+    assert engine.node_count == 1
+    assert engine.tree.visit_count[MctsEngine.kRoot] == 20
+    assert engine.choose_move() == {}
+
+
+def test_mcts_engine_node_cap(two_queens_board_state):
+    engine = MctsEngine()
+    engine.random.seed(0)
+    engine.config['kMcts_playouts_per_move'] = 10
+    engine.config['kMcts_playout_move_cap'] = 6
+    engine.config['kMcts_max_nodes'] = 5
+    engine.reset(two_queens_board_state, 1)
+    best_move = engine.choose_move()
+    assert best_move in engine.model_manager.get_possible_moves()
+    root_children = engine.tree.get_children(MctsEngine.kRoot)
+    assert engine.node_count == len(root_children) + 1
+    assert len(root_children) > 1 and not any(engine.tree.child_count[child] for child in root_children)
+
+
+def test_node_pool():
+    pool = NodePool()
+    root = pool.add_root(position_hash=1)
+    pool.add_children(root, [10, 20, 30], [2, 3, 4])
+    pool.add_children(2, [21, 22], [5, 6])
+    pool.visit_count[4], pool.total_value[4] = 3, -1.5
+
+    assert list(pool.get_children(root)) == [1, 2, 3]
+    assert list(pool.get_leaves(root)) == [1, 4, 5, 3]
+    assert pool.get_move_path(5) == [20, 22]
+    assert pool.get_move_path(5, root=2) == [22]
+    assert pool.get_subtree_size(root) == 6
+
+    subtree = pool.extract_subtree(2)
+    assert len(subtree) == subtree.get_subtree_size(0) == 3
+    assert list(subtree.position_hash) == [3, 5, 6]
+    assert subtree.parent[0] == NodePool.kNo_node
+    assert (subtree.move[1], subtree.visit_count[1], subtree.total_value[1]) == (21, 3, -1.5)
@@ -0,0 +1,45 @@
+import json
+
+from src.game.consts import Consts
+from src.engine.hive_engine import BasicEngine
+from src.engine.opening_book import OpeningBook, compile_opening_book, get_move_between
+from src.game.manager import HiveGameManager
+
+
+def test_opening_book(tmp_path):
+    opening = [{'place piece': {'color': Consts.kBlack, 'location': (0, 0), 'type': 'queen'}},
+               {'place piece': {'color': Consts.kWhite, 'location': (0, 2), 'type': 'queen'}},
+               {'place piece': {'color': Consts.kBlack, 'location': (0, -2), 'type': 'ant'}}]
+    game_paths = []
+    for game_number, result in enumerate(['White wins', 'Black wins', 'Black wins']):
+        manager = HiveGameManager()
+        board_states = [manager.get_raw_game_state()]
+        for move in opening[:2 + (game_number > 0)]:
+            manager.execute_turn(move)
+            board_states.append(manager.get_raw_game_state())
+        game_paths.append(str(tmp_path / f'hive_game_{game_number}'))
+        with open(game_paths[-1], 'w') as f:
+            json.dump({'game information': {'Result': result}, 'board state list': [(state, '0.00') for state in board_states]}, f)
+        assert [get_move_between(state, next_state) for state, next_state in zip(board_states, board_states[1:])] == opening[:len(board_states) - 1]
+
+    book_path = str(tmp_path / 'opening_book.bin')
+    assert compile_opening_book(game_paths, book_path, max_plies=12) == 3
+    book = OpeningBook(book_path)
+
+    manager = HiveGameManager()
+    [manager.execute_turn(move) for move in opening[:2]]
+    assert book.get_move_statistics(manager.game_model) == [(opening[2], 2, 1.0)]
+
+    # The same opening, turned a sixth of a turn, finds the same book move, turned the same way
+    manager = HiveGameManager()
+    manager.execute_turn(opening[0])
+    manager.execute_turn({'place piece': {'color': Consts.kWhite, 'location': (1, 1), 'type': 'queen'}})
+    assert book.get_move(manager.game_model, min_games=2) == {'place piece': {'color': Consts.kBlack, 'location': (-1, -1), 'type': 'ant'}}
+    assert book.get_move(manager.game_model, min_games=3) is None
+
+    engine = BasicEngine()
+    engine.opening_book = book
+    engine.reset(manager.get_raw_game_state(), 3)
+    assert engine.choose_move() == {'place piece': {'color': Consts.kBlack, 'location': (-1, -1), 'type': 'ant'}}
+    assert engine.completed_depth == 0
+    engine.close()
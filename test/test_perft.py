@@ -0,0 +1,31 @@
+import pytest
+
+from src.game.manager import HiveGameManager
+from src.game.perft import perft, divide, setup_reference_position
+
+
+@pytest.mark.parametrize('position_name, expected_counts', [
+    ('start', [5, 150, 2220, 32856]),
+    ('opening', [29, 784, 25076]),
+    ('midgame', [35, 1330, 57176]),
+])
+def test_perft(position_name, expected_counts):
+    manager = HiveGameManager()
+    setup_reference_position(manager, position_name)
+    position_hash = manager.game_model.position_hash
+    assert [perft(manager, depth) for depth in range(1, len(expected_counts) + 1)] == expected_counts
+    assert manager.game_model.position_hash == position_hash
+
+
+def test_divide():
+    manager = HiveGameManager()
+    setup_reference_position(manager, 'midgame')
+    move_counts = divide(manager, 2)
+    assert sum(count for _, count in move_counts) == 1330
+    assert divide(manager, 2, worker_processes=2) == move_counts
+
+    # Every count below a root move matches the moves generated from the board state after that move
+    for move, count in move_counts:
+        manager.game_model.make_move(move)
+        assert len(HiveGameManager.generate_all_possible_moves(manager.get_raw_game_state())) == count
+        manager.game_model.unmake_move()
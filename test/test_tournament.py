@@ -0,0 +1,61 @@
+import json
+import math
+import pytest
+
+from src.engine.hive_engine import BasicEngine
+from src.engine.transposition_table import TranspositionTable
+from src.engine.tournament import TournamentPlayer, run_tournament, play_game, get_elo_difference, get_match_scores, _get_engine, _worker_engines
+from src.records.hive_recorder import HiveRecorder
+
+
+def test_elo_difference():
+    elo, lower_bound, upper_bound = get_elo_difference(5, 0, 5)
+    assert lower_bound < elo == 0.0 < upper_bound == pytest.approx(-lower_bound)
+    elo, lower_bound, upper_bound = get_elo_difference(60, 20, 20)
+    assert elo == pytest.approx(400 * math.log10(0.7 / 0.3))
+    assert lower_bound < elo < upper_bound
+    assert get_elo_difference(3, 0, 0)[0] == math.inf
+    assert get_match_scores([{'black': 'a', 'white': 'b', 'result': 'White wins'}, {'black': 'b', 'white': 'a', 'result': 'White wins'},
+                             {'black': 'a', 'white': 'b', 'result': 'Draw'}], 'a', 'b') == (1, 1, 1)
+
+
+def test_tournament(tmp_path):
+    players = [TournamentPlayer('basic', '', 1), TournamentPlayer('basic', '', 1, name='basic_copy')]
+    games = run_tournament(players, 2, worker_processes=0, move_cap=8, save_path=str(tmp_path))
+    assert [(game['black'], game['white']) for game in games] == [(players[0].name, players[1].name), (players[1].name, players[0].name)]
+    for game in games:
+        assert game['result'] in ('White wins', 'Black wins', 'Draw')
+        assert game['plies'] == 8 and game['is adjudicated']
+        with open(game['path']) as f:
+            saved_game = json.load(f)
+        assert saved_game['game information']['Result'] == game['result']
+        assert len(saved_game['board state list']) == 9
+
+    # Both games of a pair start from the same random opening
+    first_opening, second_opening = [json.load(open(game['path']))['board state list'][2][0]['pieces'] for game in games]
+    assert first_opening == second_opening
+
+
+def test_tournament_closes_engines(tmp_path, monkeypatch):
+    closed_engines = []
+    monkeypatch.setattr(BasicEngine, 'close', lambda engine: closed_engines.append(engine))
+    players = [TournamentPlayer('basic', '', 1), TournamentPlayer('basic', '', 2)]
+    run_tournament(players, 2, worker_processes=0, move_cap=4, save_path=str(tmp_path / 'tournaments'))
+    assert len(set(map(id, closed_engines))) == 2 and not _worker_engines
+
+    # Tournament games saved in a subdirectory are found with the rest of the saved games
+    recorder = HiveRecorder()
+    recorder.saved_games_path = str(tmp_path)
+    assert len(recorder.get_saved_game_paths()) == 2
+
+
+def test_tournament_engines():
+    # Players that differ only by search depth search with engines of their own, from empty tables in every game
+    shallow_player, deep_player = TournamentPlayer('basic', '', 1), TournamentPlayer('basic', '', 2)
+    assert _get_engine(shallow_player, '') is not _get_engine(deep_player, '')
+    deep_engine = _get_engine(deep_player, '')
+    deep_engine.transposition_table.store(123456789, 5, TranspositionTable.kExact, 1.0)
+    deep_engine.clock_remaining_s = 0.0
+    play_game(shallow_player, deep_player, move_cap=2)
+    assert deep_engine.transposition_table.probe(123456789) is None
+    assert deep_engine.clock_remaining_s == float(deep_engine.model_manager.config['kTime_per_game'])
@@ -0,0 +1,55 @@
+import numpy
+import pytest
+
+from src.engine.engine_config import get_config, get_config_path
+from src.engine.batch_evaluator import BatchEvaluator
+from src.engine.weight_tuner import WeightTuner, load_training_positions, write_engine_config
+from src.engine.tournament import TournamentPlayer, run_tournament
+
+
+def test_weight_tuner(tmp_path):
+    # Results drawn from a known logistic model of the features: tuning moves the weights towards it
+    feature_count = len(BatchEvaluator.kFeature_weight_keys)
+    generator = numpy.random.default_rng(0)
+    features = generator.normal(size=(5000, feature_count))
+    features[:, 0] = 0.0  # No surrounded queens
+    true_weights = generator.normal(size=feature_count)
+    results = (generator.random(5000) < 1.0 / (1.0 + numpy.exp(-features @ true_weights))).astype(float)
+    initial_weights = BatchEvaluator().weights
+
+    tuner = WeightTuner(features, results, initial_weights, worker_threads=2)
+    tuned_weights = tuner.tune(1.0)
+    assert tuner.get_loss(tuned_weights, 1.0)[0] < tuner.get_loss(initial_weights, 1.0)[0]
+    tuner.close()
+    assert numpy.linalg.norm(tuned_weights[1:] - true_weights[1:]) < numpy.linalg.norm(initial_weights[1:] - true_weights[1:]) / 10
+    assert tuned_weights[0] == initial_weights[0]
+
+    config_path = str(tmp_path / 'tuned_engine_config')
+    write_engine_config(tuned_weights, '', config_path)
+    tuned_config = get_config(config_path)
+    assert tuned_config['kAnt_in_play_bonus'] == pytest.approx(tuned_weights[BatchEvaluator.kFeature_weight_keys.index('kAnt_in_play_bonus')], rel=1e-5)
+    assert tuned_config['kQuiescence_node_limit'] == get_config()['kQuiescence_node_limit']
+
+    # Only the tuned values change: comments are kept, and a tuned weight missing from the base config is added
+    with open(get_config_path()) as f:
+        base_lines = ['# Hand-picked weights'] + [line for line in f.read().splitlines() if not line.startswith('Turn advantage')]
+    base_config_path = str(tmp_path / 'commented_engine_config')
+    with open(base_config_path, 'w') as f:
+        f.write('\n'.join(base_lines) + '\n')
+    write_engine_config(tuned_weights, base_config_path, config_path)
+    with open(config_path) as f:
+        tuned_lines = f.read().splitlines()
+    assert tuned_lines[0] == '# Hand-picked weights' and len(tuned_lines) == len(base_lines) + 1
+    assert get_config(config_path)['kPlayer_turn_bonus'] == pytest.approx(tuned_weights[BatchEvaluator.kFeature_weight_keys.index('kPlayer_turn_bonus')], rel=1e-5)
+
+
+def test_load_training_positions(tmp_path):
+    players = [TournamentPlayer('basic', '', 1), TournamentPlayer('basic', '', 1, name='basic_copy')]
+    games = run_tournament(players, 2, worker_processes=0, move_cap=6, save_path=str(tmp_path))
+    cache_path = str(tmp_path / 'features.npz')
+    features, results = load_training_positions([game['path'] for game in games], cache_path=cache_path, worker_processes=0)
+    assert features.shape == (len(results), len(BatchEvaluator.kFeature_weight_keys)) and len(results) == 2 * 7
+    assert set(results) <= {0.0, 0.5, 1.0}
+
+    cached_features, _ = load_training_positions([game['path'] for game in games], cache_path=cache_path, worker_processes=0)
+    assert numpy.array_equal(cached_features, features)